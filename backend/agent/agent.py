@@ -1,7 +1,12 @@
+import asyncio
 from langgraph.graph import StateGraph, END
 from backend.agent.state import ConversationState
 from backend.agent.graph import agent_graph  # ADD THIS LINE IF MISSING
-from backend.services.tts_service import tts_service
+from backend.services.tts_service import speaks_on, tts_service
+from backend.services.llm_resilience import turn_deadline
+from backend.agent.sessions import DEFAULT_SESSION, SessionStore
+from backend.services.intent_rules import pending_frame
+from backend.config import settings
 
 
 class AppointmentAgent:
@@ -9,18 +14,99 @@ class AppointmentAgent:
     
     def __init__(self):
         self.graph = agent_graph
-        self.conversation_history = []  # ADD THIS LINE
+        self.sessions = SessionStore(settings.SESSION_MAX, settings.SESSION_IDLE_TTL)
         print("[AGENT] Appointment agent initialized")
     
-    def process_message(self, user_message: str, conversation_history=None) -> dict:
-        """Process a user message and return response"""
+    def process_message(self, user_message: str, conversation_history=None, session_id=DEFAULT_SESSION,
+                        channel="cli") -> dict:
+        """Process a user message and return response. Speech, if enabled for
+        the channel, is queued and doesn't delay the return."""
+        session = self.sessions.get(session_id)
+        
+        # One turn at a time per conversation, shared with the async path
+        with session.turn_lock:
+            initial_state = self._start_turn(user_message, conversation_history, session)
+            try:
+                # Run through graph
+                with turn_deadline(settings.LLM_TURN_DEADLINE):
+                    final_state = self.graph.invoke(initial_state)
+            except Exception as e:
+                response = self._fail_turn(session, user_message, e)
+            else:
+                response = self._finish_turn(session, user_message, final_state)
+        
+        self._speak(response, channel)
+        return response
+    
+    async def aprocess_message(self, user_message: str, conversation_history=None, session_id=DEFAULT_SESSION,
+                               channel="chat") -> dict:
+        """process_message for async callers: LLM calls are awaited, so the
+        event loop keeps serving other clients"""
+        response = await self._arun_turn(user_message, conversation_history, session_id)
+        self._speak(response, channel)
+        return response
+    
+    async def astream_message(self, user_message: str, conversation_history=None, session_id=DEFAULT_SESSION,
+                              channel="stream"):
+        """aprocess_message as an async generator of events: {'type': 'delta',
+        'text': ...} as the reply streams in, then {'type': 'final', ...} with
+        the same fields process_message returns (minus the state). The final
+        message is the reply as recorded; clients show it in place of the
+        deltas, which it replaces if the stream broke partway"""
+        deltas = asyncio.Queue()
+        turn = asyncio.create_task(
+            self._arun_turn(user_message, conversation_history, session_id, on_delta=deltas.put_nowait)
+        )
+        turn.add_done_callback(lambda _: deltas.put_nowait(None))
+        
+        streamed = False
+        while (text := await deltas.get()) is not None:
+            streamed = True
+            yield {'type': 'delta', 'text': text}
+        
+        response = turn.result()
+        if not streamed:
+            # The graph failed before the respond node
+            yield {'type': 'delta', 'text': response['response']}
+        yield {
+            'type': 'final',
+            'message': response['response'],
+            'intent': response.get('intent'),
+            'success': response.get('success')
+        }
+        self._speak(response, channel)
+    
+    async def _arun_turn(self, user_message, conversation_history=None, session_id=DEFAULT_SESSION, on_delta=None):
+        """Run one turn through the graph asynchronously, without speaking"""
+        session = self.sessions.get(session_id)
+        config = {'configurable': {'on_delta': on_delta}} if on_delta else None
+        
+        # One turn at a time per conversation; other sessions run concurrently
+        async with session.aturn():
+            initial_state = self._start_turn(user_message, conversation_history, session)
+            try:
+                with turn_deadline(settings.LLM_TURN_DEADLINE):
+                    final_state = await self.graph.ainvoke(initial_state, config)
+            except Exception as e:
+                return self._fail_turn(session, user_message, e)
+            
+            return self._finish_turn(session, user_message, final_state)
+    
+    @staticmethod
+    def _speak(response, channel):
+        """Hand the reply to the background speech worker"""
+        if speaks_on(channel):
+            tts_service.speak_later(response['response'])
+    
+    def _start_turn(self, user_message, conversation_history, session):
+        """Initial graph state for a new message"""
         print(f"\n{'='*60}")
         print(f"[AGENT] Processing message: '{user_message}'")
         print(f"{'='*60}")
         
-        # Use instance history if none provided
+        # Use the session's history if none provided
         if conversation_history is None:
-            conversation_history = self.conversation_history
+            conversation_history = session.snapshot()
         
         # Initialize state
         initial_state: ConversationState = {
@@ -35,63 +121,56 @@ class AppointmentAgent:
             'appointments': [],
             'available': False,
             'agent_response': '',
+            'response_context': None,
+            'intent_reply': None,
             'conversation_history': conversation_history,
             'clarification_needed': False,
             'missing_fields': [],
+            'pending_intent': session.pending,
+            'prefetched': {},
+            'node_timings': {},
             'error': None,
             'retry_count': 0
         }
+        return initial_state
+    
+    def _finish_turn(self, session, user_message, final_state):
+        """Record a completed turn in the history and build the result"""
+        response = final_state.get('agent_response', 'I apologize, I could not process that request.')
         
-        try:
-            # Run through graph
-            final_state = self.graph.invoke(initial_state)
-            
-            response = final_state.get('agent_response', 'I apologize, I could not process that request.')
-            
-            print(f"\n[AGENT] Final response: '{response}'")
-            print(f"{'='*60}\n")
-            
-            # Save to history
-            self.conversation_history.append({
-                'user': user_message,
-                'agent': response
-            })
-            
-            # Keep only last 5 turns
-            self.conversation_history = self.conversation_history[-5:]
-            
-            # Speak response using TTS
-            tts_service.speak(response)
-            
-            return {
-                'success': True,
-                'response': response,
-                'intent': final_state.get('intent'),
-                'state': final_state
-            }
-            
-        except Exception as e:
-            print(f"[AGENT] Error processing message: {e}")
-            error_response = "I encountered an error. Could you please repeat that?"
-            
-            # Save error to history
-            self.conversation_history.append({
-                'user': user_message,
-                'agent': error_response
-            })
-            
-            # Speak error response
-            tts_service.speak(error_response)
+        print(f"\n[AGENT] Final response: '{response}'")
+        timings = final_state.get('node_timings') or {}
+        print(f"[AGENT] Node timings: {', '.join(f'{name} {ms:.1f} ms' for name, ms in timings.items())}")
+        print(f"{'='*60}\n")
+        
+        # Save to history (the session keeps only the last few turns), and
+        # the request's slots if it's waiting on a clarification
+        pending = pending_frame(final_state) if final_state.get('clarification_needed') else None
+        session.record(user_message, response, pending)
+        
+        return {
+            'success': True,
+            'response': response,
+            'intent': final_state.get('intent'),
+            'state': final_state
+        }
+    
+    def _fail_turn(self, session, user_message, error):
+        """Record a failed turn in the history and build the error result"""
+        print(f"[AGENT] Error processing message: {error}")
+        error_response = "I encountered an error. Could you please repeat that?"
+        
+        # Save error to history, keeping any pending request for the retry
+        session.record(user_message, error_response, session.pending)
         
         return {
             'success': False,
             'response': error_response,
             'intent': None,
-            'error': str(e)
+            'error': str(error)
         }
 
-            
-       
+
 # Create singleton instance
 appointment_agent = AppointmentAgent()
 
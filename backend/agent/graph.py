@@ -1,13 +1,57 @@
+import functools
+import inspect
+import time
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from backend.agent.state import ConversationState
 from backend.agent.nodes import (
     parse_intent_node,
+    aparse_intent_node,
     list_appointments_node,
     check_availability_node,
     book_appointment_node,
     cancel_appointment_node,
-    generate_response_node
+    generate_response_node,
+    agenerate_response_node
 )
+from backend.services import metrics
+from backend.services.llm_resilience import LatencyTracker
+
+# Recent wall time per node, for /stats
+NODE_LATENCY = {}
+NODE_TIMING_WINDOW = 500
+
+
+def timed(name, node):
+    """Wrap a node to record its wall time, in milliseconds, in
+    state['node_timings'] and NODE_LATENCY, and in the /metrics histograms"""
+    tracker = NODE_LATENCY.setdefault(name, LatencyTracker(NODE_TIMING_WINDOW))
+    
+    def record(state, started):
+        elapsed = time.perf_counter() - started
+        tracker.record(elapsed)
+        state['node_timings'] = {**(state.get('node_timings') or {}), name: round(elapsed * 1000, 2)}
+        return state
+    
+    # functools.wraps keeps the signature, so RunnableLambda still passes
+    # config to nodes that take it
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def timed_node(state, *args, **kwargs):
+            started = time.perf_counter()
+            with metrics.NODE.track(node=name):
+                return record(await node(state, *args, **kwargs), started)
+    else:
+        @functools.wraps(node)
+        def timed_node(state, *args, **kwargs):
+            started = time.perf_counter()
+            with metrics.NODE.track(node=name):
+                return record(node(state, *args, **kwargs), started)
+    return timed_node
+
+
+def node_timing_stats():
+    return {name: tracker.summary() for name, tracker in NODE_LATENCY.items()}
 
 
 def route_after_intent(state: ConversationState) -> str:
@@ -17,7 +61,7 @@ def route_after_intent(state: ConversationState) -> str:
     print(f"[ROUTER: INTENT] Routing intent: {intent}")
     
     # Edge case handling
-    if intent == 'error' or intent == 'out_of_scope' or intent == 'system_info':
+    if intent in ('error', 'out_of_scope', 'system_info', 'dismissed'):
         return 'respond'
     
     if state.get('clarification_needed'):
@@ -56,13 +100,18 @@ def create_agent_graph():
     # Initialize graph
     workflow = StateGraph(ConversationState)
     
-    # Add nodes
-    workflow.add_node("parse_intent", parse_intent_node)
-    workflow.add_node("list", list_appointments_node)
-    workflow.add_node("check_availability", check_availability_node)
-    workflow.add_node("book", book_appointment_node)
-    workflow.add_node("cancel", cancel_appointment_node)
-    workflow.add_node("respond", generate_response_node)
+    # Add nodes; the LLM nodes have async variants used by ainvoke, the
+    # calendar nodes are quick and run in a worker thread there
+    workflow.add_node("parse_intent", RunnableLambda(
+        timed("parse_intent", parse_intent_node), afunc=timed("parse_intent", aparse_intent_node), name="parse_intent"
+    ))
+    workflow.add_node("list", timed("list", list_appointments_node))
+    workflow.add_node("check_availability", timed("check_availability", check_availability_node))
+    workflow.add_node("book", timed("book", book_appointment_node))
+    workflow.add_node("cancel", timed("cancel", cancel_appointment_node))
+    workflow.add_node("respond", RunnableLambda(
+        timed("respond", generate_response_node), afunc=timed("respond", agenerate_response_node), name="respond"
+    ))
     
     # Set entry point
     workflow.set_entry_point("parse_intent")
@@ -1,27 +1,105 @@
+from backend.agent import prefetch
 from backend.agent.state import ConversationState
-from backend.services.llm_service import llm_service
+from backend.services.llm_service import llm_service, llm_writes_clarifications, ERROR_RESPONSE, UNAVAILABLE_RESPONSE
+from backend.services.llm_resilience import LLMUnavailable
 from backend.services.calendar_service import calendar_service
-from datetime import datetime, timedelta, time
+from backend.services.response_templates import render_response
+from backend.services.intent_rules import fill_pending, merge_pending, parse_intent_rules
+from backend.services.time_utils import (
+    CLINIC_HOURS, date_to_ordinal, ordinal_to_date, today_ordinal, time_to_minutes,
+    format_date, format_weekday, format_time, format_date_str, format_time_str
+)
+from datetime import time
 from backend.config import settings
 
+DISMISSED_RESPONSE = "Okay, I've dropped that request. Anything else I can help with?"
 
-def parse_intent_node(state: ConversationState) -> ConversationState:
-    """Node 1: Parse user input into structured intent"""
+
+def _reject_empty_message(state: ConversationState) -> bool:
+    """Flag input too short to parse; True if the turn should stop here"""
     print(f"\n[NODE: PARSE INTENT] Processing: '{state['user_message']}'")
     
     if not state.get('user_message') or len(state['user_message'].strip()) < 2:
         state['intent'] = 'error'
         state['error'] = 'empty_input'
         state['agent_response'] = "I didn't catch that. Could you please speak again?"
+        return True
+    return False
+
+
+def _rule_intent(state: ConversationState):
+    """Intent from the local rules if they're confident enough, else None"""
+    intent_data = parse_intent_rules(state['user_message'], state.get('conversation_history', []))
+    if intent_data['confidence'] >= settings.INTENT_RULES_MIN_CONFIDENCE:
+        print(f"[NODE: PARSE INTENT] Parsed by rules (confidence {intent_data['confidence']})")
+        return intent_data
+    return None
+
+
+def _local_intent(state: ConversationState):
+    """Intent worked out without the LLM: a follow-up merged into the pending
+    request, or a confident rule parse. None if the LLM is needed."""
+    pending = state.get('pending_intent')
+    if pending:
+        intent_data = fill_pending(pending, state['user_message'])
+        if intent_data:
+            print(f"[NODE: PARSE INTENT] Filled pending {pending['intent']} slots locally")
+            return intent_data
+    return _rule_intent(state)
+
+
+def parse_intent_node(state: ConversationState) -> ConversationState:
+    """Node 1: Parse user input into structured intent"""
+    if _reject_empty_message(state):
         return state
     
-    intent_data = llm_service.parse_intent(
-        state['user_message'],
-        state.get('conversation_history', [])
-    )
+    intent_data = _local_intent(state)
+    if intent_data:
+        return _apply_intent(state, intent_data)
     
+    pending = state.get('pending_intent')
+    if pending:
+        # The pending slots stand in for the raw history, and give the date
+        # to look up while the LLM parses
+        prefetch.start(state, pending)
+        intent_data = merge_pending(pending, llm_service.parse_intent(state['user_message'], [], pending=pending))
+    else:
+        intent_data = llm_service.parse_intent(
+            state['user_message'],
+            state.get('conversation_history', [])
+        )
+    return _apply_intent(state, intent_data)
+
+
+async def aparse_intent_node(state: ConversationState) -> ConversationState:
+    """parse_intent_node for async graph runs"""
+    if _reject_empty_message(state):
+        return state
+    
+    intent_data = _local_intent(state)
+    if intent_data:
+        return _apply_intent(state, intent_data)
+    
+    pending = state.get('pending_intent')
+    if pending:
+        prefetch.start(state, pending)
+        intent_data = merge_pending(
+            pending, await llm_service.aparse_intent(state['user_message'], [], pending=pending)
+        )
+    else:
+        intent_data = await llm_service.aparse_intent(
+            state['user_message'],
+            state.get('conversation_history', [])
+        )
+    return _apply_intent(state, intent_data)
+
+
+def _apply_intent(state: ConversationState, intent_data: dict) -> ConversationState:
+    """Copy the parsed intent into the conversation state"""
     state['intent'] = intent_data.get('intent')
     state['date'] = intent_data.get('date')
+    state['start_date'] = intent_data.get('start_date')
+    state['end_date'] = intent_data.get('end_date')
     state['time'] = intent_data.get('time')
     state['patient_name'] = intent_data.get('patient_name')
     state['duration'] = intent_data.get('duration', 30)
@@ -33,6 +111,24 @@ def parse_intent_node(state: ConversationState) -> ConversationState:
         if not state['missing_fields']:
             state['clarification_needed'] = False
     
+    if not state['clarification_needed']:
+        prefetch.start(state, state)
+    
+    # Clarification question written by the LLM alongside the intent
+    if llm_writes_clarifications() and state['clarification_needed']:
+        state['intent_reply'] = intent_data.get('response')
+    else:
+        state['intent_reply'] = None
+    
+    # The LLM couldn't be reached; answer now rather than calling it again to phrase that
+    if state['intent'] == 'error':
+        state['error'] = intent_data.get('error')
+        state['agent_response'] = UNAVAILABLE_RESPONSE if state['error'] == 'circuit_open' else ERROR_RESPONSE
+    
+    # "Never mind" to a clarification question; the pending request is dropped
+    if state['intent'] == 'dismissed':
+        state['agent_response'] = DISMISSED_RESPONSE
+    
     if state['intent'] in ['out_of_scope', 'system_info']:
         state['clarification_needed'] = False
         state['agent_response'] = intent_data.get('response', 
@@ -44,6 +140,33 @@ def parse_intent_node(state: ConversationState) -> ConversationState:
     return state
 
 
+def _list_range(state: ConversationState, start_date, end_date, scope):
+    """Set the appointments and response context for start_date..end_date;
+    `scope` says how the reply should describe the range"""
+    appointments = [
+        {
+            'patient': apt.patient_name,
+            'date': format_date(apt.day),
+            'time': format_time(apt.start),
+            'day_of_week': format_weekday(apt.day)
+        }
+        for apt in calendar_service.get_appointments_range(start_date, end_date)
+    ]
+    state['appointments'] = appointments
+    
+    if not appointments:
+        context = {'intent': 'list_appointments', 'result': 'no_appointments', **scope}
+    else:
+        context = {
+            'intent': 'list_appointments',
+            'result': 'found_appointments_range',
+            'count': len(appointments),
+            'appointments': appointments,
+            **scope
+        }
+    state['response_context'] = context
+
+
 def list_appointments_node(state: ConversationState) -> ConversationState:
     """List appointments node with date range support and LLM-generated responses"""
     date = state.get('date')
@@ -56,105 +179,27 @@ def list_appointments_node(state: ConversationState) -> ConversationState:
         print(f"[NODE: LIST APPOINTMENTS] Listing appointments from {start_date} to {end_date}")
         
         try:
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
+            scope = {'start_date': format_date_str(start_date), 'end_date': format_date_str(end_date)}
         except ValueError:
             state['agent_response'] = "I couldn't understand that date range. Please provide valid dates."
             return state
-        
-        all_appointments = []
-        current = start
-        while current <= end:
-            date_str = current.strftime('%Y-%m-%d')
-            day_appointments = calendar_service.get_appointments(date_str)
-            
-            for apt in day_appointments:
-                date_obj = datetime.strptime(apt['date'], '%Y-%m-%d')
-                time_obj = datetime.strptime(apt['time'], '%H:%M')
-                all_appointments.append({
-                    'patient': apt['patient_name'],
-                    'date': date_obj.strftime('%B %d'),
-                    'time': time_obj.strftime('%I:%M %p').lstrip('0'),
-                    'day_of_week': date_obj.strftime('%A')
-                })
-            
-            current += timedelta(days=1)
-        
-        state['appointments'] = all_appointments
-        
-        if not all_appointments:
-            context = {
-                'intent': 'list_appointments',
-                'result': 'no_appointments',
-                'start_date': start.strftime('%B %d'),
-                'end_date': end.strftime('%B %d')
-            }
-        else:
-            context = {
-                'intent': 'list_appointments',
-                'result': 'found_appointments_range',
-                'count': len(all_appointments),
-                'appointments': all_appointments,
-                'start_date': start.strftime('%B %d'),
-                'end_date': end.strftime('%B %d')
-            }
-        
-        state['agent_response'] = llm_service.generate_response(context)
+        _list_range(state, start_date, end_date, scope)
         
     elif start_date and not end_date:
         print(f"[NODE: LIST APPOINTMENTS] Listing appointments from {start_date} onwards (7 days)")
         
         try:
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = start + timedelta(days=7)
+            end_date = ordinal_to_date(date_to_ordinal(start_date) + 7)
         except ValueError:
             state['agent_response'] = "I couldn't understand that date. Please provide a valid date."
             return state
-        
-        all_appointments = []
-        current = start
-        while current <= end:
-            date_str = current.strftime('%Y-%m-%d')
-            day_appointments = calendar_service.get_appointments(date_str)
-            
-            for apt in day_appointments:
-                date_obj = datetime.strptime(apt['date'], '%Y-%m-%d')
-                time_obj = datetime.strptime(apt['time'], '%H:%M')
-                all_appointments.append({
-                    'patient': apt['patient_name'],
-                    'date': date_obj.strftime('%B %d'),
-                    'time': time_obj.strftime('%I:%M %p').lstrip('0'),
-                    'day_of_week': date_obj.strftime('%A')
-                })
-            
-            current += timedelta(days=1)
-        
-        state['appointments'] = all_appointments
-        
-        if not all_appointments:
-            context = {
-                'intent': 'list_appointments',
-                'result': 'no_appointments',
-                'start_date': start.strftime('%B %d'),
-                'future_request': True
-            }
-        else:
-            context = {
-                'intent': 'list_appointments',
-                'result': 'found_appointments_range',
-                'count': len(all_appointments),
-                'appointments': all_appointments,
-                'start_date': start.strftime('%B %d'),
-                'future_request': True
-            }
-        
-        state['agent_response'] = llm_service.generate_response(context)
+        _list_range(state, start_date, end_date, {'start_date': format_date_str(start_date), 'future_request': True})
         
     elif not date and not start_date:
         print(f"[NODE: LIST APPOINTMENTS] Listing all future appointments")
         
         appointments = calendar_service.get_appointments()
-        state['appointments'] = appointments
+        state['appointments'] = [apt.to_dict() for apt in appointments]
         
         if not appointments:
             context = {
@@ -165,13 +210,11 @@ def list_appointments_node(state: ConversationState) -> ConversationState:
         else:
             apt_info = []
             for apt in appointments:
-                date_obj = datetime.strptime(apt['date'], '%Y-%m-%d')
-                time_obj = datetime.strptime(apt['time'], '%H:%M')
                 apt_info.append({
-                    'patient': apt['patient_name'],
-                    'date': date_obj.strftime('%B %d'),
-                    'time': time_obj.strftime('%I:%M %p').lstrip('0'),
-                    'day_of_week': date_obj.strftime('%A')
+                    'patient': apt.patient_name,
+                    'date': format_date(apt.day),
+                    'time': format_time(apt.start),
+                    'day_of_week': format_weekday(apt.day)
                 })
             
             context = {
@@ -182,13 +225,13 @@ def list_appointments_node(state: ConversationState) -> ConversationState:
                 'all_future': True
             }
         
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
         
     else:
         print(f"[NODE: LIST APPOINTMENTS] Listing appointments for {date}")
         
-        appointments = calendar_service.get_appointments(date)
-        state['appointments'] = appointments
+        appointments = prefetch.result(state, ('day', date), calendar_service.get_appointments, date)
+        state['appointments'] = [apt.to_dict() for apt in appointments]
         
         if not appointments:
             context = {
@@ -199,12 +242,10 @@ def list_appointments_node(state: ConversationState) -> ConversationState:
         else:
             apt_info = []
             for apt in appointments:
-                date_obj = datetime.strptime(apt['date'], '%Y-%m-%d')
-                time_obj = datetime.strptime(apt['time'], '%H:%M')
                 apt_info.append({
-                    'patient': apt['patient_name'],
-                    'date': date_obj.strftime('%B %d'),
-                    'time': time_obj.strftime('%I:%M %p').lstrip('0')
+                    'patient': apt.patient_name,
+                    'date': format_date(apt.day),
+                    'time': format_time(apt.start)
                 })
             
             context = {
@@ -215,7 +256,7 @@ def list_appointments_node(state: ConversationState) -> ConversationState:
                 'appointments': apt_info
             }
         
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
     
     return state
 
@@ -230,54 +271,59 @@ def check_availability_node(state: ConversationState) -> ConversationState:
             'error': 'missing_time',
             'date': state.get('date')
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
         state['clarification_needed'] = True
         return state
     
     # Validate date is not in the past for booking
     if state.get('intent') == 'book_appointment':
         try:
-            date_obj = datetime.strptime(state['date'], '%Y-%m-%d')
-            if date_obj.date() < datetime.now().date():
+            if date_to_ordinal(state['date']) < today_ordinal():
                 context = {
                     'intent': 'book_appointment',
                     'error': 'past_date',
                     'date': state['date']
                 }
-                state['agent_response'] = llm_service.generate_response(context)
+                state['response_context'] = context
                 state['available'] = False
                 return state
         except ValueError:
             pass
     
     # Check availability
-    result = calendar_service.check_availability(state['date'], state['time'])
+    duration = state.get('duration') or settings.APPOINTMENT_DURATION
+    result = prefetch.result(
+        state, ('availability', state['date'], state['time'], duration),
+        calendar_service.check_availability, state['date'], state['time'], duration
+    )
     state['available'] = result.get('available', False)
     
+    # The parsed date or time isn't one the calendar can read
+    if result.get('reason') in ('invalid_date', 'invalid_time'):
+        context = {
+            'intent': state.get('intent'),
+            'error': result['reason'],
+            'date': state['date'],
+            'time': state['time']
+        }
+        state['response_context'] = context
+    
     # Outside business hours
-    if result.get('reason') == 'outside_hours':
+    elif result.get('reason') == 'outside_hours':
         context = {
             'intent': state.get('intent'),
             'error': 'outside_hours',
             'date': state['date'],
             'time': state['time'],
-            'clinic_hours': f"{settings.CLINIC_HOURS_START} to {settings.CLINIC_HOURS_END}"
+            'clinic_hours': CLINIC_HOURS
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
         state['available'] = False
     
     # If slot is available and intent is check_availability, generate response
     elif state['available'] and state.get('intent') == 'check_availability':
-        date_obj = datetime.strptime(state['date'], '%Y-%m-%d')
-        
-        # SAFELY PARSE TIME - handle AM/PM if present
-        time_str = state['time']
-        if 'AM' in time_str.upper() or 'PM' in time_str.upper():
-            time_str = calendar_service._parse_time_to_24h(time_str)
-        
-        time_obj = datetime.strptime(time_str, '%H:%M')
-        formatted_date = date_obj.strftime('%B %d')
-        formatted_time = time_obj.strftime('%I:%M %p').lstrip('0')
+        formatted_date = format_date_str(state['date'])
+        formatted_time = format_time_str(state['time'])
         
         context = {
             'intent': 'check_availability',
@@ -285,57 +331,32 @@ def check_availability_node(state: ConversationState) -> ConversationState:
             'date': formatted_date,
             'time': formatted_time
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
     
     # Slot already booked - find alternatives
     elif not state['available']:
-        date_obj = datetime.strptime(state['date'], '%Y-%m-%d')
-        day_appointments = calendar_service.get_appointments(state['date'])
-        booked_times = [apt['time'] for apt in day_appointments]
+        requested_day = date_to_ordinal(state['date'])
         
-        available_slots = []
-        current_time = datetime.strptime(settings.CLINIC_HOURS_START, '%H:%M').time()
-        end_time = datetime.strptime(settings.CLINIC_HOURS_END, '%H:%M').time()
+        # Skips slots that have already passed when the request is for today
+        free_slots = prefetch.result(
+            state, ('alternatives', state['date'], duration), prefetch.find_alternatives, state['date'], duration
+        )
         
-        while current_time < end_time:
-            time_str = current_time.strftime('%H:%M')
-            if time_str not in booked_times:
-                formatted_time = datetime.strptime(time_str, '%H:%M').strftime('%I:%M %p').lstrip('0')
-                available_slots.append({'time': time_str, 'formatted': formatted_time})
-            
-            temp_dt = datetime.combine(date_obj, current_time) + timedelta(minutes=30)
-            current_time = temp_dt.time()
-        
-        # If no slots available that day, check next day
-        if not available_slots:
-            next_day = date_obj + timedelta(days=1)
-            next_day_str = next_day.strftime('%Y-%m-%d')
-            next_day_appointments = calendar_service.get_appointments(next_day_str)
-            next_booked = [apt['time'] for apt in next_day_appointments]
-            
-            current_time = datetime.strptime(settings.CLINIC_HOURS_START, '%H:%M').time()
-            while current_time < end_time:
-                time_str = current_time.strftime('%H:%M')
-                if time_str not in next_booked:
-                    formatted_time = datetime.strptime(time_str, '%H:%M').strftime('%I:%M %p').lstrip('0')
-                    formatted_date = next_day.strftime('%B %d')
-                    available_slots.append({
-                        'time': time_str,
-                        'formatted': formatted_time,
-                        'date': next_day_str,
-                        'formatted_date': formatted_date
-                    })
-                    break
-                temp_dt = datetime.combine(next_day, current_time) + timedelta(minutes=30)
-                current_time = temp_dt.time()
-        
-        # Format requested time safely
-        requested_time_str = state['time']
-        if 'AM' in requested_time_str.upper() or 'PM' in requested_time_str.upper():
-            requested_time_str = calendar_service._parse_time_to_24h(requested_time_str)
+        available_slots = []
+        for slot in free_slots:
+            formatted_time = format_time(time_to_minutes(slot['time']))
+            if slot['date'] == state['date']:
+                available_slots.append({'time': slot['time'], 'formatted': formatted_time})
+            else:
+                available_slots.append({
+                    'time': slot['time'],
+                    'formatted': formatted_time,
+                    'date': slot['date'],
+                    'formatted_date': format_date_str(slot['date'])
+                })
         
-        requested_time = datetime.strptime(requested_time_str, '%H:%M').strftime('%I:%M %p').lstrip('0')
-        requested_date = date_obj.strftime('%B %d')
+        requested_time = format_time_str(state['time'])
+        requested_date = format_date(requested_day)
         
         context = {
             'intent': state.get('intent'),
@@ -345,7 +366,7 @@ def check_availability_node(state: ConversationState) -> ConversationState:
             'available_slots': available_slots[:3],
             'booked_with': result.get('message', '')
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
     
     print(f"[NODE: CHECK AVAILABILITY] Available: {state['available']}")
     return state
@@ -363,16 +384,8 @@ def book_appointment_node(state: ConversationState) -> ConversationState:
     result = calendar_service.book_appointment(date, time, patient_name, duration)
     
     # Format date and time for LLM context
-    date_obj = datetime.strptime(date, '%Y-%m-%d')
-    
-    # SAFELY PARSE TIME - handle AM/PM if present
-    time_str = time
-    if 'AM' in time_str.upper() or 'PM' in time_str.upper():
-        time_str = calendar_service._parse_time_to_24h(time_str)
-    
-    time_obj = datetime.strptime(time_str, '%H:%M')
-    formatted_date = date_obj.strftime('%B %d')
-    formatted_time = time_obj.strftime('%I:%M %p').lstrip('0')
+    formatted_date = format_date_str(date)
+    formatted_time = format_time_str(time)
     
     if result['success']:
         context = {
@@ -383,14 +396,14 @@ def book_appointment_node(state: ConversationState) -> ConversationState:
             'time': formatted_time,
             'duration': duration
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
     else:
         context = {
             'intent': 'book_appointment',
             'result': 'failure',
             'error_message': result.get('message', 'Could not book appointment')
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
     
     return state
 
@@ -409,26 +422,24 @@ def cancel_appointment_node(state: ConversationState) -> ConversationState:
             'error': 'missing_info',
             'message': 'Please provide the appointment date or patient name to cancel'
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
         return state
     
     result = calendar_service.cancel_appointment(date, time, patient_name)
     
     if result['success']:
         apt = result['appointment']
-        date_obj = datetime.strptime(apt['date'], '%Y-%m-%d')
-        time_obj = datetime.strptime(apt['time'], '%H:%M')
-        formatted_date = date_obj.strftime('%B %d')
-        formatted_time = time_obj.strftime('%I:%M %p').lstrip('0')
+        formatted_date = format_date(apt.day)
+        formatted_time = format_time(apt.start)
         
         context = {
             'intent': 'cancel_appointment',
             'result': 'success',
-            'patient_name': apt['patient_name'],
+            'patient_name': apt.patient_name,
             'date': formatted_date,
             'time': formatted_time
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        state['response_context'] = context
     else:
         context = {
             'intent': 'cancel_appointment',
@@ -438,19 +449,24 @@ def cancel_appointment_node(state: ConversationState) -> ConversationState:
             'time': time,
             'patient_name': patient_name
         }
-        state['agent_response'] = llm_service.generate_response(context)
+        if result.get('suggestions'):
+            context['did_you_mean'] = result['suggestions']
+        state['response_context'] = context
     
     return state
 
 
-def generate_response_node(state: ConversationState) -> ConversationState:
-    """Generate natural language response using LLM"""
-    
+def _response_context(state: ConversationState):
+    """Context to phrase the reply from, or None if a reply is already set"""
     print(f"\n[NODE: GENERATE RESPONSE] Intent: {state.get('intent')}, Pre-set response: {bool(state.get('agent_response'))}")
     
     if state.get('agent_response'):
         print(f"[NODE: GENERATE RESPONSE] Using pre-set response")
-        return state
+        return None
+    
+    # Set by the calendar nodes
+    if state.get('response_context'):
+        return state['response_context']
     
     if state.get('clarification_needed'):
         missing = state.get('missing_fields', [])
@@ -458,7 +474,7 @@ def generate_response_node(state: ConversationState) -> ConversationState:
         
         print(f"[NODE: GENERATE RESPONSE] Generating clarification for missing: {missing}")
         
-        context = {
+        return {
             'intent': intent,
             'clarification_needed': True,
             'missing_fields': missing,
@@ -469,17 +485,77 @@ def generate_response_node(state: ConversationState) -> ConversationState:
             'time': state.get('time'),
             'patient_name': state.get('patient_name')
         }
-        
-        state['agent_response'] = llm_service.generate_response(context)
     
-    if not state.get('agent_response'):
-        print(f"[NODE: GENERATE RESPONSE] No response yet, using LLM fallback")
-        context = {
-            'intent': state.get('intent'),
-            'clarification_needed': state.get('clarification_needed'),
-            'missing_fields': state.get('missing_fields', [])
-        }
-        state['agent_response'] = llm_service.generate_response(context)
+    print(f"[NODE: GENERATE RESPONSE] No response yet, using LLM fallback")
+    return {
+        'intent': state.get('intent'),
+        'clarification_needed': state.get('clarification_needed'),
+        'missing_fields': state.get('missing_fields', [])
+    }
+
+
+def _reply_without_llm(state: ConversationState, context):
+    """A reply that needs no further LLM call: a template, or the text the
+    intent call already wrote when this turn did no calendar work"""
+    reply = _render_locally(context)
+    if not reply and context is not state.get('response_context') and state.get('intent_reply'):
+        print(f"[NODE: GENERATE RESPONSE] Using reply from the intent call")
+        reply = state['intent_reply']
+    return reply
+
+
+def _render_locally(context):
+    """Template reply for the context, or None if the LLM should phrase it"""
+    phrased = settings.LLM_PHRASED_INTENTS
+    if 'all' in phrased or context.get('intent') in phrased:
+        return None
+    reply = render_response(context)
+    if reply:
+        print(f"[NODE: GENERATE RESPONSE] Rendered from template")
+    return reply
+
+
+def generate_response_node(state: ConversationState) -> ConversationState:
+    """Generate the reply from a template, or with the LLM when none applies"""
+    context = _response_context(state)
+    if context is not None:
+        state['agent_response'] = _reply_without_llm(state, context) or llm_service.generate_response(context)
+    
+    print(f"[NODE: GENERATE RESPONSE] Final response: '{state['agent_response']}'")
+    return state
+
+
+async def _astream_reply(context, on_delta):
+    """Stream the LLM's reply to on_delta and return it in full. If the
+    stream breaks partway, the reply comes from a buffered call instead, so
+    the partial text never reaches the history"""
+    pieces = []
+    try:
+        async for piece in llm_service.astream_response(context):
+            pieces.append(piece)
+            on_delta(piece)
+    except LLMUnavailable as e:
+        print(f"[NODE: GENERATE RESPONSE] Stream interrupted ({e}), replacing the partial reply")
+        return await llm_service.agenerate_response(context)
+    return "".join(pieces).strip()
+
+
+async def agenerate_response_node(state: ConversationState, config=None) -> ConversationState:
+    """generate_response_node for async graph runs. If the run's config has
+    an `on_delta` callback, the reply is passed to it piece by piece as the
+    LLM streams it (templates and preset replies arrive as one piece)."""
+    on_delta = ((config or {}).get('configurable') or {}).get('on_delta')
+    context = _response_context(state)
+    if context is not None:
+        reply = _reply_without_llm(state, context)
+        if not reply and on_delta:
+            state['agent_response'] = await _astream_reply(context, on_delta)
+            print(f"[NODE: GENERATE RESPONSE] Final response: '{state['agent_response']}'")
+            return state
+        state['agent_response'] = reply or await llm_service.agenerate_response(context)
+    
+    if on_delta:
+        on_delta(state['agent_response'])
     
     print(f"[NODE: GENERATE RESPONSE] Final response: '{state['agent_response']}'")
     return state
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from backend.config import settings
+from backend.services.calendar_service import calendar_service
+from backend.services.time_utils import date_to_ordinal, today_ordinal, minutes_to_time
+
+# Calendar lookups a turn is likely to need, started as soon as its date is
+# known (after parsing, or before the LLM parses a follow-up to a pending
+# request) so they overlap with the LLM call and with each other. Futures
+# live in state['prefetched'], keyed like the node call they stand in for.
+
+_pool = ThreadPoolExecutor(max_workers=settings.PREFETCH_WORKERS, thread_name_prefix="calendar-prefetch")
+
+
+def alternatives_after(date_str):
+    """Earliest time to offer on date_str: now if it's today, else None
+    (from opening time)"""
+    try:
+        if date_to_ordinal(date_str) == today_ordinal():
+            now = datetime.now()
+            return minutes_to_time(now.hour * 60 + now.minute)
+    except ValueError:
+        pass
+    return None
+
+
+def find_alternatives(date_str, duration):
+    """The free slots offered when the requested one is taken"""
+    return calendar_service.find_free_slots(date_str, after_time=alternatives_after(date_str), duration=duration, count=3)
+
+
+def _lookups(slots):
+    """(key, function, args) for the calendar calls a request with these
+    slots is likely to make"""
+    intent = slots.get('intent')
+    date = slots.get('date')
+    if not date:
+        return []
+    if intent in ('book_appointment', 'check_availability'):
+        duration = slots.get('duration') or settings.APPOINTMENT_DURATION
+        lookups = [(('alternatives', date, duration), find_alternatives, (date, duration))]
+        if slots.get('time'):
+            lookups.append((
+                ('availability', date, slots['time'], duration),
+                calendar_service.check_availability, (date, slots['time'], duration)
+            ))
+        return lookups
+    if intent == 'list_appointments' and not slots.get('start_date'):
+        return [(('day', date), calendar_service.get_appointments, (date,))]
+    return []
+
+
+def start(state, slots):
+    """Start the lookups for `slots` (an intent dict or a pending frame) in
+    the background, unless already started this turn"""
+    if not settings.CALENDAR_PREFETCH:
+        return
+    futures = state.get('prefetched')
+    if futures is None:
+        futures = state['prefetched'] = {}
+    for key, function, args in _lookups(slots):
+        if key not in futures:
+            futures[key] = _pool.submit(function, *args)
+
+
+def result(state, key, function, *args):
+    """The prefetched result for key, or function(*args) if it wasn't started"""
+    future = (state.get('prefetched') or {}).pop(key, None)
+    if future is not None:
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"[PREFETCH] {key[0]} lookup failed, running it again: {e}")
+    return function(*args)
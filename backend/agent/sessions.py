@@ -0,0 +1,89 @@
+import asyncio
+import contextlib
+import threading
+from collections import deque
+from backend.services.ttl_cache import TTLCache
+
+# Used by callers with no session of their own (CLI, scripts, tests)
+DEFAULT_SESSION = "default"
+# Turns of history kept per conversation
+HISTORY_TURNS = 5
+# Seconds between checks while an async turn waits on a sync one
+TURN_POLL_INTERVAL = 0.01
+
+
+class Session:
+    """One conversation: its recent turns, the request waiting on a
+    clarification if any, and the locks guarding them"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.history = deque(maxlen=HISTORY_TURNS)
+        # Slot frame from intent_rules.pending_frame, or None
+        self.pending = None
+        self._lock = threading.Lock()
+        # Held for a whole turn, sync or async, so a message sees the turn
+        # sent before it
+        self.turn_lock = threading.Lock()
+        # Queues async turns for turn_lock; an asyncio.Lock belongs to one
+        # event loop, so it's made in the running loop (see aturn)
+        self._async_lock = None
+        self._async_loop = None
+
+    @contextlib.asynccontextmanager
+    async def aturn(self):
+        """Hold turn_lock for an async turn without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async_lock is None or self._async_loop is not loop:
+                self._async_lock = asyncio.Lock()
+                self._async_loop = loop
+            async_lock = self._async_lock
+        async with async_lock:
+            # Only a sync turn can be holding it now; poll rather than block the loop
+            while not self.turn_lock.acquire(blocking=False):
+                await asyncio.sleep(TURN_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                self.turn_lock.release()
+    
+    def snapshot(self):
+        """The history as a list, safe to hand to a turn"""
+        with self._lock:
+            return list(self.history)
+
+    def record(self, user_message, agent_response, pending=None):
+        """Add a turn; `pending` replaces the pending request"""
+        with self._lock:
+            self.history.append({
+                'user': user_message,
+                'agent': agent_response
+            })
+            self.pending = pending
+
+
+class SessionStore:
+    """Conversations by session ID, bounded to `maxsize` with the least
+    recently used dropped first, and dropped after `idle_ttl` seconds
+    without a message."""
+
+    def __init__(self, maxsize, idle_ttl):
+        self._sessions = TTLCache(maxsize, idle_ttl)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """The session for this ID, created if new or expired"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id)
+            # Re-set on every use so the idle timer restarts
+            self._sessions.set(session_id, session)
+            return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        return self._sessions.stats()
@@ -21,11 +21,18 @@ class ConversationState(TypedDict):
     
     # Response generation
     agent_response: str
+    response_context: Optional[Dict[str, Any]]  # what the reply should say, phrased by the respond node
+    intent_reply: Optional[str]                 # clarification written by the intent call, if any
     
     # Conversation management
     conversation_history: List[Dict[str, str]]
     clarification_needed: bool
     missing_fields: List[str]
+    pending_intent: Optional[Dict[str, Any]]    # slots of a request awaiting clarification
+    
+    # Performance
+    prefetched: Dict[str, Any]                  # calendar lookups started early, see agent/prefetch.py
+    node_timings: Dict[str, float]              # wall time per node this turn, in ms
     
     # Error handling
     error: Optional[str]
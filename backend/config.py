@@ -13,6 +13,72 @@ class Settings:
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
     OPENROUTER_API_URL = "https://openrouter.ai/api/v1"
     
+    # Keep-alive connection pool shared by every LLM call
+    LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "4"))   # distinct hosts kept pooled
+    LLM_POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "16"))          # open connections per host
+    # Async client (FastAPI endpoints): total connections for concurrent conversations
+    LLM_ASYNC_MAX_CONNECTIONS = int(os.getenv("LLM_ASYNC_MAX_CONNECTIONS", "200"))
+    
+    # Intents whose replies the LLM phrases instead of the local templates
+    # (comma-separated, or "all"); everything else is rendered without an LLM call
+    LLM_PHRASED_INTENTS = {
+        intent.strip() for intent in os.getenv("LLM_PHRASED_INTENTS", "").split(",") if intent.strip()
+    }
+    
+    # Conversations kept in memory: least recently used dropped past
+    # SESSION_MAX, any dropped after SESSION_IDLE_TTL seconds without a message
+    SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+    SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+    
+    # LLM call policy: per-attempt timeouts, jittered exponential backoff
+    # between attempts, and a deadline on all LLM time within one turn
+    LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+    LLM_INTENT_TIMEOUT = float(os.getenv("LLM_INTENT_TIMEOUT", "15"))
+    LLM_RESPONSE_TIMEOUT = float(os.getenv("LLM_RESPONSE_TIMEOUT", "10"))
+    LLM_TURN_DEADLINE = float(os.getenv("LLM_TURN_DEADLINE", "25"))
+    LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+    LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "2"))
+    # Hedging: a second identical request once the first is slower than the
+    # recent p95 (never sooner than LLM_HEDGE_MIN_DELAY seconds)
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+    LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+    LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+    # Circuit breaker: after this many consecutive failures, skip the LLM
+    # (templates and fallback replies only) for LLM_BREAKER_RESET seconds
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+    
+    # LLM-phrased replies, cached by their response context (0 entries disables)
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))   # seconds
+    # Per-intent overrides, "intent:seconds,..."
+    RESPONSE_CACHE_TTLS = {
+        intent.strip(): int(seconds)
+        for intent, _, seconds in (
+            item.partition(":") for item in os.getenv(
+                "RESPONSE_CACHE_TTLS", "list_appointments:300,check_availability:300"
+            ).split(",") if item.strip()
+        )
+    }
+    # Also cache replies whose context lists patients (appointment lists, name suggestions)
+    RESPONSE_CACHE_PATIENT_LISTS = os.getenv("RESPONSE_CACHE_PATIENT_LISTS", "false").lower() == "true"
+    
+    # parse_intent results for repeated messages (0 entries disables); set
+    # INTENT_CACHE_PATH to an SQLite file to keep them across restarts
+    INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "2048"))
+    INTENT_CACHE_PATH = os.getenv("INTENT_CACHE_PATH", "")
+    
+    # Intent-parsing system prompt: "full" (all few-shot examples) or "compact"
+    INTENT_PROMPT = os.getenv("INTENT_PROMPT", "full").lower()
+    
+    # Have the intent call also write the clarification question, saving a
+    # second LLM call on turns that need no calendar lookup. Only used when
+    # LLM_PHRASED_INTENTS is set; templates word clarifications otherwise
+    INTENT_WITH_REPLY = os.getenv("INTENT_WITH_REPLY", "true").lower() == "true"
+    
+    # Rule-based intent parses at or above this confidence (0-1) skip the LLM
+    INTENT_RULES_MIN_CONFIDENCE = float(os.getenv("INTENT_RULES_MIN_CONFIDENCE", "0.9"))
+    
     # Cronofy Calendar API
     #CRONOFY_ACCESS_TOKEN = os.getenv("CRONOFY_ACCESS_TOKEN")
     #CRONOFY_REFRESH_TOKEN = os.getenv("CRONOFY_REFRESH_TOKEN")
@@ -24,9 +90,27 @@ class Settings:
     CLINIC_HOURS_END = os.getenv("CLINIC_HOURS_END", "18:00")
     APPOINTMENT_DURATION = int(os.getenv("APPOINTMENT_DURATION", "30"))
     
+    # Calendar storage: "mock" (in-memory demo data) or "sqlite"
+    CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", "mock").lower()
+    CALENDAR_DB_PATH = os.getenv("CALENDAR_DB_PATH", str(Path(__file__).parent.parent / "calendar.db"))
+    # Start likely calendar lookups as soon as a request's date is known,
+    # overlapping them with the LLM and with each other
+    CALENDAR_PREFETCH = os.getenv("CALENDAR_PREFETCH", "true").lower() == "true"
+    PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "8"))
+    
+    # Minimum confidence (0-1) for acting on a fuzzy patient-name match
+    PATIENT_MATCH_THRESHOLD = float(os.getenv("PATIENT_MATCH_THRESHOLD", "0.8"))
+    
     # TTS Settings
     TTS_RATE = 150
     TTS_VOLUME = 1.0
+    # Channels whose replies are spoken on the server's speakers
+    # (comma-separated: chat, stream, ws, voice, cli; or "all")
+    SPEAK_CHANNELS = {
+        channel.strip() for channel in os.getenv("SPEAK_CHANNELS", "all").split(",") if channel.strip()
+    }
+    # Replies waiting for the speech worker; the oldest is dropped when full
+    TTS_QUEUE_SIZE = int(os.getenv("TTS_QUEUE_SIZE", "8"))
     
     # Timeouts
     API_TIMEOUT = 10
@@ -1,14 +1,41 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from backend.agent.agent import appointment_agent
+from backend.agent.graph import node_timing_stats
+from backend.services import metrics
+from backend.services.llm_service import llm_service
 from backend.services.stt_service import stt_service
 from backend.services.tts_service import tts_service
 import os
 
+# Clients name their conversation with this header, or get a cookie
+SESSION_HEADER = "X-Session-ID"
+SESSION_COOKIE = "session_id"
+MAX_SESSION_ID_LENGTH = 128
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close pooled LLM connections on shutdown
+    await llm_service.aclose()
+
+# Gauges and counters /metrics reads from the services when scraped
+metrics.LLM_CIRCUIT_OPEN.set_function(lambda: int(llm_service.breaker.state == "open"))
+metrics.LLM_RETRIES.set_function(lambda: llm_service.retries)
+metrics.LLM_HEDGES.set_function(lambda: llm_service.hedges_sent)
+metrics.SESSIONS.set_function(lambda: len(appointment_agent.sessions))
+metrics.TTS_QUEUE.set_function(lambda: tts_service.stats()["queued"])
+metrics.TTS_DROPPED.set_function(lambda: tts_service.dropped)
+
 # Initialize FastAPI app
-app = FastAPI(title="Smart Calendar Assistant", version="1.0")
+app = FastAPI(title="Smart Calendar Assistant", version="1.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -32,6 +59,18 @@ class ChatResponse(BaseModel):
     response: str
     intent: str = None
 
+def resolve_session(connection):
+    """Session ID from the header or cookie, or a new one; returns
+    (session_id, is_new)"""
+    session_id = connection.headers.get(SESSION_HEADER) or connection.cookies.get(SESSION_COOKIE)
+    if session_id and len(session_id) <= MAX_SESSION_ID_LENGTH:
+        return session_id, False
+    return uuid.uuid4().hex, True
+
+def remember_session(response, session_id, is_new):
+    if is_new:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -45,14 +84,33 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/stats")
+async def stats():
+    """LLM cache counters, circuit breaker state, call latencies, sessions,
+    the speech queue and time per graph node"""
+    return {
+        **llm_service.stats(),
+        "sessions": appointment_agent.sessions.stats(),
+        "tts": tts_service.stats(),
+        "nodes": node_timing_stats()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Latency histograms, in-flight gauges and error counters per graph
+    node, LLM request, transcription and spoken reply, for Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Text chat endpoint
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request, response: Response):
     """Process text-based chat message"""
     print(f"\n[API] Received message: '{request.message}'")
+    session_id, is_new = resolve_session(http_request)
+    remember_session(response, session_id, is_new)
     
     try:
-        result = appointment_agent.process_message(request.message)
+        result = await appointment_agent.aprocess_message(request.message, session_id=session_id, channel="chat")
         
         return ChatResponse(
             success=result.get('success', False),
@@ -66,16 +124,35 @@ async def chat(request: ChatRequest):
             response="Sorry, I encountered an error processing your request."
         )
 
+# Streaming chat endpoint (server-sent events)
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Process a text message, sending the reply as it is generated:
+    `delta` events with text pieces, then one `final` event whose message
+    replaces them"""
+    print(f"\n[API] Received message (stream): '{request.message}'")
+    session_id, is_new = resolve_session(http_request)
+    
+    async def events():
+        async for event in appointment_agent.astream_message(request.message, session_id=session_id, channel="stream"):
+            yield f"data: {json.dumps(event)}\n\n"
+    
+    response = StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    remember_session(response, session_id, is_new)
+    return response
+
 # Voice conversation endpoint
 @app.post("/voice")
-async def voice_conversation():
+async def voice_conversation(http_request: Request, response: Response):
     """Handle voice-based conversation (STT -> Agent -> TTS)"""
     print("\n[API] Starting voice conversation...")
+    session_id, is_new = resolve_session(http_request)
+    remember_session(response, session_id, is_new)
     
     try:
         # Step 1: Listen to user
         print("[API] Listening for user input...")
-        user_text = stt_service.listen_once()
+        user_text = await asyncio.to_thread(stt_service.listen_once)
         
         if not user_text:
             return {
@@ -86,7 +163,7 @@ async def voice_conversation():
         print(f"[API] User said: '{user_text}'")
         
         # Step 2: Process with agent
-        result = appointment_agent.process_message(user_text)
+        result = await appointment_agent.aprocess_message(user_text, session_id=session_id, channel="voice")
         
         return {
             "success": result.get('success', False),
@@ -107,21 +184,18 @@ async def voice_conversation():
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket for real-time communication"""
     await websocket.accept()
-    print("[WS] Client connected")
+    # Without a header or cookie, the connection is the conversation
+    session_id, _ = resolve_session(websocket)
+    print(f"[WS] Client connected (session {session_id})")
     
     try:
         while True:
             data = await websocket.receive_text()
             print(f"[WS] Received: '{data}'")
             
-            result = appointment_agent.process_message(data)
-            
-            await websocket.send_json({
-                "type": "response",
-                "message": result.get('response'),
-                "intent": result.get('intent'),
-                "success": result.get('success')
-            })
+            # "delta" messages as the reply is generated, then a "final" one
+            async for event in appointment_agent.astream_message(data, session_id=session_id, channel="ws"):
+                await websocket.send_json(event)
             
     except WebSocketDisconnect:
         print("[WS] Client disconnected")
@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from backend.services.time_utils import ordinal_to_date, minutes_to_time
+
+
+@dataclass(slots=True, eq=False)
+class Appointment:
+    """One booking. Date and time are kept as integers so the calendar can
+    compare and sort them directly; strings are only produced at the edges.
+
+    Compared by identity: two bookings with the same fields are still two bookings."""
+
+    day: int            # date.toordinal()
+    start: int          # minutes since midnight
+    patient_name: str
+    duration: int
+    status: str = "confirmed"
+    id: str = None
+    series: object = None   # the recurring Series this is an occurrence of, if any
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    @property
+    def date_str(self):
+        return ordinal_to_date(self.day)
+
+    @property
+    def time_str(self):
+        return minutes_to_time(self.start)
+
+    def to_dict(self):
+        """The string-keyed layout used by the API and the agent state"""
+        return {
+            "id": self.id,
+            "date": self.date_str,
+            "time": self.time_str,
+            "patient_name": self.patient_name,
+            "duration": self.duration,
+            "status": self.status,
+            "series_id": self.series.id if self.series else None
+        }
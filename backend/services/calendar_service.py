@@ -1,98 +1,299 @@
-from datetime import datetime, timedelta
+import bisect
+import contextlib
+import heapq
+import itertools
+import threading
 from backend.config import settings
+from backend.services.appointment import Appointment
+from backend.services.time_utils import (
+    CLINIC_OPEN, CLINIC_CLOSE, CLINIC_HOURS,
+    date_to_ordinal, ordinal_to_date, today_ordinal, time_to_minutes, minutes_to_time, parse_time
+)
+from backend.services.recurrence import FREQUENCIES, Series
+from backend.services.patient_index import PatientNameIndex, normalize_name, name_similarity
 
+# A fuzzy patient match must beat the runner-up by this much to be used
+PATIENT_MATCH_MARGIN = 0.1
 
-class MockCalendarService:
+
+def _overlap_in(starts, day, start, end):
+    """Return the appointment in a sorted, non-overlapping day that
+    overlaps [start, end) minutes, if any"""
+    pos = bisect.bisect_left(starts, end)
+    # Only the latest appointment starting before `end` can reach into the window
+    if pos > 0:
+        apt = day[pos - 1]
+        if starts[pos - 1] + apt.duration > start:
+            return apt
+    return None
+
+
+class _DateIndex:
+    """Appointments grouped by date and ordered by start time, with the
+    dates themselves kept sorted so ranges are a seek plus a linear walk"""
     
     def __init__(self):
-        self.appointments = self._initialize_mock_data()
-        print("[CALENDAR] Mock calendar service initialized")
-        print(f"[CALENDAR] Loaded {len(self.appointments)} mock appointments")
-        
+        self.days = {}   # date ordinal -> (sorted start minutes, appointments in the same order)
+        self.dates = []  # sorted keys of self.days
+        # Callers serialise writes per date; the shared date list needs its own lock
+        self._dates_lock = threading.Lock()
+    
+    def day(self, day):
+        return self.days.get(day, ((), ()))
+    
+    def add(self, apt):
+        entry = self.days.get(apt.day)
+        if entry is None:
+            entry = self.days[apt.day] = ([], [])
+            with self._dates_lock:
+                bisect.insort(self.dates, apt.day)
+        starts, day = entry
+        pos = bisect.bisect_right(starts, apt.start)
+        starts.insert(pos, apt.start)
+        day.insert(pos, apt)
+    
+    def remove(self, apt):
+        entry = self.days.get(apt.day)
+        if not entry:
+            return
+        starts, day = entry
+        minute = apt.start
+        pos = bisect.bisect_left(starts, minute)
+        while pos < len(starts) and starts[pos] == minute:
+            if day[pos] is apt:
+                del starts[pos]
+                del day[pos]
+                break
+            pos += 1
+        if not starts:
+            del self.days[apt.day]
+            with self._dates_lock:
+                del self.dates[bisect.bisect_left(self.dates, apt.day)]
+    
+    def range(self, start_day=None, end_day=None):
+        """Yield appointments dated start_day..end_day (inclusive, either end open)"""
+        with self._dates_lock:
+            pos = bisect.bisect_left(self.dates, start_day) if start_day is not None else 0
+            stop = bisect.bisect_right(self.dates, end_day) if end_day is not None else len(self.dates)
+            dates = self.dates[pos:stop]
+        for day in dates:
+            # A concurrent remove may have emptied and dropped the day since
+            yield from tuple(self.day(day)[1])
+
+
+class BaseCalendarService:
+    """Scheduling rules shared by every calendar backend.
+    
+    Subclasses only provide the storage primitives below; validation, clinic
+    hours, conflict detection and free-slot search live here."""
+    
     def _parse_time_to_24h(self, time_str):
         """Convert time formats like '09:30 AM', '2 PM', '14:00' to 24-hour format HH:MM"""
-        try:
-            if not time_str:
-                return None
-            
-            time_str = time_str.strip()
-            
-            # Remove extra spaces
-            time_str = ' '.join(time_str.split())
-            
-            # Try 12-hour format with AM/PM first (e.g., "09:30 AM", "2 PM")
-            if "AM" in time_str.upper() or "PM" in time_str.upper():
-                # Handle both "09:30 AM" and "9 AM" formats
-                try:
-                    if ":" in time_str:
-                        time_24 = datetime.strptime(time_str, "%I:%M %p").time()
-                    else:
-                        time_24 = datetime.strptime(time_str, "%I %p").time()
-                    return time_24.strftime("%H:%M")
-                except ValueError:
-                    pass
-            
-            # Try 24-hour format (e.g., "14:00", "09:30")
-            if ":" in time_str:
-                parts = time_str.split(":")
-                if len(parts) == 2:
-                    hour = int(parts[0].strip())
-                    minute = int(parts[1].strip())
-                    if 0 <= hour <= 23 and 0 <= minute <= 59:
-                        return f"{hour:02d}:{minute:02d}"
-            
+        time_24h = parse_time(time_str)
+        if time_str and not time_24h:
             print(f"[CALENDAR] Could not parse time: '{time_str}'")
-            return None
+        return time_24h
+
+    def _find_at(self, day, minute):
+        """Return the confirmed appointment starting at day/minute, if any"""
+        starts, day = self._day_bookings(day)
+        pos = bisect.bisect_left(starts, minute)
+        if pos < len(starts) and starts[pos] == minute:
+            return day[pos]
+        return None
+
+    def _find_overlap(self, day, start, end):
+        """Return a confirmed appointment overlapping [start, end) minutes, if any"""
+        starts, day = self._day_bookings(day)
+        return _overlap_in(starts, day, start, end)
+
+    def _find_to_cancel(self, day, minute=None, patient_name=None):
+        """Date-scoped cancellation lookup: by time first, then by patient name,
+        exact or fuzzy among that day's patients. Returns (appointment, confidence, suggestions)."""
+        if minute is not None:
+            apt = self._find_at(day, minute)
+            if apt:
+                return apt, 1.0, []
+        if patient_name:
+            apt = self._find_for_patient(patient_name, day)
+            if apt:
+                return apt, 1.0, []
+            day_appointments = self._day_bookings(day)[1]
+            return self._pick_match(patient_name, [(apt.patient_name, apt) for apt in day_appointments])
+        return None, 0.0, []
+
+    def _cancel_by_patient(self, patient_name):
+        """Cancel the earliest future appointment of the best-matching patient.
+        Returns (appointment, confidence, suggestions); appointment is None if nothing was cancelled."""
+        matches = self.find_patient(patient_name)
+        apt, confidence, suggestions = self._pick_match(
+            patient_name, [(m["patient_name"], m["next_appointment"]) for m in matches]
+        )
+        if apt:
+            with self._booking_transaction(apt.day):
+                if self._cancel(apt):
+                    return apt, confidence, []
+            return None, 0.0, []
+        return None, 0.0, suggestions
+
+    @staticmethod
+    def _pick_match(patient_name, candidates):
+        """Choose among (patient name, appointment) candidates, in preference order.
         
-        except Exception as e:
-            print(f"[CALENDAR] Time parsing error for '{time_str}': {e}")
-            return None
+        Returns (appointment, confidence, suggestions). The appointment is None
+        when no name clears PATIENT_MATCH_THRESHOLD or the top two are too close
+        to call; suggestions then lists the closest names."""
+        query = normalize_name(patient_name)
+        best = {}
+        for name, apt in candidates:
+            key = normalize_name(name)
+            if key not in best:
+                best[key] = (name_similarity(query, key), name, apt)
+        ranked = sorted(best.values(), key=lambda match: -match[0])
+        
+        if ranked:
+            score, _, apt = ranked[0]
+            clear_winner = len(ranked) == 1 or score == 1.0 or score - ranked[1][0] >= PATIENT_MATCH_MARGIN
+            if score >= settings.PATIENT_MATCH_THRESHOLD and clear_winner:
+                return apt, score, []
+        return None, 0.0, [name for score, name, _ in ranked[:3] if score >= 0.5]
 
-    
-    def _initialize_mock_data(self):
-        today = datetime.now()
-        appointments = []
-        
-        tomorrow = today + timedelta(days=1)
-        appointments.extend([
-            {
-                "id": "mock_1",
-                "date": tomorrow.strftime("%Y-%m-%d"),
-                "time": "09:00",
-                "patient_name": "Alice Johnson",
-                "duration": 30,
-                "status": "confirmed"
-            },
-            {
-                "id": "mock_2",
-                "date": tomorrow.strftime("%Y-%m-%d"),
-                "time": "10:30",
-                "patient_name": "Bob Smith",
-                "duration": 30,
-                "status": "confirmed"
-            },
-            {
-                "id": "mock_3",
-                "date": tomorrow.strftime("%Y-%m-%d"),
-                "time": "14:00",
-                "patient_name": "Carol White",
-                "duration": 30,
-                "status": "confirmed"
+    @staticmethod
+    def _cancel_result(apt, confidence=1.0, suggestions=None):
+        if not apt:
+            result = {
+                "success": False,
+                "error": "not_found",
+                "message": "No matching appointment found to cancel"
             }
-        ])
-        
-        day_after = today + timedelta(days=2)
-        appointments.append({
-            "id": "mock_4",
-            "date": day_after.strftime("%Y-%m-%d"),
-            "time": "11:00",
-            "patient_name": "David Brown",
-            "duration": 30,
-            "status": "confirmed"
-        })
+            if suggestions:
+                result["suggestions"] = suggestions
+            return result
+        result = {
+            "success": True,
+            "appointment": apt,
+            "message": f"Appointment cancelled for {apt.patient_name} on {apt.date_str} at {apt.time_str}"
+        }
+        if confidence < 1.0:
+            result["match_confidence"] = round(confidence, 3)
+        return result
+
+    def _clinic_window(self):
+        """Clinic opening and closing time in minutes since midnight"""
+        return CLINIC_OPEN, CLINIC_CLOSE
+
+    def _booking_transaction(self, day):
+        """Context manager making check-then-write sequences on a date atomic"""
+        return contextlib.nullcontext()
+
+    def _series_transaction(self, days):
+        """Like _booking_transaction, covering every date a recurring series touches"""
+        return contextlib.nullcontext()
+
+    def _day_bookings(self, day):
+        """(sorted start minutes, confirmed appointments in the same order) for a
+        date ordinal, including occurrences of recurring series"""
+        starts, day_appointments = self._stored_day(day)
+        occurrences = [series.occurrence(day) for series in self._series_on(day)]
+        if not occurrences:
+            return starts, day_appointments
+        merged = sorted([*day_appointments, *occurrences], key=lambda apt: apt.start)
+        return [apt.start for apt in merged], merged
+
+    def _find_for_patient(self, patient_name, day=None):
+        """Earliest confirmed appointment or series occurrence for a patient on
+        the given date ordinal, or from today on"""
+        best = self._find_stored_for_patient(patient_name, day)
+        today = today_ordinal()
+        for series in self._series_for_patient(patient_name):
+            next_day = series.next_day(today, on_day=day)
+            if next_day is not None and (best is None or (next_day, series.start) < (best.day, best.start)):
+                best = series.occurrence(next_day)
+        return best
+
+    def _cancel(self, apt):
+        """Cancel a stored appointment or a single occurrence of a series"""
+        if apt.series is not None:
+            return self._cancel_occurrence(apt.series, apt.day)
+        return self._mark_cancelled(apt)
+
+    # Storage primitives implemented by each backend
+
+    def _stored_day(self, day):
+        """(sorted start minutes, confirmed one-off appointments in the same order) for a date ordinal"""
+        raise NotImplementedError
+
+    def _range(self, start_day, end_day, status):
+        """Appointments between two date ordinals (inclusive, None for open) ordered
+        by date and time; None if status is unknown"""
+        raise NotImplementedError
+
+    def _insert(self, apt):
+        """Persist a new Appointment, set its id and return it as the event id"""
+        raise NotImplementedError
+
+    def _mark_cancelled(self, apt):
+        """Flag a stored appointment as cancelled; False if it no longer was confirmed"""
+        raise NotImplementedError
+
+    def _find_stored_for_patient(self, patient_name, day=None):
+        """Earliest confirmed one-off appointment for a patient on the given date ordinal, or from today on"""
+        raise NotImplementedError
+
+    def _patient_candidates(self, patient_name, limit=20):
+        """(name key, patient name) pairs of stored names sharing the most trigrams with patient_name"""
+        raise NotImplementedError
+
+    def _insert_series(self, series):
+        """Persist a new Series, set its id and return it"""
+        raise NotImplementedError
+
+    def _get_series(self, series_id):
+        """The stored Series with this id, or None"""
+        raise NotImplementedError
+
+    def _series_on(self, day):
+        """Confirmed series with a live occurrence on a date ordinal"""
+        raise NotImplementedError
+
+    def _series_between(self, start_day, end_day):
+        """Series of any status whose span overlaps two date ordinals (inclusive, None for open)"""
+        raise NotImplementedError
+
+    def _series_for_patient(self, patient_name):
+        """Confirmed series booked under exactly this (case-insensitive) name"""
+        raise NotImplementedError
+
+    def _cancel_occurrence(self, series, day):
+        """Record a cancelled occurrence; False if it was not live"""
+        raise NotImplementedError
+
+    def _mark_series_cancelled(self, series):
+        """Flag a whole series as cancelled; False if it no longer was confirmed"""
+        raise NotImplementedError
+
+    def find_patient(self, patient_name, limit=5):
+        """Patients with upcoming appointments whose names resemble patient_name,
+        best match first, each with a confidence score and next appointment"""
+        print(f"[CALENDAR] Looking up patient '{patient_name}'")
         
-        return appointments
-    
+        query = normalize_name(patient_name)
+        matches = []
+        for key, name in self._patient_candidates(patient_name, limit):
+            confidence = name_similarity(query, key)
+            if confidence < 0.5:
+                continue
+            apt = self._find_for_patient(name)
+            if apt:
+                matches.append({
+                    "patient_name": apt.patient_name,
+                    "confidence": round(confidence, 3),
+                    "next_appointment": apt
+                })
+        
+        matches.sort(key=lambda match: -match["confidence"])
+        return matches[:limit]
+
     def list_calendars(self):
         print("[CALENDAR] Fetching calendar list...")
         return [{"calendar_id": "mock_cal_1", "name": "Primary Calendar"}]
@@ -101,7 +302,7 @@ class MockCalendarService:
         print(f"[CALENDAR] Fetching appointments for {date_str}")
         
         try:
-            target_date = datetime.strptime(date_str, "%Y-%m-%d")
+            day = date_to_ordinal(date_str)
         except ValueError:
             print(f"[CALENDAR] Invalid date format: {date_str}")
             return {
@@ -110,10 +311,7 @@ class MockCalendarService:
                 "message": "Invalid date format"
             }
         
-        day_appointments = [
-            apt for apt in self.appointments 
-            if apt["date"] == date_str and apt["status"] == "confirmed"
-        ]
+        day_appointments = list(self._day_bookings(day)[1])
         
         print(f"[CALENDAR] Found {len(day_appointments)} appointments")
         
@@ -133,17 +331,41 @@ class MockCalendarService:
                 return []
         else:
             # Return all future appointments
-            from datetime import datetime
-            today = datetime.now().date()
-            return [
-                apt for apt in self.appointments 
-                if datetime.strptime(apt['date'], '%Y-%m-%d').date() >= today 
-                and apt['status'] == 'confirmed'
-            ]
-
-    def check_availability(self, date_str, time_str):
-        """Check if a time slot is available"""
+            return self.get_appointments_range(ordinal_to_date(today_ordinal()))
+
+    def get_appointments_range(self, start_date=None, end_date=None, status="confirmed"):
+        """Appointments dated start_date..end_date inclusive, ordered by date and time.
+        Either end may be None for an open range; status=None returns every status."""
+        print(f"[CALENDAR] Fetching appointments from {start_date or 'beginning'} to {end_date or 'end'} (status={status})")
+        
+        try:
+            start_day = date_to_ordinal(start_date) if start_date else None
+            end_day = date_to_ordinal(end_date) if end_date else None
+        except ValueError:
+            print(f"[CALENDAR] Invalid date range: {start_date} to {end_date}")
+            return []
+        
+        appointments = self._range(start_day, end_day, status)
+        if appointments is None:
+            print(f"[CALENDAR] Unknown appointment status: {status}")
+            return []
+        
+        # Expand recurring series over the requested window only
+        occurrences = [
+            apt
+            for series in self._series_between(start_day, end_day)
+            for apt in map(series.occurrence, series.days(start_day, end_day))
+            if status is None or apt.status == status
+        ]
+        if occurrences:
+            occurrences.sort(key=lambda apt: (apt.day, apt.start))
+            appointments = list(heapq.merge(appointments, occurrences, key=lambda apt: (apt.day, apt.start)))
+        return appointments
+
+    def check_availability(self, date_str, time_str, duration=None):
+        """Check if a time slot of `duration` minutes is available"""
         print(f"[CALENDAR] Checking availability for {date_str} at {time_str}")
+        duration = duration or settings.APPOINTMENT_DURATION
         
         # Convert time to 24-hour format
         time_24h = self._parse_time_to_24h(time_str)
@@ -156,34 +378,86 @@ class MockCalendarService:
             }
         
         try:
-            clinic_start = datetime.strptime(settings.CLINIC_HOURS_START, "%H:%M").time()
-            clinic_end = datetime.strptime(settings.CLINIC_HOURS_END, "%H:%M").time()
-            target_time = datetime.strptime(time_24h, "%H:%M").time()
+            day = date_to_ordinal(date_str)
+        except ValueError:
+            print(f"[CALENDAR] Invalid date format: {date_str}")
+            return {
+                "available": False,
+                "reason": "invalid_date",
+                "message": "Invalid date format"
+            }
+        
+        try:
+            clinic_start, clinic_end = self._clinic_window()
+            target_start = time_to_minutes(time_24h)
+            target_end = target_start + duration
             
-            if not (clinic_start <= target_time < clinic_end):
+            if not (clinic_start <= target_start and target_end <= clinic_end):
                 print("[CALENDAR] Time outside business hours")
                 return {
                     "available": False,
                     "reason": "outside_hours",
-                    "message": f"Clinic hours are {settings.CLINIC_HOURS_START} to {settings.CLINIC_HOURS_END}"
+                    "message": f"Clinic hours are {CLINIC_HOURS}"
                 }
         except ValueError as e:
             print(f"[CALENDAR] Error checking hours: {e}")
             return {"available": False, "reason": "invalid_time"}
         
-        # Check if slot is already booked
-        for apt in self.appointments:
-            if apt["date"] == date_str and apt["time"] == time_24h and apt["status"] == "confirmed":
-                print("[CALENDAR] Time slot is already booked")
-                return {
-                    "available": False,
-                    "reason": "booked",
-                    "message": f"That time slot is already booked with {apt['patient_name']}"
-                }
+        # Check if the slot overlaps an existing booking
+        apt = self._find_overlap(day, target_start, target_end)
+        if apt:
+            print("[CALENDAR] Time slot is already booked")
+            return {
+                "available": False,
+                "reason": "booked",
+                "message": f"That time slot is already booked with {apt.patient_name}"
+            }
         
         print("[CALENDAR] Time slot is available")
         return {"available": True}
 
+    def find_free_slots(self, date_str, after_time=None, duration=None, count=3, max_days=30):
+        """Find the first `count` free slots of `duration` minutes at or after
+        `after_time` on `date_str`, continuing into following days as needed"""
+        duration = duration or settings.APPOINTMENT_DURATION
+        step = settings.APPOINTMENT_DURATION
+        
+        try:
+            day = date_to_ordinal(date_str)
+            clinic_start, clinic_end = self._clinic_window()
+        except ValueError as e:
+            print(f"[CALENDAR] Cannot search free slots: {e}")
+            return []
+        
+        after_time_24h = self._parse_time_to_24h(after_time) if after_time else None
+        earliest = time_to_minutes(after_time_24h) if after_time_24h else clinic_start
+        
+        slots = []
+        for day in range(day, day + max_days):
+            starts, day_appointments = self._day_bookings(day)
+            
+            # Walk candidate starts on the clinic grid, skipping past each booking
+            candidate = clinic_start
+            if earliest > candidate:
+                candidate += -(-(earliest - candidate) // step) * step
+            i = 0
+            while candidate + duration <= clinic_end and len(slots) < count:
+                while i < len(starts) and day_appointments[i].end <= candidate:
+                    i += 1
+                if i < len(starts) and starts[i] < candidate + duration:
+                    busy_until = day_appointments[i].end
+                    candidate += -(-(busy_until - candidate) // step) * step
+                    continue
+                slots.append({"date": ordinal_to_date(day), "time": minutes_to_time(candidate)})
+                candidate += step
+            
+            if len(slots) >= count:
+                break
+            earliest = clinic_start
+        
+        print(f"[CALENDAR] Found {len(slots)} free slots from {date_str}")
+        return slots
+
     def book_appointment(self, date_str, time_str, patient_name, duration=30):
         print(f"[CALENDAR] Booking appointment: {patient_name} on {date_str} at {time_str}")
         
@@ -196,26 +470,28 @@ class MockCalendarService:
                 "message": "Invalid time format"
             }
         
-        availability = self.check_availability(date_str, time_24h)
-        if not availability.get("available"):
-            print("[CALENDAR] Slot not available")
+        try:
+            day = date_to_ordinal(date_str)
+        except ValueError:
             return {
                 "success": False,
-                "error": "slot_unavailable",
-                "message": availability.get("message", "Time slot is not available")
+                "error": "invalid_date",
+                "message": "Invalid date format"
             }
         
-        event_id = f"mock_{len(self.appointments) + 1}"
-        new_appointment = {
-            "id": event_id,
-            "date": date_str,
-            "time": time_24h,
-            "patient_name": patient_name,
-            "duration": duration,
-            "status": "confirmed"
-        }
+        with self._booking_transaction(day):
+            availability = self.check_availability(date_str, time_24h, duration)
+            if not availability.get("available"):
+                print("[CALENDAR] Slot not available")
+                return {
+                    "success": False,
+                    "error": "slot_unavailable",
+                    "message": availability.get("message", "Time slot is not available")
+                }
+            
+            new_appointment = Appointment(day, time_to_minutes(time_24h), patient_name, duration)
+            event_id = self._insert(new_appointment)
         
-        self.appointments.append(new_appointment)
         print(f"[CALENDAR] Appointment booked successfully: {event_id}")
         
         return {
@@ -230,63 +506,414 @@ class MockCalendarService:
         """Cancel appointment by date and time or patient name"""
         print(f"[CALENDAR] Cancelling appointment: date={date_str}, time={time_str}, patient={patient_name}")
         
-        try:
-            target_date = datetime.strptime(date_str, "%Y-%m-%d")
-        except ValueError:
-            return {
-                "success": False,
-                "error": "invalid_date",
-                "message": "Invalid date format"
-            }
+        if date_str:
+            try:
+                day = date_to_ordinal(date_str)
+            except ValueError:
+                return {
+                    "success": False,
+                    "error": "invalid_date",
+                    "message": "Invalid date format"
+                }
         
         # Find appointment to cancel
-        appointment_to_cancel = None
-        
-        # Search by date + time
-        if time_str:
-            time_24h = self._parse_time_to_24h(time_str)
-            if time_24h:
-                for apt in self.appointments:
-                    if apt["date"] == date_str and apt["time"] == time_24h and apt["status"] == "confirmed":
-                        appointment_to_cancel = apt
-                        break
-        
-        # Search by date + patient name
-        if not appointment_to_cancel and patient_name:
-            for apt in self.appointments:
-                if apt["date"] == date_str and apt["patient_name"].lower() == patient_name.lower() and apt["status"] == "confirmed":
-                    appointment_to_cancel = apt
-                    break
+        appointment_to_cancel, confidence, suggestions = None, 0.0, []
+        
+        # Date-scoped lookups and the cancellation itself happen atomically
+        if date_str:
+            time_24h = self._parse_time_to_24h(time_str) if time_str else None
+            minute = time_to_minutes(time_24h) if time_24h else None
+            with self._booking_transaction(day):
+                appointment_to_cancel, confidence, suggestions = self._find_to_cancel(day, minute, patient_name)
+                if appointment_to_cancel and not self._cancel(appointment_to_cancel):
+                    appointment_to_cancel = None
         
         # Search by patient name only (find earliest future appointment)
         if not appointment_to_cancel and patient_name:
-            future_appointments = [
-                apt for apt in self.appointments
-                if apt["patient_name"].lower() == patient_name.lower() 
-                and apt["status"] == "confirmed"
-                and datetime.strptime(apt["date"], "%Y-%m-%d").date() >= datetime.now().date()
-            ]
-            if future_appointments:
-                appointment_to_cancel = min(future_appointments, key=lambda x: (x["date"], x["time"]))
+            appointment_to_cancel, confidence, suggestions = self._cancel_by_patient(patient_name)
         
+        # Not found, or another receptionist cancelled it first
         if not appointment_to_cancel:
             print("[CALENDAR] No matching appointment found")
+        else:
+            print(f"[CALENDAR] Appointment cancelled: {appointment_to_cancel.id} (match confidence {confidence:.2f})")
+        
+        return self._cancel_result(appointment_to_cancel, confidence, suggestions)
+
+    def book_many(self, entries):
+        """Book a batch of {'date', 'time', 'patient_name', 'duration'} dicts.
+        
+        Entries are validated in one pass and checked per day against the
+        existing bookings and the batch itself; earlier entries win conflicts.
+        Returns one book_appointment-style result per entry, in input order."""
+        print(f"[CALENDAR] Bulk booking {len(entries)} appointments")
+        
+        results = [None] * len(entries)
+        by_date = {}
+        valid_dates = {}
+        clinic_start, clinic_end = self._clinic_window()
+        
+        for i, entry in enumerate(entries):
+            date_str = entry.get("date")
+            patient_name = entry.get("patient_name")
+            duration = entry.get("duration") or settings.APPOINTMENT_DURATION
+            
+            if not date_str or not entry.get("time") or not patient_name:
+                results[i] = {"success": False, "error": "missing_fields", "message": "Date, time and patient name are required"}
+                continue
+            
+            if date_str not in valid_dates:
+                try:
+                    valid_dates[date_str] = date_to_ordinal(date_str)
+                except ValueError:
+                    valid_dates[date_str] = None
+            day = valid_dates[date_str]
+            if day is None:
+                results[i] = {"success": False, "error": "invalid_date", "message": "Invalid date format"}
+                continue
+            
+            time_24h = self._parse_time_to_24h(entry["time"])
+            if not time_24h:
+                results[i] = {"success": False, "error": "invalid_time", "message": "Invalid time format"}
+                continue
+            
+            start = time_to_minutes(time_24h)
+            if not (clinic_start <= start and start + duration <= clinic_end):
+                results[i] = {
+                    "success": False,
+                    "error": "slot_unavailable",
+                    "message": f"Clinic hours are {CLINIC_HOURS}"
+                }
+                continue
+            
+            by_date.setdefault(day, []).append((i, date_str, Appointment(day, start, patient_name, duration)))
+        
+        for day, items in by_date.items():
+            with self._booking_transaction(day):
+                # Working copy of the day that also holds this batch's accepted entries
+                starts, day_appointments = self._day_bookings(day)
+                starts, day_appointments = list(starts), list(day_appointments)
+                
+                for i, date_str, apt in items:
+                    clash = _overlap_in(starts, day_appointments, apt.start, apt.end)
+                    if clash:
+                        results[i] = {
+                            "success": False,
+                            "error": "slot_unavailable",
+                            "message": f"That time slot is already booked with {clash.patient_name}"
+                        }
+                        continue
+                    
+                    pos = bisect.bisect_right(starts, apt.start)
+                    starts.insert(pos, apt.start)
+                    day_appointments.insert(pos, apt)
+                    event_id = self._insert(apt)
+                    results[i] = {
+                        "success": True,
+                        "event_id": event_id,
+                        "date": date_str,
+                        "time": apt.time_str,
+                        "patient_name": apt.patient_name
+                    }
+        
+        booked = sum(1 for r in results if r["success"])
+        print(f"[CALENDAR] Bulk booking done: {booked} booked, {len(entries) - booked} rejected")
+        return results
+
+    def cancel_many(self, criteria):
+        """Cancel a batch of {'date', 'time', 'patient_name'} criteria, each
+        matched like cancel_appointment. Returns one result per item, in order."""
+        print(f"[CALENDAR] Bulk cancelling {len(criteria)} appointments")
+        
+        results = [None] * len(criteria)
+        by_date = {}
+        by_patient = []
+        
+        for i, item in enumerate(criteria):
+            date_str = item.get("date")
+            patient_name = item.get("patient_name")
+            
+            if date_str:
+                try:
+                    day = date_to_ordinal(date_str)
+                except ValueError:
+                    results[i] = {"success": False, "error": "invalid_date", "message": "Invalid date format"}
+                    continue
+                time_24h = self._parse_time_to_24h(item["time"]) if item.get("time") else None
+                minute = time_to_minutes(time_24h) if time_24h else None
+                by_date.setdefault(day, []).append((i, minute, patient_name))
+            elif patient_name:
+                by_patient.append((i, patient_name))
+            else:
+                results[i] = self._cancel_result(None)
+        
+        for day, items in by_date.items():
+            with self._booking_transaction(day):
+                for i, minute, patient_name in items:
+                    apt, confidence, _ = self._find_to_cancel(day, minute, patient_name)
+                    if apt and self._cancel(apt):
+                        results[i] = self._cancel_result(apt, confidence)
+                    elif patient_name:
+                        # Same fallback as cancel_appointment: earliest future booking
+                        by_patient.append((i, patient_name))
+                    else:
+                        results[i] = self._cancel_result(None)
+        
+        for i, patient_name in by_patient:
+            results[i] = self._cancel_result(*self._cancel_by_patient(patient_name))
+        
+        cancelled = sum(1 for r in results if r["success"])
+        print(f"[CALENDAR] Bulk cancellation done: {cancelled} cancelled, {len(criteria) - cancelled} not cancelled")
+        return results
+
+    def book_recurring(self, date_str, time_str, patient_name, frequency="weekly", count=None, until=None, duration=None):
+        """Book the same slot every day or week from date_str, `count` times or
+        until the `until` date (whichever comes first).
+        
+        Every occurrence is checked against existing bookings, other series
+        included; the series is only booked if none of them clash."""
+        print(f"[CALENDAR] Booking {frequency} series: {patient_name} from {date_str} at {time_str} (count={count}, until={until})")
+        duration = duration or settings.APPOINTMENT_DURATION
+        
+        interval = FREQUENCIES.get(frequency)
+        if interval is None:
             return {
                 "success": False,
-                "error": "not_found",
-                "message": "No matching appointment found to cancel"
+                "error": "invalid_frequency",
+                "message": f"Frequency must be one of: {', '.join(FREQUENCIES)}"
+            }
+        if (not count and not until) or (count is not None and count < 1):
+            return {
+                "success": False,
+                "error": "missing_fields",
+                "message": "A recurring booking needs a number of occurrences or an end date"
             }
         
-        # Mark as cancelled
-        appointment_to_cancel["status"] = "cancelled"
+        try:
+            first_day = date_to_ordinal(date_str)
+            until_day = date_to_ordinal(until) if until else None
+        except ValueError:
+            return {"success": False, "error": "invalid_date", "message": "Invalid date format"}
+        if until_day is not None and until_day < first_day:
+            return {"success": False, "error": "invalid_date", "message": "The end date is before the first appointment"}
+        
+        time_24h = self._parse_time_to_24h(time_str)
+        if not time_24h:
+            return {"success": False, "error": "invalid_time", "message": "Invalid time format"}
+        start = time_to_minutes(time_24h)
+        clinic_start, clinic_end = self._clinic_window()
+        if not (clinic_start <= start and start + duration <= clinic_end):
+            return {"success": False, "error": "slot_unavailable", "message": f"Clinic hours are {CLINIC_HOURS}"}
+        
+        series = Series(first_day, start, patient_name, duration, interval,
+                        Series.last_day_for(first_day, interval, count, until_day))
+        days = series.days()
         
-        print(f"[CALENDAR] Appointment cancelled: {appointment_to_cancel['id']}")
+        with self._series_transaction(days):
+            conflicts = [ordinal_to_date(day) for day in days if self._find_overlap(day, start, start + duration)]
+            if conflicts:
+                print(f"[CALENDAR] Series clashes on {len(conflicts)} of {len(days)} dates")
+                return {
+                    "success": False,
+                    "error": "slot_unavailable",
+                    "message": f"{len(conflicts)} of the {len(days)} appointments clash with existing bookings",
+                    "conflicts": conflicts
+                }
+            series_id = self._insert_series(series)
+        
+        print(f"[CALENDAR] Series booked successfully: {series_id} ({len(days)} appointments)")
         
         return {
             "success": True,
-            "appointment": appointment_to_cancel,
-            "message": f"Appointment cancelled for {appointment_to_cancel['patient_name']} on {appointment_to_cancel['date']} at {appointment_to_cancel['time']}"
+            "series_id": series_id,
+            "occurrences": len(days),
+            "first_date": date_str,
+            "last_date": ordinal_to_date(series.last_day),
+            "time": time_24h,
+            "patient_name": patient_name
         }
 
+    def cancel_series(self, series_id):
+        """Cancel every occurrence of a recurring series"""
+        print(f"[CALENDAR] Cancelling series: {series_id}")
+        
+        series = self._get_series(series_id)
+        if series:
+            with self._series_transaction(series.days()):
+                if not self._mark_series_cancelled(series):
+                    series = None
+        
+        if not series:
+            print("[CALENDAR] No matching series found")
+            return {
+                "success": False,
+                "error": "not_found",
+                "message": "No matching recurring appointment found to cancel"
+            }
+        
+        print(f"[CALENDAR] Series cancelled: {series_id}")
+        return {
+            "success": True,
+            "series": series.to_dict(),
+            "message": f"Recurring appointments cancelled for {series.patient_name} "
+                       f"from {ordinal_to_date(series.day)} to {ordinal_to_date(series.last_day)}"
+        }
+
+
+class MockCalendarService(BaseCalendarService):
+    """In-memory calendar seeded with demo data; lost on restart"""
+    
+    # Bookings on dates hashing to different stripes never contend
+    LOCK_STRIPES = 64
+    
+    def __init__(self):
+        self.appointments = self._initialize_mock_data()
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._ids = itertools.count(len(self.appointments) + 1)
+        
+        # Confirmed appointments back the schedule; cancelled ones are kept
+        # in their own index so history can still be queried by range
+        self._index = _DateIndex()
+        self._cancelled_index = _DateIndex()
+        self._names = PatientNameIndex()
+        
+        # Recurring series, bucketed by interval and by where their days fall
+        # in it, so a date only looks at series that can land on it
+        self._series = {}
+        self._series_by_phase = {interval: {} for interval in FREQUENCIES.values()}
+        self._series_names = PatientNameIndex()
+        self._series_ids = itertools.count(1)
+        self._series_lock = threading.Lock()
+        
+        for apt in self.appointments:
+            if apt.status == "confirmed":
+                self._index.add(apt)
+                self._names.add(apt)
+            else:
+                self._cancelled_index.add(apt)
+        
+        print("[CALENDAR] Mock calendar service initialized")
+        print(f"[CALENDAR] Loaded {len(self.appointments)} mock appointments")
+    
+    def _initialize_mock_data(self):
+        today = today_ordinal()
+        
+        tomorrow = today + 1
+        day_after = today + 2
+        return [
+            Appointment(tomorrow, 9 * 60, "Alice Johnson", 30, id="mock_1"),
+            Appointment(tomorrow, 10 * 60 + 30, "Bob Smith", 30, id="mock_2"),
+            Appointment(tomorrow, 14 * 60, "Carol White", 30, id="mock_3"),
+            Appointment(day_after, 11 * 60, "David Brown", 30, id="mock_4")
+        ]
+    
+    def _booking_transaction(self, day):
+        return self._locks[day % self.LOCK_STRIPES]
+
+    @contextlib.contextmanager
+    def _series_transaction(self, days):
+        # Always in stripe order, so two series can't deadlock each other
+        with contextlib.ExitStack() as stack:
+            for stripe in sorted({day % self.LOCK_STRIPES for day in days}):
+                stack.enter_context(self._locks[stripe])
+            yield
+
+    def _stored_day(self, day):
+        return self._index.day(day)
+
+    def _range(self, start_day, end_day, status):
+        if status == "confirmed":
+            return list(self._index.range(start_day, end_day))
+        if status == "cancelled":
+            return list(self._cancelled_index.range(start_day, end_day))
+        if status is None:
+            return list(heapq.merge(
+                self._index.range(start_day, end_day),
+                self._cancelled_index.range(start_day, end_day),
+                key=lambda apt: (apt.day, apt.start)
+            ))
+        return None
+
+    def _insert(self, apt):
+        apt.id = f"mock_{next(self._ids)}"
+        self.appointments.append(apt)
+        self._index.add(apt)
+        self._names.add(apt)
+        return apt.id
+
+    def _mark_cancelled(self, apt):
+        if apt.status != "confirmed":
+            return False
+        apt.status = "cancelled"
+        self._index.remove(apt)
+        self._names.remove(apt)
+        self._cancelled_index.add(apt)
+        return True
+
+    def _find_stored_for_patient(self, patient_name, day=None):
+        return self._names.earliest(patient_name, today_ordinal(), on_day=day)
+
+    def _patient_candidates(self, patient_name, limit=20):
+        candidates = dict(self._names.candidates(patient_name, limit))
+        for key, name in self._series_names.candidates(patient_name, limit):
+            candidates.setdefault(key, name)
+        return list(candidates.items())[:limit]
+
+    def _insert_series(self, series):
+        series.id = f"series_{next(self._series_ids)}"
+        with self._series_lock:
+            self._series[series.id] = series
+            # Buckets are replaced rather than mutated so readers never need the lock
+            buckets = self._series_by_phase[series.interval]
+            phase = series.day % series.interval
+            buckets[phase] = buckets.get(phase, ()) + (series,)
+        self._series_names.add(series)
+        return series.id
+
+    def _get_series(self, series_id):
+        return self._series.get(series_id)
+
+    def _series_on(self, day):
+        return [
+            series
+            for interval, buckets in self._series_by_phase.items()
+            for series in buckets.get(day % interval, ())
+            if series.occurs_on(day)
+        ]
+
+    def _series_between(self, start_day, end_day):
+        return [
+            series for series in list(self._series.values())
+            if (end_day is None or series.day <= end_day) and (start_day is None or series.last_day >= start_day)
+        ]
+
+    def _series_for_patient(self, patient_name):
+        return self._series_names.entries(patient_name)
+
+    def _cancel_occurrence(self, series, day):
+        if series.status != "confirmed" or not series.occurs_on(day):
+            return False
+        series.exceptions.add(day)
+        return True
+
+    def _mark_series_cancelled(self, series):
+        with self._series_lock:
+            if series.status != "confirmed":
+                return False
+            series.status = "cancelled"
+            buckets = self._series_by_phase[series.interval]
+            phase = series.day % series.interval
+            buckets[phase] = tuple(other for other in buckets[phase] if other is not series)
+        self._series_names.remove(series)
+        return True
+
+
+def create_calendar_service():
+    """Build the calendar backend selected by CALENDAR_BACKEND"""
+    if settings.CALENDAR_BACKEND == "sqlite":
+        from backend.services.sqlite_calendar_service import SQLiteCalendarService
+        return SQLiteCalendarService(settings.CALENDAR_DB_PATH)
+    return MockCalendarService()
+
 
-calendar_service = MockCalendarService()
+calendar_service = create_calendar_service()
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import date
+from backend.services.ttl_cache import TTLCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS intent_cache (
+    key TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    intent TEXT NOT NULL
+);
+"""
+
+# Parses that depend on the reference date are only valid for the day they
+# were made, so entries never need to outlive it
+DAY_SECONDS = 24 * 60 * 60
+
+
+def normalize_message(message):
+    """Lowercase, single-spaced, without trailing punctuation"""
+    return " ".join((message or "").lower().split()).strip(" .!?")
+
+
+def history_digest(turns):
+    """Stable digest of the history turns the intent prompt includes"""
+    canonical = json.dumps(turns or [], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+class IntentCache:
+    """LRU cache of parse_intent results keyed on the normalized message,
+    today's date and the history the LLM saw.
+
+    With a db_path, entries are also written to SQLite and today's entries
+    are loaded back on start, so the cache stays warm across restarts."""
+
+    def __init__(self, maxsize, db_path=None):
+        self._cache = TTLCache(maxsize, DAY_SECONDS)
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path and maxsize > 0:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.executescript(SCHEMA)
+            self._load()
+
+    def _load(self):
+        today = date.today().isoformat()
+        with self._db_lock, self._db:
+            self._db.execute("DELETE FROM intent_cache WHERE day < ?", (today,))
+            # Most recently written last, so they end up most recently used
+            rows = self._db.execute(
+                "SELECT key, intent FROM intent_cache WHERE day = ? ORDER BY rowid DESC LIMIT ?",
+                (today, self._cache.maxsize)
+            ).fetchall()
+        for key, intent in reversed(rows):
+            self._cache.set(key, intent)
+        print(f"[LLM] Loaded {len(rows)} cached intents")
+
+    @staticmethod
+    def key(message, history_turns):
+        return f"{date.today().isoformat()}|{history_digest(history_turns)}|{normalize_message(message)}"
+
+    def get(self, key):
+        """A fresh copy of the cached intent dict, or None"""
+        intent = self._cache.get(key)
+        return json.loads(intent) if intent is not None else None
+
+    def set(self, key, intent_data):
+        encoded = json.dumps(intent_data)
+        self._cache.set(key, encoded)
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO intent_cache (key, day, intent) VALUES (?, ?, ?)",
+                    (key, key.split("|", 1)[0], encoded)
+                )
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,425 @@
+import re
+from datetime import date, timedelta
+from backend.services.time_utils import parse_time, today_ordinal
+
+# Local parser for the handful of fixed phrasings receptionists use most
+# ("book <name> at <time> <day>", "cancel <name>'s appointment", "what's on
+# tomorrow"). Returns the same dict as LLMService.parse_intent plus a
+# 'confidence'; anything it isn't sure about scores low and goes to the LLM.
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+NUMBERS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "ten": 10, "fourteen": 14}
+
+_WEEKDAY = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_NUMBER = r"\d{1,2}|" + "|".join(NUMBERS)
+
+# One date expression; each alternative has its own named groups
+DATE_RE = re.compile(
+    r"\b(?:"
+    r"(?P<iso>\d{4}-\d{2}-\d{2})"
+    r"|(?P<after>(?:the )?day after tomorrow)"
+    r"|(?P<today>today)"
+    r"|(?P<tomorrow>tomorrow)"
+    rf"|(?:(?P<which>next|this|coming) )?(?P<weekday>{_WEEKDAY})"
+    rf"|(?P<month>{_MONTH})\.? (?P<month_day>\d{{1,2}})(?:st|nd|rd|th)?"
+    rf"|(?:the )?(?P<day_month>\d{{1,2}})(?:st|nd|rd|th)? (?:of )?(?P<month2>{_MONTH})"
+    rf"|the (?P<nth>\d{{1,2}})(?:st|nd|rd|th)"
+    r")\b"
+)
+RANGE_RE = re.compile(
+    rf"\b(?:(?:for|in|over) )?the (?:next|coming) (?P<days>{_NUMBER}) days\b"
+    r"|\b(?P<week>this|next) week\b"
+)
+TIME_RE = re.compile(
+    r"\b(?:(?P<clock>\d{1,2}(?::\d{2})? ?[ap]\.?m\b\.?)|(?P<h24>\d{1,2}:\d{2})|(?P<noon>noon|midday))"
+)
+DURATION_RE = re.compile(
+    rf"\b(?:for )?(?:a |an )?(?:(?P<half>half an? hour)|(?P<amount>{_NUMBER}|an?)[ -](?P<unit>hours?|hrs?|minutes?|mins?))(?: long)?\b"
+)
+
+# Polite lead-ins that don't change the request
+PREFIX_RE = re.compile(
+    r"^(?:(?:please|can you|could you|would you|i need to|i'd like to|i would like to|i want to|let's|lets|go ahead and) )+"
+)
+
+INTENT_PATTERNS = [
+    ("cancel_appointment", re.compile(r"^(?:please )?(?:cancel|unbook|delete|remove)\b")),
+    # "Schedule for tomorrow?" asks for the schedule, not a booking
+    ("book_appointment", re.compile(
+        r"^(?:please )?(?:book|schedule(?! (?:for|on|today|tomorrow|this|next)\b|$)|reserve|add)\b"
+    )),
+    ("check_availability", re.compile(
+        r"^(?:is|are|do (?:we|you) have|any|is there)\b.*\b(?:free|available|availability|open)\b"
+    )),
+    ("list_appointments", re.compile(
+        r"^(?:please )?(?:show|list|view|display|what'?s on|what is on|what do we have|what appointments"
+        r"|any appointments|who'?s (?:booked|coming|in)|what'?s the schedule|what does the schedule)\b"
+    )),
+]
+
+# Words that make a message too involved for the rules (several actions,
+# recurrence, rescheduling, negation, dismissal, "everything"); those go to the LLM
+COMPLEX_RE = re.compile(
+    r"\b(?:and|but|or|instead|reschedule|move|change|not|don'?t|except|every|weekly|daily|then|also|if"
+    r"|no|never|nevermind|everything|everyone|everybody|nothing|nobody)\b"
+)
+
+# Words each intent may contain besides its dates, times and the patient name
+FILLER = {
+    "a", "an", "the", "please", "appointment", "appointments", "slot", "for", "at", "on", "in", "with",
+}
+INTENT_FILLER = {
+    "book_appointment": FILLER | {"book", "schedule", "reserve", "add", "new", "visit", "consultation", "session", "patient"},
+    "cancel_appointment": FILLER | {"cancel", "unbook", "delete", "remove", "booking", "patient"},
+    "check_availability": FILLER | {
+        "is", "are", "do", "we", "you", "have", "any", "anything", "there", "free", "available",
+        "availability", "open", "time",
+    },
+    "list_appointments": FILLER | {
+        "show", "me", "us", "list", "view", "display", "what", "whats", "what's", "is", "on", "do", "we",
+        "have", "all", "any", "are", "there", "schedule", "schedules", "calendar", "agenda", "our", "my",
+        "who", "whos", "who's", "booked", "coming", "does", "look", "like", "of",
+    },
+}
+# Words that never appear in a patient name as spoken to the assistant
+NOT_NAMES = {
+    "i", "me", "we", "you", "he", "she", "they", "him", "her", "them", "it", "that", "this", "my",
+    "our", "his", "their", "need", "want", "to", "can", "could", "would", "like", "someone", "somebody",
+    "patient", "next", "available", "free", "slot", "time", "one", "o'clock", "oclock", "is", "am", "pm",
+    "usual", "same", "regular", "again", "another", "other", "follow-up", "checkup", "check-up",
+    # Quantifiers, negations and greetings that would otherwise pass for a name
+    "all", "any", "anyone", "anybody", "anything", "everything", "everyone", "everybody", "each", "both",
+    "some", "none", "nothing", "nobody", "no", "nevermind", "whoever", "whatever", "hello", "hi", "hey",
+    "thanks", "thank", "okay", "ok", "yes",
+    # Things people book or note down that aren't patients
+    "dentist", "doctor", "nurse", "meeting", "lunch", "break", "room", "note", "reminder", "call",
+    "staff", "team", "cleaning", "holiday",
+}
+NAME_TOKEN_RE = re.compile(r"^[a-z][a-z'\-]*$")
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z'\-]*")
+# A lone name shorter than this ("Al", "D") is more likely a slip or an
+# initial than a patient, so the LLM gets the message
+MIN_NAME_LETTERS = 3
+
+# How sure the rules are of a parse
+CERTAIN = 1.0
+UNSURE = 0.5
+
+
+def _resolve_date(match, today):
+    """Date for one DATE_RE match, or None if it's ambiguous or invalid"""
+    groups = match.groupdict()
+    try:
+        if groups["iso"]:
+            return date.fromisoformat(groups["iso"])
+        if groups["after"]:
+            return today + timedelta(days=2)
+        if groups["today"]:
+            return today
+        if groups["tomorrow"]:
+            return today + timedelta(days=1)
+        if groups["weekday"]:
+            ahead = (WEEKDAYS[groups["weekday"]] - today.weekday()) % 7
+            # "Friday" said on a Friday could mean today or next week
+            return today + timedelta(days=ahead) if ahead else None
+        if groups["month"] or groups["month2"]:
+            month = MONTHS[groups["month"] or groups["month2"]]
+            day = int(groups["month_day"] or groups["day_month"])
+            candidate = date(today.year, month, day)
+            # Month names well behind us mean next year ("January 5" said in December)
+            if (today - candidate).days > 180:
+                candidate = date(today.year + 1, month, day)
+            return candidate
+        if groups["nth"]:
+            day = int(groups["nth"])
+            if day >= today.day:
+                return today.replace(day=day)
+            month, year = (1, today.year + 1) if today.month == 12 else (today.month + 1, today.year)
+            return date(year, month, day)
+    except ValueError:
+        return None
+    return None
+
+
+def _resolve_range(match, today):
+    """(start, end) for one RANGE_RE match"""
+    if match.group("days"):
+        days = match.group("days")
+        days = int(days) if days.isdigit() else NUMBERS[days]
+        return today, today + timedelta(days=max(days, 1) - 1)
+    monday = today - timedelta(days=today.weekday())
+    if match.group("week") == "next":
+        monday += timedelta(days=7)
+        return monday, monday + timedelta(days=6)
+    return today, monday + timedelta(days=6)
+
+
+def _take(pattern, text):
+    """All matches of pattern, and the text with them blanked out"""
+    matches = list(pattern.finditer(text))
+    return matches, pattern.sub(" ", text)
+
+
+def _duration(match):
+    if match.group("half"):
+        return 30
+    amount = match.group("amount")
+    amount = 1 if amount in ("a", "an") else int(amount) if amount.isdigit() else NUMBERS[amount]
+    return amount * 60 if match.group("unit").startswith("h") else amount
+
+
+def _capitalized(user_message):
+    """Lower-cased words the message spells with a capital letter"""
+    words = set()
+    for word in WORD_RE.findall((user_message or "").replace("’", "'")):
+        if word[0].isupper():
+            words.add(word.lower())
+            words.add(re.sub(r"'s$", "", word.lower()))
+    return words
+
+
+def _name(words, capitalized):
+    """Title-cased patient name from the leftover words; '' if there are
+    none, None if the leftovers don't look like a name. Only words the
+    receptionist capitalized count, so "book the dentist" isn't a booking
+    for a patient called Dentist"""
+    if not words:
+        return ""
+    if len(words) > 4 or any(
+        word in NOT_NAMES or not NAME_TOKEN_RE.match(word) or word not in capitalized for word in words
+    ):
+        return None
+    return " ".join(re.sub(r"[a-z]+", lambda part: part.group().capitalize(), word) for word in words)
+
+
+def _result(intent, confidence, **fields):
+    result = {
+        "intent": intent,
+        "date": None,
+        "start_date": None,
+        "end_date": None,
+        "time": None,
+        "patient_name": None,
+        "duration": 30,
+        "clarification_needed": False,
+        "missing_fields": [],
+        "confidence": confidence,
+    }
+    result.update(fields)
+    return result
+
+
+def parse_intent_rules(user_message, conversation_history=None, today=None):
+    """Parse a receptionist message with fixed rules.
+
+    Returns the LLMService.parse_intent dict plus 'confidence' (0-1); only a
+    confidence of CERTAIN means every word of the message was accounted for.
+    `today` is an ordinal, for tests."""
+    text = " ".join((user_message or "").lower().replace("’", "'").split()).strip(" ?.!,")
+    text = PREFIX_RE.sub("", text)
+    intent = next((name for name, pattern in INTENT_PATTERNS if pattern.search(text)), None)
+    if intent is None:
+        return _result(None, 0.0)
+    if COMPLEX_RE.search(text):
+        return _result(intent, UNSURE)
+
+    today = date.fromordinal(today or today_ordinal())
+    confidence = CERTAIN
+    fields = {}
+
+    durations, rest = _take(DURATION_RE, text)
+    ranges, rest = _take(RANGE_RE, rest)
+    times, rest = _take(TIME_RE, rest)
+    dates, rest = _take(DATE_RE, rest)
+    # Any digits left over are times or dates the rules can't read ("at 3")
+    words = [word for word in re.split(r"[\s,]+", re.sub(r"'s\b", "", rest)) if word]
+    if any(char.isdigit() for word in words for char in word):
+        return _result(intent, UNSURE)
+
+    if durations:
+        if intent != "book_appointment" or len(durations) > 1:
+            return _result(intent, UNSURE)
+        fields["duration"] = _duration(durations[0])
+
+    if len(times) > 1:
+        return _result(intent, UNSURE)
+    if times:
+        fields["time"] = "12:00" if times[0].group("noon") else parse_time(times[0].group(0).strip())
+        if not fields["time"]:
+            return _result(intent, UNSURE)
+
+    resolved = [_resolve_date(match, today) for match in dates]
+    if None in resolved:
+        return _result(intent, UNSURE)
+    if ranges:
+        if intent != "list_appointments" or len(ranges) > 1 or resolved:
+            return _result(intent, UNSURE)
+        start, end = _resolve_range(ranges[0], today)
+        fields["start_date"], fields["end_date"] = start.isoformat(), end.isoformat()
+    elif len(resolved) == 2 and intent == "list_appointments" and re.search(r"\b(?:to|until|through|till)\b", rest):
+        # "from October 29 to November 2"
+        start, end = sorted(resolved)
+        fields["start_date"], fields["end_date"] = start.isoformat(), end.isoformat()
+        words = [word for word in words if word not in ("from", "to", "until", "through", "till", "between")]
+    elif len(resolved) > 1:
+        return _result(intent, UNSURE)
+    elif resolved:
+        fields["date"] = resolved[0].isoformat()
+
+    leftover = [word for word in words if word not in INTENT_FILLER[intent]]
+
+    if intent in ("book_appointment", "cancel_appointment"):
+        name = _name(leftover, _capitalized(user_message))
+        if name is None or (len(leftover) == 1 and len(leftover[0]) < MIN_NAME_LETTERS):
+            return _result(intent, UNSURE)
+        fields["patient_name"] = name or None
+    elif leftover:
+        return _result(intent, UNSURE)
+
+    if intent == "book_appointment":
+        missing = [field for field in ("date", "time", "patient_name") if not fields.get(field)]
+        if missing:
+            # Earlier turns may hold the missing details; the LLM reads history
+            if conversation_history:
+                return _result(intent, UNSURE)
+            fields["clarification_needed"] = True
+            fields["missing_fields"] = missing
+    elif intent == "cancel_appointment":
+        if not fields.get("patient_name") and not fields.get("date"):
+            return _result(intent, UNSURE)
+    elif intent == "check_availability":
+        if not fields.get("date") or not fields.get("time"):
+            return _result(intent, UNSURE)
+
+    return _result(intent, confidence, **fields)
+
+
+# Follow-up answers to a clarification question ("at 3pm", "it's for John
+# Smith", "tomorrow works") are merged into the pending request's slots
+FRAME_SLOTS = ("date", "start_date", "end_date", "time", "patient_name", "duration")
+FOLLOWUP_FILLER = FILLER | {
+    "yes", "yeah", "yep", "ok", "okay", "sure", "it's", "its", "it", "is", "make", "how", "about", "say",
+    "let's", "lets", "try", "name", "patient", "patient's", "that", "works", "work", "fine", "good",
+    "great", "perfect", "sounds", "would", "be", "actually",
+}
+# Follow-ups that drop the pending request instead of answering it
+DISMISS_RE = re.compile(
+    r"^(?:(?:oh|ok|okay|well|no|nope|nah|actually)[, ]+)*"
+    r"(?:never ?mind|forget (?:it|that|about it)|no|nope|nah|stop|scratch that|don'?t bother|skip it"
+    r"|leave it|not now|no thanks?|no thank you|cancel (?:that|it)|that'?s all|that'?s it)"
+    r"(?:[, ]+(?:thanks|thank you))?$"
+)
+# Conversational words a follow-up may be made of that are never a name
+CHATTER = {
+    "hi", "hello", "hey", "thanks", "thank", "hmm", "hm", "um", "uh", "what", "huh", "sorry", "pardon",
+    "wait", "no", "nope", "stop", "never", "mind", "nevermind", "forget", "there", "anyway", "just",
+}
+
+
+def _missing_slots(intent, slots):
+    """Slots the intent still needs before the calendar can act on it"""
+    if intent == "book_appointment":
+        return [field for field in ("date", "time", "patient_name") if not slots.get(field)]
+    if intent == "check_availability":
+        return [field for field in ("date", "time") if not slots.get(field)]
+    if intent == "cancel_appointment" and not slots.get("patient_name") and not slots.get("date"):
+        return ["patient_name"]
+    return []
+
+
+def pending_frame(intent_data):
+    """The slots of a request waiting on clarification, to carry to the next turn"""
+    frame = {"intent": intent_data.get("intent")}
+    frame.update({slot: intent_data.get(slot) for slot in FRAME_SLOTS})
+    frame["missing_fields"] = _missing_slots(frame["intent"], frame)
+    return frame
+
+
+def _from_frame(frame, confidence, **slots):
+    merged = {slot: frame.get(slot) for slot in FRAME_SLOTS}
+    merged.update({slot: value for slot, value in slots.items() if value})
+    missing = _missing_slots(frame["intent"], merged)
+    return _result(frame["intent"], confidence, clarification_needed=bool(missing), missing_fields=missing,
+                   **{slot: value for slot, value in merged.items() if value is not None})
+
+
+def fill_pending(frame, user_message, today=None):
+    """Merge a follow-up answer into the pending request's slots.
+
+    Returns the completed parse_intent dict (confidence CERTAIN), a
+    'dismissed' intent if the message drops the request ("never mind"), or
+    None if the message is more than dates, times, a duration and a patient
+    name, such as a new request. A lone word is never taken as the name;
+    the LLM decides those. `today` is an ordinal, for tests."""
+    text = " ".join((user_message or "").lower().replace("’", "'").split()).strip(" ?.!,")
+    if DISMISS_RE.match(text):
+        return _result("dismissed", CERTAIN)
+    text = PREFIX_RE.sub("", text)
+    if any(pattern.search(text) for _, pattern in INTENT_PATTERNS) or COMPLEX_RE.search(text):
+        return None
+
+    today = date.fromordinal(today or today_ordinal())
+    durations, rest = _take(DURATION_RE, text)
+    times, rest = _take(TIME_RE, rest)
+    dates, rest = _take(DATE_RE, rest)
+    words = [word for word in re.split(r"[\s,]+", rest) if word]
+    if any(char.isdigit() for word in words for char in word) or len(times) > 1 or len(dates) > 1:
+        return None
+
+    slots = {}
+    if durations:
+        if frame["intent"] != "book_appointment" or len(durations) > 1:
+            return None
+        slots["duration"] = _duration(durations[0])
+    if times:
+        slots["time"] = "12:00" if times[0].group("noon") else parse_time(times[0].group(0).strip())
+        if not slots["time"]:
+            return None
+    if dates:
+        resolved = _resolve_date(dates[0], today)
+        if resolved is None:
+            return None
+        slots["date"] = resolved.isoformat()
+
+    leftover = [word for word in words if word not in FOLLOWUP_FILLER]
+    if leftover:
+        # Leftover words can only be the patient's name, and only if that was asked for
+        leftover = [re.sub(r"'s$", "", word) for word in leftover]
+        if len(leftover) < 2 or CHATTER.intersection(leftover):
+            return None
+        name = _name(leftover, _capitalized(user_message))
+        if not name or "patient_name" not in frame.get("missing_fields", []):
+            return None
+        slots["patient_name"] = name
+
+    if not slots:
+        return None
+    return _from_frame(frame, CERTAIN, **slots)
+
+
+def merge_pending(frame, intent_data):
+    """Complete an LLM parse of a follow-up with the pending request's slots.
+    A parse for a different request replaces the pending one."""
+    if intent_data.get("intent") not in (frame["intent"], None):
+        return intent_data
+    slots = {slot: intent_data.get(slot) for slot in FRAME_SLOTS}
+    if slots["duration"] == 30:
+        # The parser's default, not something the receptionist said
+        slots["duration"] = None
+    merged = _from_frame(frame, CERTAIN, **slots)
+    merged.pop("confidence")
+    # Keep the LLM's clarification question only if it asks for what's still missing
+    if intent_data.get("response") and intent_data.get("missing_fields") == merged["missing_fields"]:
+        merged["response"] = intent_data["response"]
+    return merged
@@ -0,0 +1,169 @@
+import contextlib
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+import httpx
+import requests
+
+# Deadline (time.monotonic) for every LLM call in the current turn. A
+# ContextVar follows the turn into LangGraph's worker threads and tasks.
+_turn_deadline = contextvars.ContextVar("llm_turn_deadline", default=None)
+
+
+class LLMUnavailable(Exception):
+    """No usable answer from the provider: retries exhausted, deadline
+    passed, or the circuit breaker is open. `reason` is a short code."""
+
+    def __init__(self, reason, detail=""):
+        super().__init__(detail or reason)
+        self.reason = reason
+
+
+@contextlib.contextmanager
+def turn_deadline(seconds):
+    """Bound the total time LLM calls may take inside this block"""
+    token = _turn_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _turn_deadline.reset(token)
+
+
+def current_deadline(default_seconds):
+    """The turn's deadline, or one `default_seconds` away outside a turn"""
+    deadline = _turn_deadline.get()
+    return deadline if deadline is not None else time.monotonic() + default_seconds
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_timeout(error):
+    return isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException))
+
+
+def is_retryable(error):
+    """Timeouts, dropped connections, rate limits and server errors are worth
+    another attempt; other client errors (bad key, bad request) are not"""
+    if is_timeout(error) or isinstance(error, (requests.exceptions.ConnectionError, httpx.TransportError)):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, for the hedging delay"""
+
+    def __init__(self, window):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, min_samples=1):
+        """Latency below which `fraction` of recent calls finished, or None
+        if there are fewer than min_samples"""
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def __len__(self):
+        return len(self._samples)
+
+    def summary(self):
+        """Sample count and p50/p95 in milliseconds"""
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "samples": len(self),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+
+class CircuitBreaker:
+    """Stops calling a failing provider for a while.
+
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls are refused until `reset_timeout` seconds have passed.
+    half_open: one trial call goes through; success closes the breaker,
+    failure opens it again. A trial given up without a verdict (release(),
+    or no verdict within reset_timeout) lets the next call try instead."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go to the provider now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and self._trial_in_flight and \
+                    time.monotonic() - self._trial_started >= self.reset_timeout:
+                # The trial never reported back; don't wait on it forever
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_started = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print("[LLM] Circuit breaker closed")
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give up a call allow()ed without a verdict, e.g. when it was
+        cancelled, so a half-open breaker lets another trial through"""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or (
+                self.state == "closed" and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                self._trial_in_flight = False
+                print(f"[LLM] Circuit breaker open for {self.reset_timeout}s after {self.consecutive_failures} failures")
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected,
+                "retry_in_seconds": retry_in
+            }
@@ -1,37 +1,25 @@
-import requests
+import asyncio
+import hashlib
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+import httpx
+import requests
+from datetime import date
+from requests.adapters import HTTPAdapter
 from backend.config import settings
+from backend.services.ttl_cache import TTLCache
+from backend.services.intent_cache import IntentCache
+from backend.services import metrics
+from backend.services.llm_resilience import (
+    CircuitBreaker, LatencyTracker, LLMUnavailable, backoff_delay, current_deadline, is_retryable, is_timeout
+)
 
 
-class LLMService:
-    
-    def __init__(self):
-        self.api_key = settings.OPENROUTER_API_KEY
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.model = "qwen/qwen-2.5-72b-instruct"
-        print("[LLM] Service initialized with Qwen 2.5 72B")
-    
-    def parse_intent(self, user_message, conversation_history=None):
-        """Parse user intent with retry logic and conversation context"""
-        
-        today_str = "2025-10-31 (Friday)"
-        tomorrow_str = "2025-11-01 (Saturday)"
-        
-        context = ""
-        if conversation_history and isinstance(conversation_history, list):
-            try:
-                context = "\n".join([
-                    f"User: {turn.get('user', '') if isinstance(turn, dict) else ''}\nAgent: {turn.get('agent', '') if isinstance(turn, dict) else ''}" 
-                    for turn in conversation_history[-3:] if isinstance(turn, dict)
-                ])
-            except Exception as e:
-                print(f"[LLM] Error building context: {e}")
-                context = ""
-        
-        system_prompt = """You are an AI scheduling assistant for a medical clinic. You help RECEPTIONISTS manage appointments for multiple patients.
+INTENT_SYSTEM_PROMPT = """You are an AI scheduling assistant for a medical clinic. You help RECEPTIONISTS manage appointments for multiple patients.
 
-DATE PARSING EXAMPLES:
-- Today is 2025-10-31 (Friday)
+DATE PARSING EXAMPLES (in all examples below today is 2025-10-31, a Friday; the real date is given with each message):
 - "tomorrow" = 2025-11-01 (Saturday)
 - "next Friday" = the upcoming Friday from today
 - "this Friday" = the upcoming Friday (same as next Friday if today is before Friday)
@@ -127,134 +115,620 @@ DURATION RULES:
 
 Return ONLY valid JSON, no explanation."""
 
+# Same task in about a third of the tokens: the rules once, three examples
+INTENT_SYSTEM_PROMPT_COMPACT = """You turn a medical clinic receptionist's message into JSON. The receptionist manages appointments for many patients.
+
+Intents:
+- "list_appointments": view the schedule. One day -> "date"; a range -> "start_date" and "end_date"; everything -> all dates null
+- "book_appointment": new appointment; needs date, time and patient_name
+- "cancel_appointment": cancel/remove an appointment; needs patient_name or date
+- "check_availability": asks whether a date and time is free
+- "system_info": questions about you; include a short "response"
+- "out_of_scope": anything unrelated to scheduling; include a "response" steering back to appointments
+
+Rules:
+- Dates are YYYY-MM-DD, resolved against today's date given with the message; a bare weekday means the upcoming one
+- Times are 24-hour HH:MM ("2pm" -> "14:00")
+- duration is 30 unless the receptionist states one; never list duration as missing
+- Fill details from earlier turns; if required ones are still missing set clarification_needed true and list them in missing_fields
+
+Keys: intent, date, start_date, end_date, time, patient_name, duration, clarification_needed, missing_fields (plus response for system_info/out_of_scope)
+
+Examples (today is 2025-10-31, a Friday):
+"Book John Smith at 2pm tomorrow"
+{"intent": "book_appointment", "date": "2025-11-01", "start_date": null, "end_date": null, "time": "14:00", "patient_name": "John Smith", "duration": 30, "clarification_needed": false, "missing_fields": []}
+"Show all appointments for the next 5 days"
+{"intent": "list_appointments", "date": null, "start_date": "2025-10-31", "end_date": "2025-11-04", "time": null, "patient_name": null, "duration": 30, "clarification_needed": false, "missing_fields": []}
+"I need to book an appointment"
+{"intent": "book_appointment", "date": null, "start_date": null, "end_date": null, "time": null, "patient_name": null, "duration": 30, "clarification_needed": true, "missing_fields": ["date", "time", "patient_name"]}
+
+Return ONLY valid JSON, no explanation."""
+
+# Appended to either variant when settings.INTENT_WITH_REPLY is on and some
+# intent is LLM-phrased; otherwise templates word clarifications and the
+# reply would be thrown away
+INTENT_REPLY_INSTRUCTIONS = """
+
+REPLY: When clarification_needed is true, also return "response": one short, friendly question asking the receptionist for the missing details (dates as "November 1", times as "2:00 PM")."""
+
+# Chosen with settings.INTENT_PROMPT. The system prompt never changes, so
+# providers that cache prompt prefixes can reuse it; today's date goes in
+# the user message instead
+INTENT_PROMPTS = {"full": INTENT_SYSTEM_PROMPT, "compact": INTENT_SYSTEM_PROMPT_COMPACT}
+
+RESPONSE_SYSTEM_PROMPT = """You are a professional clinic scheduling assistant helping a receptionist.
+Generate natural, concise, professional responses. Be helpful and clear.
+Format dates as "November 1" not "2025-11-01".
+Format times as "2:00 PM" not "14:00"."""
+
+ERROR_RESPONSE = "I encountered an error. Could you please repeat that?"
+UNAVAILABLE_RESPONSE = "I'm having trouble reaching the language service right now. Please try again in a moment."
+# Successful calls needed before hedging trusts the measured p95
+HEDGE_MIN_SAMPLES = 20
+# Context keys holding lists of patients; replies built from them aren't
+# cached unless RESPONSE_CACHE_PATIENT_LISTS is set
+PATIENT_LIST_KEYS = ("appointments", "did_you_mean")
+
+
+def llm_writes_clarifications():
+    """Whether the intent call writes the clarification question. Only worth
+    asking for when some intent is LLM-phrased; templates word them otherwise"""
+    return settings.INTENT_WITH_REPLY and bool(settings.LLM_PHRASED_INTENTS)
+
+
+class LLMService:
+    
+    def __init__(self):
+        self.api_key = settings.OPENROUTER_API_KEY
+        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.model = "qwen/qwen-2.5-72b-instruct"
+        self.session = self._create_session()
+        self._async_client = None
+        self._async_loop = None
+        self.response_cache = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+        self.intent_cache = IntentCache(settings.INTENT_CACHE_SIZE, settings.INTENT_CACHE_PATH or None)
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET)
+        self._latency = {kind: LatencyTracker(settings.LLM_LATENCY_WINDOW) for kind in ("intent", "response")}
+        # Threads start on first use; built here so concurrent first calls share one pool
+        self._hedge_pool = ThreadPoolExecutor(max_workers=settings.LLM_POOL_MAXSIZE, thread_name_prefix="llm-hedge")
+        self.retries = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        print("[LLM] Service initialized with Qwen 2.5 72B")
+    
+    def _create_session(self):
+        """One keep-alive session for all calls, so each turn reuses warm
+        TCP/TLS connections instead of handshaking with OpenRouter again.
+        urllib3's pool is thread-safe; pool_block caps connections per host."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.LLM_POOL_CONNECTIONS,
+            pool_maxsize=settings.LLM_POOL_MAXSIZE,
+            pool_block=True
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self._headers())
+        return session
+    
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _get_async_client(self):
+        """Pooled async client for the running event loop; httpx clients can't
+        be shared between loops, so a new loop gets a new client"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                headers=self._headers(),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_ASYNC_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_POOL_MAXSIZE
+                )
+            )
+            self._async_loop = loop
+        return self._async_client
+    
+    async def aclose(self):
+        """Close the async client's connections (call on app shutdown)"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+    
+    @staticmethod
+    def _intent_system_prompt():
+        prompt = INTENT_PROMPTS.get(settings.INTENT_PROMPT, INTENT_SYSTEM_PROMPT)
+        return prompt + INTENT_REPLY_INSTRUCTIONS if llm_writes_clarifications() else prompt
+    
+    def _intent_payload(self, user_message, conversation_history=None, pending=None):
+        """Chat completion request body for parsing a receptionist message.
+        With a pending request, its slots replace the raw history."""
+        context = ""
+        if pending:
+            filled = {slot: value for slot, value in pending.items() if value and slot != 'missing_fields'}
+            missing = ', '.join(pending.get('missing_fields') or []) or 'nothing'
+            context = f"Pending request, missing {missing}; keep these unless changed:\n{json.dumps(filled)}"
+        elif conversation_history and isinstance(conversation_history, list):
+            try:
+                context = "\n".join([
+                    f"User: {turn.get('user', '') if isinstance(turn, dict) else ''}\nAgent: {turn.get('agent', '') if isinstance(turn, dict) else ''}" 
+                    for turn in conversation_history[-3:] if isinstance(turn, dict)
+                ])
+            except Exception as e:
+                print(f"[LLM] Error building context: {e}")
+                context = ""
+        
         context_part = context if context else "None"
-        user_prompt = f"""Previous conversation:
+        # The only per-day part of the prompt, kept out of the cacheable system prefix
+        today = date.today()
+        user_prompt = f"""Today is {today.isoformat()} ({today.strftime('%A')}).
+
+Previous conversation:
 {context_part}
 
 Current receptionist message: "{user_message}"
 
 Parse this into JSON format."""
-
-        max_retries = 2
-        for attempt in range(max_retries):
+        
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self._intent_system_prompt()},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.1,
+            "max_tokens": 500
+        }
+    
+    @staticmethod
+    def _parse_intent_result(result):
+        """Intent dict with defaults filled in from a chat completion response"""
+        content = result['choices'][0]['message']['content'].strip()
+        
+        usage = result.get('usage')
+        if usage:
+            cached = (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+            print(f"[LLM] Intent prompt tokens: {usage.get('prompt_tokens')} ({cached} cached)")
+        
+        # Remove markdown code blocks if present
+        if 'json' in content and '`' in content:
+            start_idx = content.find('{')
+            end_idx = content.rfind('}')
+            if start_idx != -1 and end_idx != -1:
+                content = content[start_idx:end_idx+1]
+        
+        parsed = json.loads(content)
+        
+        # Set defaults
+        parsed.setdefault('intent', 'book_appointment')
+        parsed.setdefault('date', None)
+        parsed.setdefault('start_date', None)
+        parsed.setdefault('end_date', None)
+        parsed.setdefault('time', None)
+        parsed.setdefault('patient_name', None)
+        parsed.setdefault('duration', 30)
+        parsed.setdefault('clarification_needed', False)
+        parsed.setdefault('missing_fields', [])
+        
+        # Force rules for out_of_scope and system_info
+        if parsed['intent'] in ['out_of_scope', 'system_info']:
+            parsed['clarification_needed'] = False
+            parsed['missing_fields'] = []
+        
+        # Remove duration from missing_fields if present
+        if 'duration' in parsed['missing_fields']:
+            parsed['missing_fields'].remove('duration')
+            if not parsed['missing_fields']:
+                parsed['clarification_needed'] = False
+        
+        print(f"[LLM] Intent: {parsed.get('intent')}")
+        return parsed
+    
+    @staticmethod
+    def _intent_error(error):
+        return {
+            'intent': 'error',
+            'error': error,
+            'clarification_needed': False,
+            'missing_fields': []
+        }
+    
+    @staticmethod
+    def _intent_cache_key(user_message, conversation_history, pending=None):
+        """Cache key covering the message and the history turns (or pending
+        request) the prompt includes"""
+        if pending:
+            return IntentCache.key(user_message, [{'pending': pending}])
+        turns = conversation_history[-3:] if isinstance(conversation_history, list) else []
+        return IntentCache.key(user_message, [turn for turn in turns if isinstance(turn, dict)])
+    
+    def _cache_intent(self, key, intent_data):
+        if intent_data.get('intent') != 'error':
+            self.intent_cache.set(key, intent_data)
+        return intent_data
+    
+    def parse_intent(self, user_message, conversation_history=None, pending=None):
+        """Parse user intent with retry logic and conversation context;
+        `pending` is the slot frame of a request awaiting clarification"""
+        key = self._intent_cache_key(user_message, conversation_history, pending)
+        cached = self.intent_cache.get(key)
+        if cached is not None:
+            print(f"[LLM] Intent cache hit: {cached.get('intent')}")
+            return cached
+        return self._cache_intent(key, self._request_intent(user_message, conversation_history, pending))
+    
+    async def aparse_intent(self, user_message, conversation_history=None, pending=None):
+        """parse_intent without blocking the event loop"""
+        key = self._intent_cache_key(user_message, conversation_history, pending)
+        cached = self.intent_cache.get(key)
+        if cached is not None:
+            print(f"[LLM] Intent cache hit: {cached.get('intent')}")
+            return cached
+        return self._cache_intent(key, await self._arequest_intent(user_message, conversation_history, pending))
+    
+    def _request_intent(self, user_message, conversation_history=None, pending=None):
+        payload = self._intent_payload(user_message, conversation_history, pending)
+        try:
+            return self._call(payload, "intent", settings.LLM_INTENT_TIMEOUT, self._parse_intent_result)
+        except LLMUnavailable as e:
+            print(f"[LLM] Intent parsing failed: {e}")
+            return self._intent_error(e.reason)
+    
+    async def _arequest_intent(self, user_message, conversation_history=None, pending=None):
+        payload = self._intent_payload(user_message, conversation_history, pending)
+        try:
+            return await self._acall(payload, "intent", settings.LLM_INTENT_TIMEOUT, self._parse_intent_result)
+        except LLMUnavailable as e:
+            print(f"[LLM] Intent parsing failed: {e}")
+            return self._intent_error(e.reason)
+    
+    def _send(self, payload, timeout, kind):
+        """One chat completion request; returns the decoded response"""
+        started = time.monotonic()
+        with metrics.LLM.track(kind=kind):
+            response = self.session.post(self.api_url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+        self._latency[kind].record(time.monotonic() - started)
+        return result
+    
+    async def _asend(self, payload, timeout, kind):
+        started = time.monotonic()
+        with metrics.LLM.track(kind=kind):
+            response = await self._get_async_client().post(self.api_url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+        self._latency[kind].record(time.monotonic() - started)
+        return result
+    
+    def _hedge_delay(self, kind):
+        """Seconds to wait before sending a backup request, or None to not hedge"""
+        if not settings.LLM_HEDGE:
+            return None
+        p95 = self._latency[kind].percentile(0.95, HEDGE_MIN_SAMPLES)
+        return None if p95 is None else max(p95, settings.LLM_HEDGE_MIN_DELAY)
+    
+    def _attempt(self, payload, timeout, kind):
+        """_send, plus a hedged second request if the first is slower than
+        recent p95; whichever succeeds first wins"""
+        delay = self._hedge_delay(kind)
+        if delay is None or delay >= timeout:
+            return self._send(payload, timeout, kind)
+        
+        started = threading.Event()
+        
+        def send_first():
+            started.set()
+            return self._send(payload, timeout, kind)
+        
+        first = self._hedge_pool.submit(send_first)
+        # Time the hedge from when the request goes out, not from when it was
+        # queued, so a busy pool doesn't make every request look slow
+        if not started.wait(timeout) and first.cancel():
+            raise requests.exceptions.Timeout("no free worker to send the LLM request")
+        try:
+            return first.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+        
+        self.hedges_sent += 1
+        second = self._hedge_pool.submit(self._send, payload, timeout - delay, kind)
+        error = None
+        for future in as_completed([first, second]):
             try:
-                print(f"[LLM] Parsing intent (attempt {attempt + 1}/{max_retries})...")
-                
-                response = requests.post(
-                    self.api_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "temperature": 0.1,
-                        "max_tokens": 500
-                    },
-                    timeout=45
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                content = result['choices'][0]['message']['content'].strip()
-                
-                # Remove markdown code blocks if present
-                if 'json' in content and '`' in content:
-                    start_idx = content.find('{')
-                    end_idx = content.rfind('}')
-                    if start_idx != -1 and end_idx != -1:
-                        content = content[start_idx:end_idx+1]
-                
-                parsed = json.loads(content)
-                
-                # Set defaults
-                parsed.setdefault('intent', 'book_appointment')
-                parsed.setdefault('date', None)
-                parsed.setdefault('start_date', None)
-                parsed.setdefault('end_date', None)
-                parsed.setdefault('time', None)
-                parsed.setdefault('patient_name', None)
-                parsed.setdefault('duration', 30)
-                parsed.setdefault('clarification_needed', False)
-                parsed.setdefault('missing_fields', [])
-                
-                # Force rules for out_of_scope and system_info
-                if parsed['intent'] in ['out_of_scope', 'system_info']:
-                    parsed['clarification_needed'] = False
-                    parsed['missing_fields'] = []
-                
-                # Remove duration from missing_fields if present
-                if 'duration' in parsed['missing_fields']:
-                    parsed['missing_fields'].remove('duration')
-                    if not parsed['missing_fields']:
-                        parsed['clarification_needed'] = False
-                
-                print(f"[LLM] Intent: {parsed.get('intent')}")
-                return parsed
-                
-            except requests.exceptions.Timeout:
-                print(f"[LLM] Timeout on attempt {attempt + 1}")
-                if attempt < max_retries - 1:
-                    continue
-                else:
-                    print("[LLM] All retry attempts failed")
-                    return {
-                        'intent': 'error',
-                        'error': 'timeout',
-                        'clarification_needed': False,
-                        'missing_fields': []
-                    }
+                result = future.result()
             except Exception as e:
-                print(f"[LLM] Error parsing intent: {e}")
-                if attempt < max_retries - 1:
-                    continue
-                return {
-                    'intent': 'error',
-                    'error': str(e),
-                    'clarification_needed': False,
-                    'missing_fields': []
-                }
+                error = e
+                continue
+            if future is second:
+                self.hedges_won += 1
+            return result
+        raise error
+    
+    async def _aattempt(self, payload, timeout, kind):
+        delay = self._hedge_delay(kind)
+        if delay is None or delay >= timeout:
+            return await self._asend(payload, timeout, kind)
+        
+        first = asyncio.ensure_future(self._asend(payload, timeout, kind))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        
+        self.hedges_sent += 1
+        second = asyncio.ensure_future(self._asend(payload, timeout - delay, kind))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    @staticmethod
+    def _unavailable(error):
+        if error is None:
+            return LLMUnavailable("timeout", "turn deadline passed")
+        return LLMUnavailable("timeout" if is_timeout(error) else "error", str(error))
+    
+    def _retry_pause(self, attempt, deadline):
+        """Backoff before the next attempt, or None if there's no next attempt"""
+        if attempt + 1 >= settings.LLM_MAX_ATTEMPTS:
+            return None
+        pause = backoff_delay(attempt, settings.LLM_BACKOFF_BASE, settings.LLM_BACKOFF_MAX)
+        if time.monotonic() + pause >= deadline:
+            return None
+        self.retries += 1
+        return pause
+    
+    def _call(self, payload, kind, timeout, parse):
+        """POST payload and return parse(result), retrying with jittered
+        backoff within the turn deadline. Raises LLMUnavailable."""
+        deadline = current_deadline(settings.LLM_TURN_DEADLINE)
+        error = None
+        for attempt in range(settings.LLM_MAX_ATTEMPTS):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit_open", "circuit breaker is open")
+            
+            print(f"[LLM] {kind} request (attempt {attempt + 1}/{settings.LLM_MAX_ATTEMPTS})...")
+            try:
+                result = self._attempt(payload, min(timeout, remaining), kind)
+            except Exception as e:
+                self.breaker.record_failure()
+                error = e
+                print(f"[LLM] {kind} attempt {attempt + 1} failed: {e}")
+                if not is_retryable(e):
+                    break
+            except BaseException:
+                # Interrupted, not failed: no verdict on the provider
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                try:
+                    return parse(result)
+                except Exception as e:
+                    # The provider answered but the completion was unusable; ask again
+                    error = e
+                    print(f"[LLM] Unusable {kind} completion: {e}")
+            
+            pause = self._retry_pause(attempt, deadline)
+            if pause is None:
+                break
+            time.sleep(pause)
+        raise self._unavailable(error)
+    
+    async def _acall(self, payload, kind, timeout, parse):
+        """_call without blocking the event loop"""
+        deadline = current_deadline(settings.LLM_TURN_DEADLINE)
+        error = None
+        for attempt in range(settings.LLM_MAX_ATTEMPTS):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit_open", "circuit breaker is open")
+            
+            print(f"[LLM] {kind} request (attempt {attempt + 1}/{settings.LLM_MAX_ATTEMPTS})...")
+            try:
+                result = await self._aattempt(payload, min(timeout, remaining), kind)
+            except Exception as e:
+                self.breaker.record_failure()
+                error = e
+                print(f"[LLM] {kind} attempt {attempt + 1} failed: {e}")
+                if not is_retryable(e):
+                    break
+            except BaseException:
+                # Cancelled, not failed: no verdict on the provider
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                try:
+                    return parse(result)
+                except Exception as e:
+                    error = e
+                    print(f"[LLM] Unusable {kind} completion: {e}")
+            
+            pause = self._retry_pause(attempt, deadline)
+            if pause is None:
+                break
+            await asyncio.sleep(pause)
+        raise self._unavailable(error)
+    
+    def _response_payload(self, context):
+        """Chat completion request body for phrasing a reply from node context"""
+        user_prompt = f"Context: {json.dumps(context)}\nGenerate appropriate response:"
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": RESPONSE_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 200
+        }
+    
+    @staticmethod
+    def _response_cache_key(context):
+        """Hash of the canonical JSON form of the context, or None if its
+        reply shouldn't be cached"""
+        if not settings.RESPONSE_CACHE_PATIENT_LISTS and any(context.get(key) for key in PATIENT_LIST_KEYS):
+            return None
+        canonical = json.dumps(context, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+    
+    def _cached_response(self, key):
+        if key is None:
+            return None
+        reply = self.response_cache.get(key)
+        if reply is not None:
+            print("[LLM] Response cache hit")
+        return reply
+    
+    def _cache_response(self, key, context, reply):
+        if key is not None:
+            ttl = settings.RESPONSE_CACHE_TTLS.get(context.get('intent'), settings.RESPONSE_CACHE_TTL)
+            self.response_cache.set(key, reply, ttl)
+    
+    @staticmethod
+    def _reply_text(result):
+        reply = result['choices'][0]['message']['content'].strip()
+        if not reply:
+            raise ValueError("empty completion")
+        return reply
+    
+    @staticmethod
+    def _fallback_reply(error):
+        print(f"[LLM] Error generating response: {error}")
+        return UNAVAILABLE_RESPONSE if error.reason == "circuit_open" else ERROR_RESPONSE
     
     def generate_response(self, context):
         """Generate natural response based on context"""
+        key = self._response_cache_key(context)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
         
-        system_prompt = """You are a professional clinic scheduling assistant helping a receptionist.
-Generate natural, concise, professional responses. Be helpful and clear.
-Format dates as "November 1" not "2025-11-01".
-Format times as "2:00 PM" not "14:00"."""
-
-        user_prompt = f"Context: {json.dumps(context)}\nGenerate appropriate response:"
+        try:
+            reply = self._call(self._response_payload(context), "response", settings.LLM_RESPONSE_TIMEOUT, self._reply_text)
+        except LLMUnavailable as e:
+            return self._fallback_reply(e)
+        
+        self._cache_response(key, context, reply)
+        return reply
+    
+    async def agenerate_response(self, context):
+        """generate_response without blocking the event loop"""
+        key = self._response_cache_key(context)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
         
         try:
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 200
-                },
-                timeout=20
+            reply = await self._acall(
+                self._response_payload(context), "response", settings.LLM_RESPONSE_TIMEOUT, self._reply_text
             )
-            
-            response.raise_for_status()
-            result = response.json()
-            return result['choices'][0]['message']['content'].strip()
-            
+        except LLMUnavailable as e:
+            return self._fallback_reply(e)
+        
+        self._cache_response(key, context, reply)
+        return reply
+    
+    async def astream_response(self, context):
+        """agenerate_response as an async generator of text pieces, yielded as
+        the completion streams in; cached replies come back in one piece.
+        Raises LLMUnavailable("interrupted") if the stream breaks after some
+        text was yielded; the caller should replace that partial text."""
+        key = self._response_cache_key(context)
+        cached = self._cached_response(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        if not self.breaker.allow():
+            yield UNAVAILABLE_RESPONSE
+            return
+        
+        payload = self._response_payload(context)
+        payload["stream"] = True
+        remaining = current_deadline(settings.LLM_TURN_DEADLINE) - time.monotonic()
+        pieces = []
+        try:
+            client = self._get_async_client()
+            timeout = max(0.0, min(settings.LLM_RESPONSE_TIMEOUT, remaining))
+            with metrics.LLM.track(kind="stream"):
+                async with client.stream("POST", self.api_url, json=payload, timeout=timeout) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        # Server-sent events; lines starting with ':' are keep-alive comments
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        choices = json.loads(data).get('choices') or [{}]
+                        piece = choices[0].get('delta', {}).get('content')
+                        if piece:
+                            if not pieces:
+                                piece = piece.lstrip()
+                            pieces.append(piece)
+                            yield piece
         except Exception as e:
-            print(f"[LLM] Error generating response: {e}")
-            return "I encountered an error. Could you please repeat that?"
+            self.breaker.record_failure()
+            print(f"[LLM] Error streaming response: {e}")
+            if pieces:
+                raise LLMUnavailable("interrupted", str(e)) from e
+            # Nothing shown yet, so the retrying buffered call can still answer
+            yield await self.agenerate_response(context)
+            return
+        except BaseException:
+            # Cancelled, or the client went away mid-stream (GeneratorExit)
+            self.breaker.release()
+            raise
+        
+        self.breaker.record_success()
+        reply = "".join(pieces).strip()
+        if reply:
+            self._cache_response(key, context, reply)
+        else:
+            yield ERROR_RESPONSE
+    
+    def resilience_stats(self):
+        """Circuit breaker state, retry/hedge counters and recent latencies"""
+        latency = {kind: tracker.summary() for kind, tracker in self._latency.items()}
+        return {
+            "circuit_breaker": self.breaker.stats(),
+            "retries": self.retries,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "latency": latency
+        }
+    
+    def stats(self):
+        return {**self.cache_stats(), "llm": self.resilience_stats()}
+    
+    def cache_stats(self):
+        """Hit/miss/eviction counters for the LLM caches"""
+        return {
+            "response_cache": self.response_cache.stats(),
+            "intent_cache": self.intent_cache.stats()
+        }
 
 
 llm_service = LLMService()
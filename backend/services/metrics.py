@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal Prometheus metrics in the text exposition format (0.0.4): labelled
+# histograms, gauges and counters, rendered by GET /metrics. Covers what the
+# agent needs without pulling in prometheus_client.
+
+# Seconds; LLM calls and speech run to tens of seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._function = None
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function):
+        """Read the (unlabelled) value from function() at scrape time"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            return [(self.name, "", self._function())]
+        with self._lock:
+            return [(self.name, _labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines += [f"{name}{labels} {_number(value)}" for name, labels, value in self._samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0] * len(self.buckets), 0.0))
+            return counts[-1]
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    labels = _labels(self.labelnames, key, [("le", _number(bound))])
+                    samples.append((f"{self.name}_bucket", labels, count))
+                samples.append((f"{self.name}_sum", _labels(self.labelnames, key), total))
+                samples.append((f"{self.name}_count", _labels(self.labelnames, key), counts[-1]))
+        return samples
+
+
+class Stage:
+    """Duration histogram, in-flight gauge and error counter for one kind of
+    work, e.g. a graph node or an LLM request"""
+
+    def __init__(self, name, what, labelnames=()):
+        what = what[0].upper() + what[1:]
+        self.duration = Histogram(f"{name}_duration_seconds", f"Time spent in {what}", labelnames)
+        self.in_flight = Gauge(f"{name}_in_flight", f"{what} currently running", labelnames)
+        self.errors = Counter(f"{name}_errors_total", f"{what} that raised, by exception type",
+                              tuple(labelnames) + ("error",))
+
+    @contextmanager
+    def track(self, **labels):
+        """Time the block, count it while it runs, and count what it raises"""
+        self.in_flight.inc(**labels)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors.inc(error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.duration.observe(time.perf_counter() - started, **labels)
+            self.in_flight.dec(**labels)
+
+
+def render():
+    """Every registered metric in the Prometheus text format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# Stages of a turn
+NODE = Stage("agent_node", "LangGraph nodes", ("node",))
+LLM = Stage("llm_request", "LLM HTTP requests", ("kind",))
+STT = Stage("stt_transcribe", "Whisper transcriptions")
+TTS = Stage("tts_speak", "spoken replies")
+
+# Read from the services at scrape time; bound in main.py
+LLM_CIRCUIT_OPEN = Gauge("llm_circuit_breaker_open", "1 while the LLM circuit breaker is refusing calls")
+LLM_RETRIES = Counter("llm_retries_total", "LLM request attempts after the first")
+LLM_HEDGES = Counter("llm_hedged_requests_total", "Backup LLM requests sent after the p95 delay")
+SESSIONS = Gauge("agent_sessions", "Conversations held in memory")
+TTS_QUEUE = Gauge("tts_queue_depth", "Replies waiting to be spoken")
+TTS_DROPPED = Counter("tts_dropped_total", "Replies dropped from a full speech queue")
@@ -0,0 +1,133 @@
+import bisect
+import re
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+
+
+def normalize_name(name):
+    """Case-folded, punctuation-free, single-spaced form used as the lookup key"""
+    return " ".join(re.sub(r"[^\w\s]", " ", name.casefold()).split())
+
+
+def name_trigrams(name_key):
+    padded = f"  {name_key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Floors for partial names. Whole words ("Michael" for "Michael Jordan") are
+# trusted; bare prefixes ("Mich") only score high enough to be suggested,
+# below the default PATIENT_MATCH_THRESHOLD, so nothing is cancelled on one
+WHOLE_WORD_SCORE = 0.85
+PREFIX_SCORE = 0.7
+MIN_PREFIX = 3
+
+
+def name_similarity(query_key, candidate_key):
+    """Confidence in [0, 1] that two normalized names refer to the same patient.
+
+    Edit-distance style ratio, so STT slips like "Jon Smith" score highly;
+    a query whose words are all words of the candidate scores at least
+    WHOLE_WORD_SCORE, and one whose words all start words of the candidate
+    with at least MIN_PREFIX letters at least PREFIX_SCORE."""
+    if query_key == candidate_key:
+        return 1.0
+    if not query_key or not candidate_key:
+        return 0.0
+    score = SequenceMatcher(None, query_key, candidate_key).ratio()
+    query_words, candidate_words = query_key.split(), candidate_key.split()
+    if all(q in candidate_words for q in query_words):
+        score = max(score, WHOLE_WORD_SCORE)
+    elif all(
+        len(q) >= MIN_PREFIX and any(word.startswith(q) for word in candidate_words) for q in query_words
+    ):
+        score = max(score, PREFIX_SCORE)
+    return score
+
+
+class PatientNameIndex:
+    """Normalized patient name -> confirmed appointments sorted by (day, start),
+    plus a trigram index over the names for fuzzy lookup"""
+
+    def __init__(self):
+        self._refs = {}      # name key -> (sorted (day, start) keys, appointments in the same order)
+        self._trigrams = {}  # trigram -> set of name keys
+        self._display = {}   # name key -> name as first booked
+        self._lock = threading.Lock()
+
+    def add(self, apt):
+        key = normalize_name(apt.patient_name)
+        with self._lock:
+            entry = self._refs.get(key)
+            if entry is None:
+                entry = self._refs[key] = ([], [])
+                self._display[key] = apt.patient_name
+                for trigram in name_trigrams(key):
+                    self._trigrams.setdefault(trigram, set()).add(key)
+            keys, apts = entry
+            pos = bisect.bisect_right(keys, (apt.day, apt.start))
+            keys.insert(pos, (apt.day, apt.start))
+            apts.insert(pos, apt)
+
+    def remove(self, apt):
+        key = normalize_name(apt.patient_name)
+        with self._lock:
+            entry = self._refs.get(key)
+            if not entry:
+                return
+            keys, apts = entry
+            pos = bisect.bisect_left(keys, (apt.day, apt.start))
+            while pos < len(keys) and keys[pos] == (apt.day, apt.start):
+                if apts[pos] is apt:
+                    del keys[pos]
+                    del apts[pos]
+                    break
+                pos += 1
+            if not keys:
+                del self._refs[key]
+                del self._display[key]
+                for trigram in name_trigrams(key):
+                    names = self._trigrams.get(trigram)
+                    if names is not None:
+                        names.discard(key)
+                        if not names:
+                            del self._trigrams[trigram]
+
+    def earliest(self, patient_name, from_day, on_day=None):
+        """Earliest appointment for the exact (normalized) name on or after
+        the from_day ordinal, or only on on_day when given"""
+        entry = self._refs.get(normalize_name(patient_name))
+        if not entry:
+            return None
+        keys, apts = entry
+        pos = bisect.bisect_left(keys, (on_day if on_day is not None else from_day,))
+        if pos == len(keys) or (on_day is not None and keys[pos][0] != on_day):
+            return None
+        return apts[pos]
+
+    def entries(self, patient_name):
+        """Everything indexed under the exact (normalized) name, in (day, start) order"""
+        entry = self._refs.get(normalize_name(patient_name))
+        return list(entry[1]) if entry else []
+
+    def candidates(self, patient_name, limit=20):
+        """Indexed names sharing at least half of patient_name's trigrams, as
+        (name key, display name) pairs, most shared trigrams first"""
+        query = name_trigrams(normalize_name(patient_name))
+        with self._lock:
+            postings = sorted((self._trigrams.get(trigram, frozenset()) for trigram in query), key=len)
+            min_shared = (len(postings) + 1) // 2
+            # Pigeonhole: a name sharing min_shared trigrams must appear in one of
+            # the len - min_shared + 1 shortest postings, so only those are scanned
+            cutoff = len(postings) - min_shared + 1
+            shared = Counter()
+            for names in postings[:cutoff]:
+                shared.update(names)
+            shortlist = set(shared)
+            for names in postings[cutoff:]:
+                shared.update(shortlist & names)
+            return [
+                (key, self._display[key])
+                for key, count in shared.most_common(limit)
+                if count >= min_shared
+            ]
@@ -0,0 +1,78 @@
+from dataclasses import dataclass, field
+from backend.services.appointment import Appointment
+from backend.services.time_utils import ordinal_to_date, minutes_to_time
+
+# Days between occurrences for each supported frequency
+FREQUENCIES = {"daily": 1, "weekly": 7}
+
+
+@dataclass(slots=True, eq=False)
+class Series:
+    """A recurring booking: the same time every `interval` days from `day`
+    through `last_day`. Occurrences are generated on demand, so a series costs
+    the same memory however many times it repeats."""
+
+    day: int            # ordinal of the first occurrence
+    start: int          # minutes since midnight
+    patient_name: str
+    duration: int
+    interval: int       # days between occurrences
+    last_day: int       # ordinal of the last possible occurrence
+    status: str = "confirmed"
+    id: str = None
+    exceptions: set = field(default_factory=set)  # ordinals of cancelled occurrences
+
+    @staticmethod
+    def last_day_for(first_day, interval, count=None, until_day=None):
+        """Last occurrence for a series ending after `count` times or on `until_day`, whichever is first"""
+        last = first_day + (count - 1) * interval if count else until_day
+        if count and until_day is not None:
+            last = min(last, until_day)
+        # Snap `until` back onto the series' own grid
+        return last - (last - first_day) % interval
+
+    def occurs_on(self, day):
+        """Whether a live occurrence falls on this day (ignores the series status)"""
+        return (
+            self.day <= day <= self.last_day
+            and (day - self.day) % self.interval == 0
+            and day not in self.exceptions
+        )
+
+    def days(self, start_day=None, end_day=None):
+        """Yield occurrence days (including exceptions) within start_day..end_day"""
+        first = self.day
+        if start_day is not None and start_day > first:
+            first += -(-(start_day - first) // self.interval) * self.interval
+        last = self.last_day if end_day is None else min(self.last_day, end_day)
+        return range(first, last + 1, self.interval)
+
+    def next_day(self, from_day, on_day=None):
+        """First live occurrence on or after from_day (or exactly on_day), or None"""
+        if on_day is not None:
+            return on_day if self.occurs_on(on_day) else None
+        for day in self.days(from_day):
+            if day not in self.exceptions:
+                return day
+        return None
+
+    def occurrence(self, day):
+        """The occurrence on `day` as an Appointment linked back to this series"""
+        status = "cancelled" if self.status != "confirmed" or day in self.exceptions else "confirmed"
+        return Appointment(
+            day, self.start, self.patient_name, self.duration, status,
+            f"{self.id}@{ordinal_to_date(day)}", self
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "first_date": ordinal_to_date(self.day),
+            "last_date": ordinal_to_date(self.last_day),
+            "time": minutes_to_time(self.start),
+            "interval_days": self.interval,
+            "patient_name": self.patient_name,
+            "duration": self.duration,
+            "status": self.status,
+            "cancelled_dates": sorted(ordinal_to_date(day) for day in self.exceptions)
+        }
@@ -0,0 +1,189 @@
+from backend.services.time_utils import CLINIC_OPEN, CLINIC_CLOSE, format_date_str, format_time, format_time_str
+
+# Longest list read out in full; the rest are summarised as "and N more"
+MAX_LISTED = 10
+
+FIELD_NAMES = {"patient_name": "the patient's name", "date": "the date", "time": "the time"}
+INTENT_ACTIONS = {
+    "book_appointment": "book the appointment",
+    "cancel_appointment": "cancel the appointment",
+    "check_availability": "check availability",
+    "list_appointments": "look up the schedule",
+}
+
+
+def _join(items, word="and"):
+    """['a', 'b', 'c'] -> 'a, b and c'"""
+    items = list(items)
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} {word} {items[-1]}"
+
+
+def _spoken_date(date_str):
+    """ISO dates from the state as 'November 01'; anything else as given"""
+    try:
+        return format_date_str(date_str)
+    except (TypeError, ValueError):
+        return date_str
+
+
+def _spoken_time(time_str):
+    """Times from the state as '2:00 PM'; anything else as given"""
+    if not time_str:
+        return time_str
+    return format_time_str(time_str) or time_str
+
+
+def _appointment_list(appointments, count, with_dates):
+    """Readable list of the nodes' formatted appointments, capped at MAX_LISTED"""
+    entries = []
+    for apt in appointments[:MAX_LISTED]:
+        if with_dates:
+            day = f"{apt['day_of_week']}, {apt['date']}" if apt.get('day_of_week') else apt['date']
+            entries.append(f"{apt['patient']} on {day} at {apt['time']}")
+        else:
+            entries.append(f"{apt['patient']} at {apt['time']}")
+    if count > MAX_LISTED:
+        entries.append(f"{count - MAX_LISTED} more")
+    return _join(entries)
+
+
+def _plural(count, noun="appointment"):
+    return f"{count} {noun}{'' if count == 1 else 's'}"
+
+
+def _list_scope(context):
+    """'on November 01', 'between November 01 and November 05', ... for list replies"""
+    if context.get('end_date'):
+        return f"between {context['start_date']} and {context['end_date']}"
+    if context.get('future_request'):
+        return f"in the 7 days from {context['start_date']}"
+    if context.get('all_future'):
+        return "coming up"
+    return f"on {_spoken_date(context.get('date'))}"
+
+
+def _no_appointments(context):
+    return f"There are no appointments {_list_scope(context)}."
+
+
+def _found_appointments(context):
+    count = context['count']
+    listed = _appointment_list(context['appointments'], count, with_dates='date' not in context)
+    return f"You have {_plural(count)} {_list_scope(context)}: {listed}."
+
+
+def _available(context):
+    return f"Yes, {context['time']} on {context['date']} is available."
+
+
+def _missing_time(context):
+    if context.get('date'):
+        return f"What time would you like on {_spoken_date(context['date'])}?"
+    return "What date and time would you like?"
+
+
+def _past_date(context):
+    return f"{_spoken_date(context['date'])} is in the past. Please choose a future date."
+
+
+def _outside_hours(context):
+    return (
+        f"{_spoken_time(context['time'])} is outside clinic hours. "
+        f"We're open {format_time(CLINIC_OPEN)} to {format_time(CLINIC_CLOSE)}."
+    )
+
+
+def _invalid_date(context):
+    return f"I couldn't work out the date \"{context['date']}\". Which day would you like?"
+
+
+def _invalid_time(context):
+    return f"I couldn't work out the time \"{context['time']}\". What time would you like?"
+
+
+def _slot_taken(context):
+    reply = f"{context['requested_time']} on {context['requested_date']} is already booked."
+    slots = [
+        f"{slot['formatted']} on {slot['formatted_date']}" if 'formatted_date' in slot else slot['formatted']
+        for slot in context.get('available_slots', [])
+    ]
+    if not slots:
+        return f"{reply} I couldn't find another open slot nearby. Would you like to try a different day?"
+    if context.get('intent') == 'book_appointment':
+        return f"{reply} I can book {_join(slots, 'or')} instead. Which would you prefer?"
+    return f"{reply} The nearest open {'slot is' if len(slots) == 1 else 'slots are'} {_join(slots)}."
+
+
+def _booked(context):
+    return (
+        f"{context['patient_name']} is booked on {context['date']} at {context['time']} "
+        f"for {context.get('duration') or 30} minutes."
+    )
+
+
+def _booking_failed(context):
+    return f"I couldn't book that appointment. {context['error_message'].rstrip('.')}."
+
+
+def _cancelled(context):
+    return f"{context['patient_name']}'s appointment on {context['date']} at {context['time']} has been cancelled."
+
+
+def _cancel_not_found(context):
+    if context.get('did_you_mean'):
+        return (
+            f"I couldn't find an appointment for {context['patient_name']}. "
+            f"Did you mean {_join(context['did_you_mean'], 'or')}?"
+        )
+    return "I couldn't find a matching appointment to cancel. Could you give me the patient's name or the date and time?"
+
+
+def _cancel_missing_info(context):
+    return f"{context['message']}."
+
+
+def _clarification(context):
+    missing = [FIELD_NAMES[field] for field in context.get('missing_fields', []) if field in FIELD_NAMES]
+    action = INTENT_ACTIONS.get(context.get('intent'))
+    if not missing or not action:
+        return None
+    return f"To {action}, I still need {_join(missing)}."
+
+
+# Keyed on (intent, result or error); None matches any intent
+TEMPLATES = {
+    ("list_appointments", "no_appointments"): _no_appointments,
+    ("list_appointments", "found_appointments"): _found_appointments,
+    ("list_appointments", "found_appointments_range"): _found_appointments,
+    ("check_availability", "available"): _available,
+    ("check_availability", "missing_time"): _missing_time,
+    ("book_appointment", "past_date"): _past_date,
+    (None, "outside_hours"): _outside_hours,
+    (None, "invalid_date"): _invalid_date,
+    (None, "invalid_time"): _invalid_time,
+    (None, "slot_taken"): _slot_taken,
+    ("book_appointment", "success"): _booked,
+    ("book_appointment", "failure"): _booking_failed,
+    ("cancel_appointment", "success"): _cancelled,
+    ("cancel_appointment", "not_found"): _cancel_not_found,
+    ("cancel_appointment", "missing_info"): _cancel_missing_info,
+}
+
+
+def render_response(context):
+    """Phrase a node's response context locally, or None when no template
+    covers it and the LLM should phrase it instead"""
+    if context.get('clarification_needed'):
+        return _clarification(context)
+
+    outcome = context.get('result') or context.get('error')
+    template = TEMPLATES.get((context.get('intent'), outcome)) or TEMPLATES.get((None, outcome))
+    if template is None:
+        return None
+    try:
+        return template(context)
+    except (KeyError, TypeError):
+        # Context missing a field the template needs; let the LLM handle it
+        return None
@@ -0,0 +1,327 @@
+import contextlib
+import sqlite3
+import threading
+from backend.services.appointment import Appointment
+from backend.services.time_utils import date_to_ordinal, ordinal_to_date, today_ordinal, time_to_minutes, minutes_to_time
+from backend.services.calendar_service import BaseCalendarService
+from backend.services.recurrence import Series
+from backend.services.patient_index import normalize_name, name_trigrams
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS appointments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    patient_name TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'confirmed',
+    name_key TEXT NOT NULL
+);
+
+-- Covers day lookups and range scans: every column they read (id is the rowid)
+CREATE INDEX IF NOT EXISTS idx_appointments_date_time_status
+    ON appointments (date, time, status, duration, patient_name);
+
+-- Patient lookups go by name_key, normalize_name(patient_name), so names
+-- match exactly as they do in the in-memory calendar's PatientNameIndex
+CREATE INDEX IF NOT EXISTS idx_appointments_name_key
+    ON appointments (name_key, date, time);
+
+-- Fuzzy patient lookup: every distinct name, and the trigrams it contains
+CREATE TABLE IF NOT EXISTS patient_names (
+    name_key TEXT PRIMARY KEY,
+    patient_name TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS patient_trigrams (
+    trigram TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    PRIMARY KEY (trigram, name_key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS patient_trigram_counts (
+    trigram TEXT PRIMARY KEY,
+    names INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Recurring series: one row per rule, occurrences are expanded on read
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    interval_days INTEGER NOT NULL,
+    patient_name TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'confirmed',
+    name_key TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_series_span
+    ON series (first_date, last_date);
+
+CREATE INDEX IF NOT EXISTS idx_series_name_key
+    ON series (name_key);
+
+-- Single cancelled occurrences of a series
+CREATE TABLE IF NOT EXISTS series_exceptions (
+    series_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (series_id, date)
+) WITHOUT ROWID;
+"""
+
+# Statements are constant strings so sqlite3's per-connection statement
+# cache prepares each of them only once
+COLUMNS = "id, date, time, patient_name, duration, status"
+SELECT_DAY = f"SELECT {COLUMNS} FROM appointments WHERE date = ? AND status = 'confirmed' ORDER BY time"
+SELECT_RANGE = f"SELECT {COLUMNS} FROM appointments WHERE date >= ? AND date <= ? AND status = ? ORDER BY date, time"
+SELECT_RANGE_ANY = f"SELECT {COLUMNS} FROM appointments WHERE date >= ? AND date <= ? ORDER BY date, time"
+SELECT_PATIENT_ON_DATE = (
+    f"SELECT {COLUMNS} FROM appointments "
+    "WHERE name_key = ? AND date = ? AND status = 'confirmed' ORDER BY time LIMIT 1"
+)
+SELECT_PATIENT_FROM = (
+    f"SELECT {COLUMNS} FROM appointments "
+    "WHERE name_key = ? AND date >= ? AND status = 'confirmed' ORDER BY date, time LIMIT 1"
+)
+INSERT_APPOINTMENT = (
+    "INSERT INTO appointments (date, time, patient_name, duration, status, name_key) VALUES (?, ?, ?, ?, ?, ?)"
+)
+INSERT_NAME = "INSERT OR IGNORE INTO patient_names (name_key, patient_name) VALUES (?, ?)"
+INSERT_TRIGRAM = "INSERT OR IGNORE INTO patient_trigrams (trigram, name_key) VALUES (?, ?)"
+COUNT_TRIGRAM = (
+    "INSERT INTO patient_trigram_counts (trigram, names) VALUES (?, 1) "
+    "ON CONFLICT (trigram) DO UPDATE SET names = names + 1"
+)
+UPDATE_CANCELLED = "UPDATE appointments SET status = 'cancelled' WHERE id = ? AND status = 'confirmed'"
+
+SERIES_COLUMNS = "id, first_date, last_date, time, interval_days, patient_name, duration, status"
+SELECT_SERIES = f"SELECT {SERIES_COLUMNS} FROM series WHERE id = ?"
+SELECT_SERIES_SPAN = f"SELECT {SERIES_COLUMNS} FROM series WHERE first_date <= ? AND last_date >= ?"
+SELECT_SERIES_PATIENT = (
+    f"SELECT {SERIES_COLUMNS} FROM series WHERE name_key = ? AND status = 'confirmed'"
+)
+INSERT_SERIES = (
+    "INSERT INTO series (first_date, last_date, time, interval_days, patient_name, duration, status, name_key) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_EXCEPTION = "INSERT OR IGNORE INTO series_exceptions (series_id, date) VALUES (?, ?)"
+UPDATE_SERIES_CANCELLED = "UPDATE series SET status = 'cancelled' WHERE id = ? AND status = 'confirmed'"
+
+# Open-ended range bounds; ISO dates sort lexicographically
+MIN_DATE = "0000-00-00"
+MAX_DATE = "9999-99-99"
+
+
+def _row_to_appointment(row):
+    # Dates and times stay ISO text on disk so the database remains readable
+    return Appointment(date_to_ordinal(row[1]), time_to_minutes(row[2]), row[3], row[4], row[5], f"db_{row[0]}")
+
+
+def _row_to_series(row):
+    return Series(
+        date_to_ordinal(row[1]), time_to_minutes(row[3]), row[5], row[6], row[4],
+        date_to_ordinal(row[2]), row[7], f"db_series_{row[0]}"
+    )
+
+
+def _row_id(event_id):
+    return int(event_id.rsplit("_", 1)[1])
+
+
+class SQLiteCalendarService(BaseCalendarService):
+    """Calendar persisted in SQLite (WAL mode), safe to share between
+    several uvicorn workers pointing at the same database file"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        count = conn.execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+        
+        # Databases created before the name tables existed
+        if count and not conn.execute("SELECT 1 FROM patient_names LIMIT 1").fetchone():
+            conn.execute("BEGIN IMMEDIATE")
+            for (patient_name,) in conn.execute("SELECT DISTINCT patient_name FROM appointments").fetchall():
+                self._index_name(patient_name)
+            conn.execute("COMMIT")
+
+        print(f"[CALENDAR] SQLite calendar service initialized ({db_path})")
+        print(f"[CALENDAR] Loaded {count} stored appointments")
+
+    def _connection(self):
+        """One connection per thread; sqlite3 connections can't cross threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly below
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _booking_transaction(self, day):
+        """BEGIN IMMEDIATE takes the write lock up front, so the availability
+        check and the insert are atomic across threads and worker processes"""
+        conn = self._connection()
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextlib.contextmanager
+    def _series_transaction(self, days):
+        with self._booking_transaction(None):
+            yield
+
+    def _stored_day(self, day):
+        appointments = [_row_to_appointment(row) for row in self._connection().execute(SELECT_DAY, (ordinal_to_date(day),))]
+        return [apt.start for apt in appointments], appointments
+
+    def _range(self, start_day, end_day, status):
+        if status not in ("confirmed", "cancelled", None):
+            return None
+        bounds = (
+            ordinal_to_date(start_day) if start_day is not None else MIN_DATE,
+            ordinal_to_date(end_day) if end_day is not None else MAX_DATE
+        )
+        if status is None:
+            rows = self._connection().execute(SELECT_RANGE_ANY, bounds)
+        else:
+            rows = self._connection().execute(SELECT_RANGE, bounds + (status,))
+        return [_row_to_appointment(row) for row in rows]
+
+    def _insert(self, apt):
+        cursor = self._connection().execute(
+            INSERT_APPOINTMENT,
+            (apt.date_str, apt.time_str, apt.patient_name, apt.duration, apt.status, normalize_name(apt.patient_name))
+        )
+        apt.id = f"db_{cursor.lastrowid}"
+        self._index_name(apt.patient_name)
+        return apt.id
+
+    def _index_name(self, patient_name):
+        key = normalize_name(patient_name)
+        conn = self._connection()
+        if conn.execute(INSERT_NAME, (key, patient_name)).rowcount:
+            trigrams = name_trigrams(key)
+            conn.executemany(INSERT_TRIGRAM, [(trigram, key) for trigram in trigrams])
+            conn.executemany(COUNT_TRIGRAM, [(trigram,) for trigram in trigrams])
+
+    def _mark_cancelled(self, apt):
+        cursor = self._connection().execute(UPDATE_CANCELLED, (_row_id(apt.id),))
+        if cursor.rowcount != 1:
+            return False
+        apt.status = "cancelled"
+        return True
+
+    def _find_stored_for_patient(self, patient_name, day=None):
+        key = normalize_name(patient_name)
+        if day is not None:
+            row = self._connection().execute(SELECT_PATIENT_ON_DATE, (key, ordinal_to_date(day))).fetchone()
+        else:
+            today_str = ordinal_to_date(today_ordinal())
+            row = self._connection().execute(SELECT_PATIENT_FROM, (key, today_str)).fetchone()
+        return _row_to_appointment(row) if row else None
+
+    def _patient_candidates(self, patient_name, limit=20):
+        trigrams = sorted(name_trigrams(normalize_name(patient_name)))
+        if not trigrams:
+            return []
+        conn = self._connection()
+        placeholders = ", ".join("?" * len(trigrams))
+        
+        # Same pigeonhole shortlist as PatientNameIndex.candidates: only names in
+        # the rarest postings can share at least half of the query's trigrams
+        counts = dict(conn.execute(
+            f"SELECT trigram, names FROM patient_trigram_counts WHERE trigram IN ({placeholders})", trigrams
+        ).fetchall())
+        min_shared = (len(trigrams) + 1) // 2
+        rarest = sorted(trigrams, key=lambda trigram: counts.get(trigram, 0))[:len(trigrams) - min_shared + 1]
+        
+        rows = conn.execute(
+            "SELECT n.name_key, n.patient_name FROM patient_trigrams t "
+            "JOIN patient_names n ON n.name_key = t.name_key "
+            f"WHERE t.trigram IN ({placeholders}) AND t.name_key IN ("
+            f"SELECT name_key FROM patient_trigrams WHERE trigram IN ({', '.join('?' * len(rarest))})) "
+            "GROUP BY n.name_key HAVING COUNT(*) >= ? ORDER BY COUNT(*) DESC LIMIT ?",
+            trigrams + rarest + [min_shared, limit]
+        )
+        return rows.fetchall()
+
+    def _load_series(self, rows):
+        """Series for the given rows, with their cancelled occurrences filled in"""
+        series_by_id = {_row_id(series.id): series for series in map(_row_to_series, rows)}
+        if series_by_id:
+            placeholders = ", ".join("?" * len(series_by_id))
+            for series_id, date_str in self._connection().execute(
+                f"SELECT series_id, date FROM series_exceptions WHERE series_id IN ({placeholders})",
+                list(series_by_id)
+            ):
+                series_by_id[series_id].exceptions.add(date_to_ordinal(date_str))
+        return list(series_by_id.values())
+
+    def _insert_series(self, series):
+        cursor = self._connection().execute(INSERT_SERIES, (
+            ordinal_to_date(series.day), ordinal_to_date(series.last_day), minutes_to_time(series.start),
+            series.interval, series.patient_name, series.duration, series.status, normalize_name(series.patient_name)
+        ))
+        series.id = f"db_series_{cursor.lastrowid}"
+        self._index_name(series.patient_name)
+        return series.id
+
+    def _get_series(self, series_id):
+        try:
+            row_id = _row_id(series_id)
+        except (ValueError, IndexError):
+            return None
+        rows = self._connection().execute(SELECT_SERIES, (row_id,)).fetchall()
+        return next(iter(self._load_series(rows)), None)
+
+    def _series_on(self, day):
+        date_str = ordinal_to_date(day)
+        rows = self._connection().execute(SELECT_SERIES_SPAN, (date_str, date_str)).fetchall()
+        # Only a handful of series span any one day; their phase is checked here
+        return [
+            series for series in self._load_series(row for row in rows if row[7] == "confirmed")
+            if series.occurs_on(day)
+        ]
+
+    def _series_between(self, start_day, end_day):
+        bounds = (
+            ordinal_to_date(end_day) if end_day is not None else MAX_DATE,
+            ordinal_to_date(start_day) if start_day is not None else MIN_DATE
+        )
+        return self._load_series(self._connection().execute(SELECT_SERIES_SPAN, bounds).fetchall())
+
+    def _series_for_patient(self, patient_name):
+        rows = self._connection().execute(SELECT_SERIES_PATIENT, (normalize_name(patient_name),)).fetchall()
+        return self._load_series(rows)
+
+    def _cancel_occurrence(self, series, day):
+        if series.status != "confirmed" or not series.occurs_on(day):
+            return False
+        cursor = self._connection().execute(INSERT_EXCEPTION, (_row_id(series.id), ordinal_to_date(day)))
+        if cursor.rowcount != 1:
+            return False
+        series.exceptions.add(day)
+        return True
+
+    def _mark_series_cancelled(self, series):
+        cursor = self._connection().execute(UPDATE_SERIES_CANCELLED, (_row_id(series.id),))
+        if cursor.rowcount != 1:
+            return False
+        series.status = "cancelled"
+        return True
@@ -5,6 +5,7 @@ import tempfile
 import os
 import numpy as np
 from backend.config import settings
+from backend.services import metrics
 
 class STTService:
     
@@ -91,7 +92,8 @@ class STTService:
             sf.write(tmp_path, audio, sample_rate)
             
             # Transcribe with Whisper
-            result = self.whisper_model.transcribe(tmp_path, language='en', fp16=False)
+            with metrics.STT.track():
+                result = self.whisper_model.transcribe(tmp_path, language='en', fp16=False)
             text = result['text'].strip()
             
             # Clean up
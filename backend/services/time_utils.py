@@ -0,0 +1,112 @@
+from datetime import date, datetime
+from functools import lru_cache
+from backend.config import settings
+
+
+def time_to_minutes(time_24h):
+    """'HH:MM' -> minutes since midnight"""
+    hours, minutes = time_24h.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_time(minutes):
+    """Minutes since midnight -> 'HH:MM'"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@lru_cache(maxsize=4096)
+def date_to_ordinal(date_str):
+    """'YYYY-MM-DD' -> proleptic Gregorian ordinal; raises ValueError if malformed"""
+    return date.fromisoformat(date_str).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def ordinal_to_date(ordinal):
+    """Proleptic Gregorian ordinal -> 'YYYY-MM-DD'"""
+    return date.fromordinal(ordinal).isoformat()
+
+
+def today_ordinal():
+    return date.today().toordinal()
+
+
+# Clinic hours never change while the process runs
+CLINIC_OPEN = time_to_minutes(settings.CLINIC_HOURS_START)
+CLINIC_CLOSE = time_to_minutes(settings.CLINIC_HOURS_END)
+CLINIC_HOURS = f"{settings.CLINIC_HOURS_START} to {settings.CLINIC_HOURS_END}"
+
+
+def _fast_parse_time(text):
+    """Minutes for 'H', 'H:MM' with an optional am/pm suffix ('2pm', '14:00',
+    '9:30 AM', '9:30 p.m.'); None when the text isn't in one of those forms"""
+    text = text.lower().replace(".", "").replace(" ", "")
+    meridiem = None
+    if text.endswith(("am", "pm")):
+        meridiem = text[-2]
+        text = text[:-2]
+
+    hours, _, minutes = text.partition(":")
+    if not hours.isdigit() or len(hours) > 2 or (minutes and (not minutes.isdigit() or len(minutes) != 2)):
+        return None
+    hour, minute = int(hours), int(minutes or 0)
+    if minute > 59:
+        return None
+
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        return (hour % 12 + (12 if meridiem == "p" else 0)) * 60 + minute
+    # A bare hour is ambiguous without am/pm
+    if not minutes or hour > 23:
+        return None
+    return hour * 60 + minute
+
+
+@lru_cache(maxsize=1024)
+def parse_time(time_str):
+    """Convert time formats like '09:30 AM', '2pm', '14:00' to 24-hour 'HH:MM', or None"""
+    if not time_str:
+        return None
+    time_str = " ".join(time_str.split())
+
+    minutes = _fast_parse_time(time_str)
+    if minutes is not None:
+        return minutes_to_time(minutes)
+
+    # Slow path for anything else strptime understands
+    for fmt in ("%I:%M %p", "%I %p", "%H:%M"):
+        try:
+            return datetime.strptime(time_str, fmt).strftime("%H:%M")
+        except ValueError:
+            pass
+    return None
+
+
+@lru_cache(maxsize=4096)
+def format_date(ordinal):
+    """Date ordinal -> 'October 05', as spoken back to the caller"""
+    return date.fromordinal(ordinal).strftime("%B %d")
+
+
+@lru_cache(maxsize=4096)
+def format_weekday(ordinal):
+    """Date ordinal -> 'Monday'"""
+    return date.fromordinal(ordinal).strftime("%A")
+
+
+@lru_cache(maxsize=1440)
+def format_time(minutes):
+    """Minutes since midnight -> '2:30 PM'"""
+    hours = minutes // 60
+    return f"{(hours - 1) % 12 + 1}:{minutes % 60:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def format_date_str(date_str):
+    """'YYYY-MM-DD' -> 'October 05'; raises ValueError if malformed"""
+    return format_date(date_to_ordinal(date_str))
+
+
+def format_time_str(time_str):
+    """Any time parse_time accepts -> '2:30 PM'; None if it can't be parsed"""
+    time_24h = parse_time(time_str)
+    return format_time(time_to_minutes(time_24h)) if time_24h else None
@@ -1,27 +1,51 @@
 import pyttsx3
 import requests
 from backend.config import settings
+from backend.services import metrics
 import tempfile
 import os
 import pygame
+import queue
 import re
+import threading
+import time
+
+
+def speaks_on(channel):
+    """Whether replies on this channel are spoken on the server"""
+    return 'all' in settings.SPEAK_CHANNELS or channel in settings.SPEAK_CHANNELS
 
 
 class TTSService:
     """Text-to-speech service with multiple engine support"""
     
     def __init__(self):
-        self.pyttsx3_engine = pyttsx3.init()
-        self.pyttsx3_engine.setProperty('rate', 175)
-        self.pyttsx3_engine.setProperty('volume', 1.0)
+        # Made on the worker thread, the only one that drives it: pyttsx3's
+        # SAPI5 and NSSS drivers aren't safe to use across threads
+        self.pyttsx3_engine = None
         
         pygame.mixer.init()
         
         self.elevenlabs_api_key = settings.ELEVENLABS_API_KEY
         self.elevenlabs_voice_id = "21m00Tcm4TlvDq8ikWAM"
         
+        # Replies wait here, as (text, Event set once spoken or None), for
+        # the worker thread, which speaks them one at a time
+        self._queue = queue.Queue(maxsize=settings.TTS_QUEUE_SIZE)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.spoken = 0
+        self.dropped = 0
+        self.speaking_seconds = 0.0
+        
         print("[TTS] Service initialized")
     
+    def _create_engine(self):
+        engine = pyttsx3.init()
+        engine.setProperty('rate', 175)
+        engine.setProperty('volume', 1.0)
+        return engine
+    
     def _clean_text_for_speech(self, text):
         """Remove markdown"""
         text = re.sub(r'\*\*', '', text)
@@ -40,6 +64,8 @@ class TTSService:
             self.pyttsx3_engine.say(text)
             self.pyttsx3_engine.runAndWait()
         except Exception as e:
+            # Swallowed here, so count it for /metrics
+            metrics.TTS.errors.inc(error=type(e).__name__)
             print(f"[TTS] pyttsx3 error: {e}")
     
     def _speak_elevenlabs(self, text):
@@ -79,15 +105,78 @@ class TTSService:
             raise
     
     def speak(self, text):
-        """Speak text using pyttsx3"""
+        """Speak text using pyttsx3 on the worker thread; blocks until done
+        (or until the reply is dropped from a full queue)"""
+        done = threading.Event()
+        self._enqueue(text, done)
+        done.wait()
+    
+    def speak_later(self, text):
+        """Queue text for the background worker and return at once. If the
+        queue is full the oldest reply is dropped, as it's stale by then."""
+        self._enqueue(text, None)
+    
+    def _enqueue(self, text, done):
+        self._ensure_worker()
+        while True:
+            try:
+                self._queue.put_nowait((text, done))
+                return
+            except queue.Full:
+                try:
+                    _, dropped_done = self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                    print("[TTS] Queue full, dropped the oldest reply")
+                    if dropped_done is not None:
+                        dropped_done.set()
+                except queue.Empty:
+                    pass
+    
+    def _say(self, text):
+        """Speak one reply; worker thread only"""
         cleaned_text = self._clean_text_for_speech(text)
-        
+        started = time.perf_counter()
         try:
-            self._speak_pyttsx3(cleaned_text)
+            with metrics.TTS.track():
+                self._speak_pyttsx3(cleaned_text)
         except Exception as e:
             print(f"[TTS] Failed to speak: {e}")
-
-
+        self.speaking_seconds += time.perf_counter() - started
+        self.spoken += 1
+    
+    def wait_until_idle(self):
+        """Block until every queued reply has been spoken"""
+        self._queue.join()
+    
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name="tts-worker", daemon=True)
+                self._worker.start()
+    
+    def _run_worker(self):
+        try:
+            self.pyttsx3_engine = self._create_engine()
+        except Exception as e:
+            # Replies are still taken off the queue; _speak_pyttsx3 reports each failure
+            print(f"[TTS] pyttsx3 init error: {e}")
+        while True:
+            text, done = self._queue.get()
+            try:
+                self._say(text)
+            finally:
+                self._queue.task_done()
+                if done is not None:
+                    done.set()
+    
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "spoken": self.spoken,
+            "dropped": self.dropped,
+            "avg_speaking_ms": round(self.speaking_seconds / self.spoken * 1000) if self.spoken else None
+        }
 
 
 
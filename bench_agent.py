@@ -0,0 +1,131 @@
+import sys
+import time
+from datetime import datetime, timedelta
+from backend.config import SilentPrint, settings
+from backend.services.appointment import Appointment
+from backend.services.calendar_service import calendar_service
+from backend.services.llm_service import llm_service
+from backend.services.time_utils import format_date, format_time, format_weekday, parse_time
+from backend.agent.graph import agent_graph
+
+STORED = 10_000
+SLOTS_PER_DAY = 18
+TURNS = 200
+TIME_INPUTS = ["2pm", "14:00", "9:30 AM", "11 am", "4:15 PM"]
+
+
+def fill_calendar(service, size):
+    """Add `size` confirmed appointments, 18 per day, starting today"""
+    first_day = datetime.now().toordinal()
+    for i in range(size):
+        apt = Appointment(first_day + i // SLOTS_PER_DAY, 9 * 60 + (i % SLOTS_PER_DAY) * 30, f"Patient {i}", 30)
+        service._insert(apt)
+
+
+def initial_state(message):
+    return {
+        'user_message': message,
+        'intent': None,
+        'date': None,
+        'start_date': None,
+        'end_date': None,
+        'time': None,
+        'patient_name': None,
+        'duration': 30,
+        'appointments': [],
+        'available': False,
+        'agent_response': '',
+        'response_context': None,
+        'conversation_history': [],
+        'clarification_needed': False,
+        'missing_fields': [],
+        'error': None,
+        'retry_count': 0
+    }
+
+
+def time_turn(intent_data):
+    """Average milliseconds per graph turn with the LLM replaced by canned answers"""
+    llm_service.parse_intent = lambda message, history=None: dict(intent_data)
+    llm_service.generate_response = lambda context: "Here is your schedule."
+    started = time.perf_counter()
+    for _ in range(TURNS):
+        agent_graph.invoke(initial_state("What's on the schedule?"))
+    return (time.perf_counter() - started) / TURNS * 1000
+
+
+def legacy_format(appointments):
+    """How the nodes formatted appointments before the shared formatting layer"""
+    return [
+        {
+            'patient': apt.patient_name,
+            'date': datetime.strptime(apt.date_str, '%Y-%m-%d').strftime('%B %d'),
+            'time': datetime.strptime(apt.time_str, '%H:%M').strftime('%I:%M %p').lstrip('0'),
+            'day_of_week': datetime.strptime(apt.date_str, '%Y-%m-%d').strftime('%A')
+        }
+        for apt in appointments
+    ]
+
+
+def cached_format(appointments):
+    return [
+        {
+            'patient': apt.patient_name,
+            'date': format_date(apt.day),
+            'time': format_time(apt.start),
+            'day_of_week': format_weekday(apt.day)
+        }
+        for apt in appointments
+    ]
+
+
+def legacy_parse_time(time_str):
+    """The old two-strptime parse from BaseCalendarService"""
+    if "AM" in time_str.upper() or "PM" in time_str.upper():
+        for fmt in ("%I:%M %p", "%I %p"):
+            try:
+                return datetime.strptime(time_str, fmt).strftime("%H:%M")
+            except ValueError:
+                pass
+    if ":" in time_str:
+        hour, minute = time_str.split(":")
+        return f"{int(hour):02d}:{int(minute):02d}"
+    return None
+
+
+# Keep every turn on the LLM path; the rule-based intent parser is measured in bench_intent.py
+settings.INTENT_RULES_MIN_CONFIDENCE = float("inf")
+stdout = sys.stdout
+sys.stdout = SilentPrint()
+try:
+    fill_calendar(calendar_service, STORED)
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    day_ms = time_turn({'intent': 'list_appointments', 'date': tomorrow})
+    future_ms = time_turn({'intent': 'list_appointments'})
+    upcoming = calendar_service.get_appointments()
+finally:
+    sys.stdout = stdout
+
+print(f"[BENCH] List-appointments turn, LLM mocked, {STORED:,} stored appointments")
+print("=" * 60)
+print(f"One day ({SLOTS_PER_DAY} appointments):    {day_ms:8.2f} ms/turn")
+print(f"All future ({len(upcoming):,} appointments): {future_ms:8.2f} ms/turn")
+
+print(f"\n[BENCH] Formatting {len(upcoming):,} appointments for the reply")
+print("=" * 60)
+for name, fn in [("strptime/strftime", legacy_format), ("time_utils (cached)", cached_format)]:
+    started = time.perf_counter()
+    fn(upcoming)
+    print(f"{name:>19}: {(time.perf_counter() - started) * 1000:8.2f} ms")
+
+print("\n[BENCH] Parsing spoken times")
+print("=" * 60)
+for name, fn in [("strptime", legacy_parse_time), ("time_utils (cached)", parse_time)]:
+    started = time.perf_counter()
+    for _ in range(10_000):
+        for time_str in TIME_INPUTS:
+            fn(time_str)
+    per_call = (time.perf_counter() - started) / (10_000 * len(TIME_INPUTS)) * 1e6
+    print(f"{name:>19}: {per_call:8.2f} us/call")
+
+print("\n[BENCH] Agent benchmark complete!")
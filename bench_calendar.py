@@ -0,0 +1,229 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from backend.config import SilentPrint
+from backend.services.appointment import Appointment
+from backend.services.calendar_service import MockCalendarService
+from backend.services.sqlite_calendar_service import SQLiteCalendarService
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SLOTS_PER_DAY = 18
+LOOKUPS = 2_000
+THREAD_COUNTS = [1, 2, 4, 8]
+DAYS_PER_THREAD = 40
+IMPORT_SIZE = 10_000
+MEMORY_SIZE = 1_000_000
+FIRST_NAMES = ["James", "Mary", "John", "Linda", "Michael", "Sarah", "David", "Fatima", "Omar", "Wei", "Priya", "Ivan"]
+LAST_NAMES = ["Smith", "Brown", "Khan", "Garcia", "Nguyen", "Chen", "Patel", "Kim", "Lopez", "Wilson"]
+NAME_SUFFIXES = ["", "son", "ley", "ford", "man", "er", "ton", "wood", "berg", "ski"]
+
+
+def build_calendar(size):
+    """Fill a fresh calendar with `size` confirmed appointments, 18 per day"""
+    service = MockCalendarService()
+    first_day = datetime.now().toordinal() - size // SLOTS_PER_DAY // 2
+    for i in range(size):
+        minute = 9 * 60 + (i % SLOTS_PER_DAY) * 30
+        apt = Appointment(first_day + i // SLOTS_PER_DAY, minute, f"Patient {i}", 30, id=f"bench_{i}")
+        service.appointments.append(apt)
+        service._index.add(apt)
+    return service
+
+
+def time_per_call(fn, *args):
+    """Average microseconds per call over LOOKUPS calls"""
+    started = time.perf_counter()
+    for _ in range(LOOKUPS):
+        fn(*args)
+    return (time.perf_counter() - started) / LOOKUPS * 1e6
+
+
+print("[BENCH] Calendar lookup latency vs. stored appointments")
+print("=" * 60)
+print(f"{'appointments':>12} | {'check_availability':>18} | {'list_appointments':>17} | {'90-day range':>13}")
+
+stdout = sys.stdout
+for size in SIZES:
+    sys.stdout = SilentPrint()
+    try:
+        service = build_calendar(size)
+        target = datetime.now().strftime("%Y-%m-%d")
+        check_us = time_per_call(service.check_availability, target, "14:00")
+        list_us = time_per_call(service.list_appointments, target)
+        quarter_end = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
+        range_us = time_per_call(service.get_appointments_range, target, quarter_end)
+    finally:
+        sys.stdout = stdout
+    print(f"{size:>12,} | {check_us:>15.1f} us | {list_us:>14.1f} us | {range_us:>10.1f} us")
+
+
+def dict_layout(i, start):
+    """Appointment i in the previous string-keyed dict layout"""
+    minute = 9 * 60 + (i % SLOTS_PER_DAY) * 30
+    return {
+        "id": f"bench_{i}",
+        "date": (start + timedelta(days=i // SLOTS_PER_DAY)).strftime("%Y-%m-%d"),
+        "time": f"{minute // 60:02d}:{minute % 60:02d}",
+        "patient_name": f"Patient {i}",
+        "duration": 30,
+        "status": "confirmed"
+    }
+
+
+def slotted_layout(i, start):
+    """Appointment i as a slotted Appointment record"""
+    minute = 9 * 60 + (i % SLOTS_PER_DAY) * 30
+    return Appointment(start.toordinal() + i // SLOTS_PER_DAY, minute, f"Patient {i}", 30, id=f"bench_{i}")
+
+
+def measure_memory(make_appointment):
+    """Bytes allocated while holding MEMORY_SIZE appointments in a list"""
+    start = datetime.now()
+    tracemalloc.start()
+    appointments = [make_appointment(i, start) for i in range(MEMORY_SIZE)]
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del appointments
+    return allocated
+
+
+print(f"\n[BENCH] Memory for {MEMORY_SIZE:,} appointments")
+print("=" * 60)
+
+dict_bytes = measure_memory(dict_layout)
+slotted_bytes = measure_memory(slotted_layout)
+print(f"{'dict':>11} | {dict_bytes / 2**20:>7.1f} MiB | {dict_bytes / MEMORY_SIZE:>5.0f} B/appointment")
+print(f"{'Appointment':>11} | {slotted_bytes / 2**20:>7.1f} MiB | {slotted_bytes / MEMORY_SIZE:>5.0f} B/appointment")
+print(f"Saved: {1 - slotted_bytes / dict_bytes:.0%}")
+
+
+SERIES_COUNT = 1_000
+SERIES_WEEKS = 52
+
+print(f"\n[BENCH] {SERIES_COUNT:,} weekly series of {SERIES_WEEKS} appointments")
+print("=" * 60)
+
+sys.stdout = SilentPrint()
+try:
+    first_day = datetime.now() + timedelta(days=1)
+    tracemalloc.start()
+    service = MockCalendarService()
+    for i in range(SERIES_COUNT):
+        minute = 9 * 60 + (i % SLOTS_PER_DAY) * 30
+        day = first_day + timedelta(days=i // SLOTS_PER_DAY)
+        service.book_recurring(day.strftime("%Y-%m-%d"), f"{minute // 60:02d}:{minute % 60:02d}",
+                               f"Patient {i}", frequency="weekly", count=SERIES_WEEKS)
+    series_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    target = (first_day + timedelta(days=100)).strftime("%Y-%m-%d")
+    check_us = time_per_call(service.check_availability, target, "14:00")
+    quarter_end = (first_day + timedelta(days=190)).strftime("%Y-%m-%d")
+    range_us = time_per_call(service.get_appointments_range, target, quarter_end)
+finally:
+    sys.stdout = stdout
+
+occurrence_bytes = measure_memory(slotted_layout) / MEMORY_SIZE * SERIES_COUNT * SERIES_WEEKS
+print(f"Series in memory:            {series_bytes / 2**20:8.1f} MiB")
+print(f"Same bookings materialized: ~{occurrence_bytes / 2**20:8.1f} MiB")
+print(f"check_availability:          {check_us:8.1f} us")
+print(f"90-day range:                {range_us:8.1f} us")
+
+
+def book_days(service, first_day):
+    """Fill DAYS_PER_THREAD consecutive days slot by slot"""
+    start = datetime.now() + timedelta(days=first_day)
+    for d in range(DAYS_PER_THREAD):
+        date_str = (start + timedelta(days=d)).strftime("%Y-%m-%d")
+        for slot in range(SLOTS_PER_DAY):
+            minute = 9 * 60 + slot * 30
+            service.book_appointment(date_str, f"{minute // 60:02d}:{minute % 60:02d}", "Bench Patient")
+
+
+print("\n[BENCH] Concurrent booking throughput on distinct dates")
+print("=" * 60)
+print(f"{'threads':>7} | {'bookings/s':>10} | {'vs 1 thread':>11}")
+
+baseline = None
+for threads in THREAD_COUNTS:
+    sys.stdout = SilentPrint()
+    try:
+        service = MockCalendarService()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda t: book_days(service, 100 + t * DAYS_PER_THREAD), range(threads)))
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.stdout = stdout
+    rate = threads * DAYS_PER_THREAD * SLOTS_PER_DAY / elapsed
+    baseline = baseline or rate
+    print(f"{threads:>7} | {rate:>10,.0f} | {rate / baseline:>10.2f}x")
+
+
+def referral_list(first_day):
+    """IMPORT_SIZE entries filling consecutive clinic days, with every tenth one clashing"""
+    start = datetime.now() + timedelta(days=first_day)
+    entries = []
+    for i in range(IMPORT_SIZE):
+        slot = i % SLOTS_PER_DAY if i % 10 else max(i % SLOTS_PER_DAY - 1, 0)
+        minute = 9 * 60 + slot * 30
+        entries.append({
+            "date": (start + timedelta(days=i // SLOTS_PER_DAY)).strftime("%Y-%m-%d"),
+            "time": f"{minute // 60:02d}:{minute % 60:02d}",
+            "patient_name": f"Referral {i}"
+        })
+    return entries
+
+
+print(f"\n[BENCH] Importing {IMPORT_SIZE:,} referrals")
+print("=" * 60)
+
+print(f"{'backend':>7} | {'book_appointment loop':>21} | {'book_many':>9} | {'speedup':>7}")
+
+entries = referral_list(1000)
+with tempfile.TemporaryDirectory() as tmp:
+    backends = [
+        ("mock", MockCalendarService),
+        ("sqlite", lambda: SQLiteCalendarService(os.path.join(tmp, f"bench_{time.time_ns()}.db")))
+    ]
+    for name, make_service in backends:
+        sys.stdout = SilentPrint()
+        try:
+            service = make_service()
+            started = time.perf_counter()
+            for e in entries:
+                service.book_appointment(e["date"], e["time"], e["patient_name"])
+            loop_elapsed = time.perf_counter() - started
+            
+            service = make_service()
+            started = time.perf_counter()
+            service.book_many(entries)
+            bulk_elapsed = time.perf_counter() - started
+        finally:
+            sys.stdout = stdout
+        print(f"{name:>7} | {loop_elapsed * 1000:>18.1f} ms | {bulk_elapsed * 1000:>6.1f} ms | {loop_elapsed / bulk_elapsed:>6.1f}x")
+
+names = [f"{first} {last}{suffix}" for first in FIRST_NAMES for last in LAST_NAMES for suffix in NAME_SUFFIXES]
+misheard = [name.replace("o", "", 1).replace("a", "e", 1) for name in names[::7]]
+
+print(f"\n[BENCH] Patient lookup with {len(names):,} distinct patients, {IMPORT_SIZE:,} bookings")
+print("=" * 60)
+
+sys.stdout = SilentPrint()
+try:
+    service = MockCalendarService()
+    service.book_many([dict(e, patient_name=names[i % len(names)]) for i, e in enumerate(referral_list(1000))])
+    exact_us = time_per_call(service._find_for_patient, names[42])
+    started = time.perf_counter()
+    found = sum(1 for name in misheard if service.find_patient(name))
+    fuzzy_us = (time.perf_counter() - started) / len(misheard) * 1e6
+finally:
+    sys.stdout = stdout
+
+print(f"Exact name lookup: {exact_us:8.1f} us")
+print(f"Fuzzy lookup:      {fuzzy_us:8.1f} us ({found}/{len(misheard)} misheard names matched)")
+
+print("\n[BENCH] Calendar benchmark complete!")
@@ -0,0 +1,49 @@
+import asyncio
+import sys
+import time
+import httpx
+from backend.config import SilentPrint, settings
+from backend.main import app
+from backend.services.tts_service import tts_service
+
+TURNS = 20
+# Parsed by the rules and answered from a template, so no LLM calls are timed
+MESSAGE = "Show all appointments for tomorrow"
+
+
+async def chat_ms(turns=TURNS):
+    """Average milliseconds per POST /chat, through the ASGI app in process"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for _ in range(turns):
+            response = await client.post("/chat", json={"message": MESSAGE}, headers={"X-Session-ID": "bench"})
+            assert response.json()["success"], response.text
+        return (time.perf_counter() - started) / turns * 1000
+
+
+stdout = sys.stdout
+sys.stdout = SilentPrint()
+try:
+    settings.SPEAK_CHANNELS = set()
+    silent_ms = asyncio.run(chat_ms())
+    settings.SPEAK_CHANNELS = {"chat"}
+    spoken_ms = asyncio.run(chat_ms())
+    drained_started = time.perf_counter()
+    tts_service.wait_until_idle()
+    drain_s = time.perf_counter() - drained_started
+finally:
+    sys.stdout = stdout
+
+stats = tts_service.stats()
+print(f"[BENCH] POST /chat, {TURNS} turns")
+print("=" * 60)
+inline_ms = silent_ms + (stats['avg_speaking_ms'] or 0)
+print(f"{'Speech off:':<36}{silent_ms:8.1f} ms/reply")
+print(f"{'Speech on, background worker:':<36}{spoken_ms:8.1f} ms/reply")
+print(f"{'Speech on, spoken before replying:':<36}{inline_ms:8.1f} ms/reply "
+      f"({stats['avg_speaking_ms']} ms speaking per reply)")
+print(f"Speech queue: {stats['spoken']} spoken, {stats['dropped']} dropped as stale "
+      f"(queue of {settings.TTS_QUEUE_SIZE}), drained {drain_s:.1f} s after the last reply")
+
+print("\n[BENCH] Chat benchmark complete!")
@@ -0,0 +1,149 @@
+import time
+from datetime import date
+from backend.config import settings
+from backend.services.intent_rules import fill_pending, parse_intent_rules, pending_frame
+
+RUNS = 1_000
+# Replayed as if today were Friday 2025-10-31, the date the intent prompt uses
+TODAY = date(2025, 10, 31).toordinal()
+
+# Receptionist messages with the parse the rules should give, or None where
+# the LLM is expected to take over
+CORPUS = [
+    ("Book John Smith at 2pm tomorrow", {"intent": "book_appointment", "date": "2025-11-01", "time": "14:00", "patient_name": "John Smith"}),
+    ("Book Sarah Lee at 10am on Monday", {"intent": "book_appointment", "date": "2025-11-03", "time": "10:00", "patient_name": "Sarah Lee"}),
+    ("Book David Brown tomorrow at 4:30 pm", {"intent": "book_appointment", "date": "2025-11-01", "time": "16:30", "patient_name": "David Brown"}),
+    ("Schedule Maria Lopez at 11am next Tuesday", {"intent": "book_appointment", "date": "2025-11-04", "time": "11:00", "patient_name": "Maria Lopez"}),
+    ("Book a 1 hour appointment for Sarah at 3pm tomorrow", {"intent": "book_appointment", "date": "2025-11-01", "time": "15:00", "patient_name": "Sarah", "duration": 60}),
+    ("Please book Tom Baker for a 45 minute appointment on November 3rd at 9:30 am", {"intent": "book_appointment", "date": "2025-11-03", "time": "09:30", "patient_name": "Tom Baker", "duration": 45}),
+    ("Book an appointment for Emma Wilson at 2:00 PM on the 5th", {"intent": "book_appointment", "date": "2025-11-05", "time": "14:00", "patient_name": "Emma Wilson"}),
+    ("book O'Brien at 9 a.m. the day after tomorrow", {"intent": "book_appointment", "date": "2025-11-02", "time": "09:00", "patient_name": "O'Brien"}),
+    ("Can you book Alice Johnson at 15:00 on Wednesday", {"intent": "book_appointment", "date": "2025-11-05", "time": "15:00", "patient_name": "Alice Johnson"}),
+    ("Book Priya Patel for half an hour at noon tomorrow", {"intent": "book_appointment", "date": "2025-11-01", "time": "12:00", "patient_name": "Priya Patel", "duration": 30}),
+    ("I need to book an appointment", {"intent": "book_appointment", "clarification_needed": True, "missing_fields": ["date", "time", "patient_name"]}),
+    ("Book Kevin tomorrow", {"intent": "book_appointment", "date": "2025-11-01", "patient_name": "Kevin", "clarification_needed": True, "missing_fields": ["time"]}),
+    ("Cancel Michael's appointment", {"intent": "cancel_appointment", "patient_name": "Michael"}),
+    ("cancel John Smith's appointment tomorrow", {"intent": "cancel_appointment", "date": "2025-11-01", "patient_name": "John Smith"}),
+    ("Cancel the 2pm appointment tomorrow", {"intent": "cancel_appointment", "date": "2025-11-01", "time": "14:00"}),
+    ("Cancel the appointment for Bob Smith on Monday", {"intent": "cancel_appointment", "date": "2025-11-03", "patient_name": "Bob Smith"}),
+    ("Please cancel Carol White", {"intent": "cancel_appointment", "patient_name": "Carol White"}),
+    ("Remove the 10:30 am slot on November 4", {"intent": "cancel_appointment", "date": "2025-11-04", "time": "10:30"}),
+    ("Show me all appointments", {"intent": "list_appointments"}),
+    ("What's on tomorrow?", {"intent": "list_appointments", "date": "2025-11-01"}),
+    ("What appointments do we have tomorrow?", {"intent": "list_appointments", "date": "2025-11-01"}),
+    ("What's on Monday", {"intent": "list_appointments", "date": "2025-11-03"}),
+    ("Show appointments for today", {"intent": "list_appointments", "date": "2025-10-31"}),
+    ("List appointments from October 29 to November 2", {"intent": "list_appointments", "start_date": "2025-10-29", "end_date": "2025-11-02"}),
+    ("Show all appointments for the next 5 days", {"intent": "list_appointments", "start_date": "2025-10-31", "end_date": "2025-11-04"}),
+    ("Who's booked next week?", {"intent": "list_appointments", "start_date": "2025-11-03", "end_date": "2025-11-09"}),
+    ("What's the schedule for this week", {"intent": "list_appointments", "start_date": "2025-10-31", "end_date": "2025-11-02"}),
+    ("Display the calendar for November 10", {"intent": "list_appointments", "date": "2025-11-10"}),
+    ("Is 2pm tomorrow free?", {"intent": "check_availability", "date": "2025-11-01", "time": "14:00"}),
+    ("Is 3pm available on Monday?", {"intent": "check_availability", "date": "2025-11-03", "time": "15:00"}),
+    ("Do we have anything available on Monday at 10:30 am?", {"intent": "check_availability", "date": "2025-11-03", "time": "10:30"}),
+    ("Is there a free slot at 9am on the 4th?", {"intent": "check_availability", "date": "2025-11-04", "time": "09:00"}),
+    # Left to the LLM
+    ("What's your name?", None),
+    ("What's the weather today?", None),
+    ("Hello there", None),
+    ("What's on Friday?", None),                                   # today is Friday: this week or next?
+    ("Book John at 3", None),                                      # am or pm
+    ("Book him at 2pm tomorrow", None),                            # needs the previous turn
+    ("Reschedule Sarah to Thursday", None),
+    ("Cancel John's appointment and book him at 4pm instead", None),
+    ("Book Anna every Monday at 10am", None),
+    ("Book John and Mary at 2pm tomorrow", None),
+    ("Move my 3pm to 4pm", None),
+    ("Is 2pm free?", None),                                        # no date
+    ("Actually make that 3pm", None),
+    ("Yes please", None),
+    ("Can we squeeze someone in tomorrow afternoon?", None),
+    ("book hello at 3pm tomorrow", None),
+    ("cancel everything tomorrow", None),
+    ("cancel Al", None),
+    ("The patient's name is Robert Green", None),
+    ("Show me appointments between Monday and Wednesday", None),
+    ("Book the usual for Mrs Patel", None),
+    ("book david brown tomorrow at 4:30 pm", None),                # lowercase: no sign it's a name
+    ("book the dentist at 2pm tomorrow", None),
+    ("schedule a meeting at 2pm tomorrow", None),
+    ("schedule lunch at noon tomorrow", None),
+    ("book a room at 2pm tomorrow", None),
+    ("add a note for tomorrow", None),
+    ("Schedule for tomorrow?", None),                              # the schedule, not a booking
+]
+
+# Fields of the parse_intent dict that define the request
+FIELDS = ("intent", "date", "start_date", "end_date", "time", "patient_name", "duration", "clarification_needed", "missing_fields")
+DEFAULTS = {"duration": 30, "clarification_needed": False, "missing_fields": []}
+
+
+def matches(parsed, expected):
+    return all(parsed.get(field) == expected.get(field, DEFAULTS.get(field)) for field in FIELDS)
+
+
+threshold = settings.INTENT_RULES_MIN_CONFIDENCE
+hits, wrong, missed = 0, [], []
+for message, expected in CORPUS:
+    parsed = parse_intent_rules(message, today=TODAY)
+    confident = parsed["confidence"] >= threshold
+    if confident:
+        hits += 1
+        if expected is None or not matches(parsed, expected):
+            wrong.append((message, parsed))
+    elif expected is not None:
+        missed.append(message)
+
+started = time.perf_counter()
+for _ in range(RUNS):
+    for message, _ in CORPUS:
+        parse_intent_rules(message, today=TODAY)
+per_message = (time.perf_counter() - started) / (RUNS * len(CORPUS)) * 1e6
+
+print(f"[BENCH] Rule-based intent parsing, {len(CORPUS)} replayed messages (threshold {threshold})")
+print("=" * 60)
+print(f"Handled without the LLM: {hits}/{len(CORPUS)} ({hits / len(CORPUS):.0%})")
+print(f"Wrong confident parses:  {len(wrong)}")
+print(f"Rules missed (expected): {len(missed)}")
+print(f"Rule parser latency:     {per_message:.1f} us/message")
+for message, parsed in wrong:
+    print(f"  WRONG: {message!r} -> {parsed}")
+for message in missed:
+    print(f"  MISSED: {message!r}")
+
+# Clarification follow-ups: (request that needed clarification, answer, the
+# completed request, or None where the LLM is expected to take over)
+FOLLOWUPS = [
+    ("Book Kevin tomorrow", "at 3pm", {"date": "2025-11-01", "time": "15:00", "patient_name": "Kevin"}),
+    ("Book Kevin tomorrow", "3:30 PM please", {"date": "2025-11-01", "time": "15:30", "patient_name": "Kevin"}),
+    ("Book Kevin tomorrow", "noon works", {"date": "2025-11-01", "time": "12:00", "patient_name": "Kevin"}),
+    ("Book Kevin at 2pm", "on Monday", {"date": "2025-11-03", "time": "14:00", "patient_name": "Kevin"}),
+    ("Book Kevin at 2pm", "tomorrow", {"date": "2025-11-01", "time": "14:00", "patient_name": "Kevin"}),
+    ("Book at 2pm tomorrow", "It's for Jane Doe", {"date": "2025-11-01", "time": "14:00", "patient_name": "Jane Doe"}),
+    ("Book at 2pm tomorrow", "Jane Doe", {"date": "2025-11-01", "time": "14:00", "patient_name": "Jane Doe"}),
+    ("I need to book an appointment", "Sarah Lee", {"patient_name": "Sarah Lee", "clarification_needed": True, "missing_fields": ["date", "time"]}),
+    ("I need to book an appointment", "tomorrow at 10am for an hour", {"date": "2025-11-01", "time": "10:00", "duration": 60, "clarification_needed": True, "missing_fields": ["patient_name"]}),
+    ("Book Kevin tomorrow", "at 3", None),
+    ("Book Kevin tomorrow", "whenever the doctor is free", None),
+    ("Book Kevin tomorrow", "actually cancel that", {"intent": "dismissed"}),
+    ("Book at 2pm tomorrow", "never mind", {"intent": "dismissed"}),
+    ("Book at 2pm tomorrow", "thanks", None),
+]
+
+local, wrong_followups = 0, []
+for first, answer, expected in FOLLOWUPS:
+    frame = pending_frame(parse_intent_rules(first, today=TODAY))
+    filled = fill_pending(frame, answer, today=TODAY)
+    if filled is not None:
+        local += 1
+        if expected is None or not matches(filled, {"intent": "book_appointment", **expected}):
+            wrong_followups.append((answer, filled))
+
+print(f"\n[BENCH] Clarification follow-ups, {len(FOLLOWUPS)} answers to a pending booking")
+print("=" * 60)
+print(f"Filled without the LLM: {local}/{len(FOLLOWUPS)} ({local / len(FOLLOWUPS):.0%})")
+print(f"Wrong fills:            {len(wrong_followups)}")
+for answer, filled in wrong_followups:
+    print(f"  WRONG: {answer!r} -> {filled}")
+
+print("\n[BENCH] Intent benchmark complete!")
@@ -0,0 +1,428 @@
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from backend.config import SilentPrint, settings
+from backend.agent.graph import agent_graph
+from backend.services.llm_service import llm_service
+from backend.services.ttl_cache import TTLCache
+from backend.services.intent_cache import IntentCache
+from backend.services.llm_resilience import turn_deadline
+
+CALLS = 300
+CONVERSATIONS = 100
+STUB_LATENCY = 0.2
+COMPLETION = json.dumps({"choices": [{"message": {"content": "Your 2:00 PM slot is booked."}}]}).encode()
+INTENT = {"intent": "list_appointments", "date": None}
+INTENT_COMPLETION = json.dumps({"choices": [{"message": {"content": json.dumps(INTENT)}}]}).encode()
+STREAMED_REPLY = ("I couldn't find an appointment for that patient on Tuesday. Could you give me "
+                  "their full name, or the date and time of the appointment you'd like to cancel?")
+CONTEXT = {"intent": "book_appointment", "result": "success", "patient_name": "John Smith", "date": "November 1", "time": "2:00 PM"}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every chat completion instantly, keeping the connection open"""
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one write; split writes on a reused connection
+    # hit Nagle plus delayed ACKs and stall ~40 ms
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    # Simulated model latency and answer, changed per benchmark section
+    latency = 0
+    token_delay = 0
+    completion = COMPLETION
+    # Every slow_every-th request takes slow_latency instead
+    slow_every = 0
+    slow_latency = 0
+    requests_seen = itertools.count(1)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        slow = self.slow_every and next(self.requests_seen) % self.slow_every == 0
+        time.sleep(self.slow_latency if slow else self.latency)
+        if request.get("stream"):
+            return self.stream_completion()
+        # A buffered completion arrives once every token is generated
+        time.sleep(self.token_delay * len(STREAMED_REPLY.split(" ")))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.completion)))
+        self.end_headers()
+        self.wfile.write(self.completion)
+
+    def stream_completion(self):
+        """The reply as server-sent events, one word every token_delay seconds"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in STREAMED_REPLY.split(" "):
+            self.send_chunk(f"data: {json.dumps({'choices': [{'delta': {'content': word + ' '}}]})}\n\n")
+            time.sleep(self.token_delay)
+        self.send_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def send_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    # listen() backlog; it's read while binding, so it has to be set on the class
+    request_queue_size = 256
+
+
+def start_stub(cert_dir=None):
+    """Serve the stub on a free local port, over TLS when a certificate directory is given"""
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    scheme = "http"
+    if cert_dir:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(os.path.join(cert_dir, "cert.pem"), os.path.join(cert_dir, "key.pem"))
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_port}/chat/completions"
+
+
+def make_certificate(cert_dir):
+    """Self-signed certificate for 127.0.0.1; False if openssl isn't available"""
+    if not shutil.which("openssl"):
+        return False
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", os.path.join(cert_dir, "key.pem"), "-out", os.path.join(cert_dir, "cert.pem"),
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True
+    )
+    return True
+
+
+def per_call_ms(fn):
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        fn()
+    return (time.perf_counter() - started) / CALLS * 1000
+
+
+def one_shot_post(url, verify):
+    """How LLMService called OpenRouter before: a fresh connection every time"""
+    requests.post(
+        url,
+        headers={"Authorization": "Bearer stub", "Content-Type": "application/json"},
+        json={"model": llm_service.model, "messages": [{"role": "user", "content": json.dumps(CONTEXT)}]},
+        timeout=20,
+        verify=verify,
+        proxies={"http": None, "https": None}
+    ).raise_for_status()
+
+
+def pooled_call():
+    reply = llm_service.generate_response(CONTEXT)
+    assert reply == "Your 2:00 PM slot is booked.", reply
+
+
+# Every call should reach the stub until the cache section at the end
+llm_service.response_cache.maxsize = 0
+llm_service.intent_cache = IntentCache(0)
+
+print(f"[BENCH] LLM call overhead against a local stub server ({CALLS} calls)")
+print("=" * 60)
+print(f"{'transport':>9} | {'requests.post':>13} | {'pooled session':>14} | {'saved/call':>10}")
+
+with tempfile.TemporaryDirectory() as cert_dir:
+    transports = [("http", None)]
+    if make_certificate(cert_dir):
+        transports.append(("https", cert_dir))
+
+    stdout = sys.stdout
+    for name, certs in transports:
+        server, url = start_stub(certs)
+        verify = os.path.join(certs, "cert.pem") if certs else True
+        llm_service.api_url = url
+        llm_service.session.verify = verify
+        # Otherwise REQUESTS_CA_BUNDLE / proxy variables override the stub's certificate
+        llm_service.session.trust_env = False
+
+        sys.stdout = SilentPrint()
+        try:
+            one_shot_ms = per_call_ms(lambda: one_shot_post(url, verify))
+            pooled_ms = per_call_ms(lambda: pooled_call())
+        finally:
+            sys.stdout = stdout
+            server.shutdown()
+        print(f"{name:>9} | {one_shot_ms:>10.2f} ms | {pooled_ms:>11.2f} ms | {one_shot_ms - pooled_ms:>7.2f} ms")
+
+    if len(transports) == 1:
+        print("(openssl not found; TLS handshake savings not measured)")
+
+
+def initial_state(message):
+    return {
+        'user_message': message, 'intent': None, 'date': None, 'start_date': None, 'end_date': None,
+        'time': None, 'patient_name': None, 'duration': 30, 'appointments': [], 'available': False,
+        'agent_response': '', 'response_context': None, 'conversation_history': [],
+        'clarification_needed': False, 'missing_fields': [], 'error': None, 'retry_count': 0
+    }
+
+
+async def concurrent_turns(graph):
+    started = time.perf_counter()
+    states = await asyncio.gather(*(graph.ainvoke(initial_state("Show me all appointments")) for _ in range(CONVERSATIONS)))
+    elapsed = time.perf_counter() - started
+    assert all(state["intent"] == "list_appointments" for state in states), [(s["intent"], s.get("error")) for s in states if s["intent"] != "list_appointments"][:5]
+    await llm_service.aclose()
+    return elapsed
+
+
+def invoke_turn_s(turns=10):
+    started = time.perf_counter()
+    for _ in range(turns):
+        agent_graph.invoke(initial_state("Show me all appointments"))
+    return (time.perf_counter() - started) / turns
+
+
+# Keep every turn on the LLM path; the rule-based intent parser is measured in bench_intent.py
+settings.INTENT_RULES_MIN_CONFIDENCE = float("inf")
+StubHandler.latency = STUB_LATENCY
+StubHandler.completion = INTENT_COMPLETION
+server, url = start_stub()
+llm_service.api_url = url
+llm_service.session.verify = True
+sys.stdout = SilentPrint()
+try:
+    settings.LLM_PHRASED_INTENTS = {"all"}
+    phrased_turn = invoke_turn_s()
+    settings.LLM_PHRASED_INTENTS = set()
+    template_turn = invoke_turn_s()
+    ainvoke_elapsed = asyncio.run(concurrent_turns(agent_graph))
+finally:
+    sys.stdout = stdout
+    server.shutdown()
+
+print(f"\n[BENCH] List-appointments turn, {STUB_LATENCY * 1000:.0f} ms per LLM call")
+print("=" * 60)
+print(f"LLM-phrased reply (2 calls/turn): {phrased_turn * 1000:7.1f} ms/turn")
+print(f"Template reply (1 call/turn):     {template_turn * 1000:7.1f} ms/turn")
+
+print(f"\n[BENCH] {CONVERSATIONS} list-appointments turns, template replies")
+print("=" * 60)
+print(f"Blocking invoke, one at a time: {template_turn * CONVERSATIONS:6.2f} s (extrapolated from 10 turns)")
+print(f"ainvoke, all on one event loop: {ainvoke_elapsed:6.2f} s")
+
+
+def replayed_contexts():
+    """Contexts a busy day sends to the LLM: clarifications, clinic-hours
+    errors and empty days repeat; appointment lists don't get cached"""
+    contexts = []
+    for i in range(CALLS):
+        kind = i % 6
+        if kind == 0:
+            contexts.append({'intent': 'book_appointment', 'clarification_needed': True,
+                             'missing_fields': [['time'], ['patient_name'], ['date', 'time']][i % 3]})
+        elif kind == 1:
+            contexts.append({'intent': 'book_appointment', 'error': 'outside_hours', 'time': f"{19 + i % 3}:00"})
+        elif kind == 2:
+            contexts.append({'intent': 'list_appointments', 'result': 'no_appointments', 'date': f"2025-11-{1 + i % 5:02d}"})
+        elif kind == 3:
+            contexts.append({'intent': 'cancel_appointment', 'error': 'missing_info'})
+        elif kind == 4:
+            contexts.append({'intent': 'check_availability', 'error': 'missing_time', 'date': f"2025-11-{1 + i % 5:02d}"})
+        else:
+            contexts.append({'intent': 'list_appointments', 'result': 'found_appointments', 'count': 1,
+                             'appointments': [{'patient': f"Patient {i}", 'time': '9:00 AM'}]})
+    return contexts
+
+
+StubHandler.latency = 0.02
+StubHandler.completion = COMPLETION
+server, url = start_stub()
+llm_service.api_url = url
+contexts = replayed_contexts()
+sys.stdout = SilentPrint()
+try:
+    started = time.perf_counter()
+    for context in contexts:
+        llm_service.generate_response(context)
+    uncached_ms = (time.perf_counter() - started) / len(contexts) * 1000
+    llm_service.response_cache = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+    started = time.perf_counter()
+    for context in contexts:
+        llm_service.generate_response(context)
+    cached_ms = (time.perf_counter() - started) / len(contexts) * 1000
+finally:
+    sys.stdout = stdout
+    server.shutdown()
+
+stats = llm_service.response_cache.stats()
+print(f"\n[BENCH] Response cache, {len(contexts)} replayed contexts, 20 ms per LLM call")
+print("=" * 60)
+print(f"No cache:   {uncached_ms:6.2f} ms/reply")
+print(f"With cache: {cached_ms:6.2f} ms/reply (hit rate {stats['hit_rate']:.0%}, {stats['size']} entries)")
+
+REPEATED = ["Show me today's schedule", "What's free tomorrow afternoon?", "Any gaps this afternoon?",
+            "who's in next", "What's left for today", "Is the doctor free after lunch?"]
+StubHandler.latency = 0.02
+StubHandler.completion = INTENT_COMPLETION
+server, url = start_stub()
+llm_service.api_url = url
+sys.stdout = SilentPrint()
+try:
+    timings = []
+    for size in (0, settings.INTENT_CACHE_SIZE):
+        llm_service.intent_cache = IntentCache(size)
+        started = time.perf_counter()
+        for i in range(CALLS):
+            llm_service.parse_intent(REPEATED[i % len(REPEATED)])
+        timings.append((time.perf_counter() - started) / CALLS * 1000)
+finally:
+    sys.stdout = stdout
+    server.shutdown()
+
+stats = llm_service.intent_cache.stats()
+print(f"\n[BENCH] Intent cache, {CALLS} parses of {len(REPEATED)} repeated commands, 20 ms per LLM call")
+print("=" * 60)
+print(f"No cache:   {timings[0]:6.2f} ms/parse")
+print(f"With cache: {timings[1]:6.2f} ms/parse (hit rate {stats['hit_rate']:.0%})")
+
+async def streamed_turn(graph):
+    """Seconds until the first reply piece reaches on_delta, and until the turn ends"""
+    started = time.perf_counter()
+    first = []
+    on_delta = lambda text: first or first.append(time.perf_counter() - started)
+    state = await graph.ainvoke(initial_state("Cancel Zed Quinn's appointment"), {'configurable': {'on_delta': on_delta}})
+    assert state['agent_response'] == STREAMED_REPLY, state['agent_response']
+    return first[0], time.perf_counter() - started
+
+
+TOKEN_DELAY = 0.03
+StubHandler.latency = STUB_LATENCY
+StubHandler.token_delay = TOKEN_DELAY
+StubHandler.completion = json.dumps({"choices": [{"message": {"content": STREAMED_REPLY}}]}).encode()
+server, url = start_stub()
+llm_service.api_url = url
+llm_service.response_cache.maxsize = 0
+# The intent is parsed by the rules, so the only LLM call is the reply
+settings.INTENT_RULES_MIN_CONFIDENCE = 0.9
+settings.LLM_PHRASED_INTENTS = {"all"}
+sys.stdout = SilentPrint()
+try:
+    started = time.perf_counter()
+    state = asyncio.run(agent_graph.ainvoke(initial_state("Cancel Zed Quinn's appointment")))
+    assert state['agent_response'] == STREAMED_REPLY, state['agent_response']
+    buffered = time.perf_counter() - started
+    first_piece, streamed = asyncio.run(streamed_turn(agent_graph))
+finally:
+    sys.stdout = stdout
+    server.shutdown()
+    settings.LLM_PHRASED_INTENTS = set()
+
+print(f"\n[BENCH] Reply streaming, {STUB_LATENCY * 1000:.0f} ms to first token, "
+      f"{len(STREAMED_REPLY.split())} words at {TOKEN_DELAY * 1000:.0f} ms each")
+print("=" * 60)
+print(f"Buffered ainvoke, reply shown after: {buffered * 1000:7.0f} ms")
+print(f"Streamed, first text shown after:    {first_piece * 1000:7.0f} ms (turn done at {streamed * 1000:.0f} ms)")
+
+CLARIFY = {"intent": "book_appointment", "date": "2025-11-01", "time": None, "patient_name": "Kevin",
+           "clarification_needed": True, "missing_fields": ["time"],
+           "response": "What time should I book Kevin for on November 1?"}
+StubHandler.latency = STUB_LATENCY
+StubHandler.token_delay = 0
+StubHandler.completion = json.dumps({"choices": [{"message": {"content": json.dumps(CLARIFY)}}]}).encode()
+server, url = start_stub()
+llm_service.api_url = url
+llm_service.intent_cache = IntentCache(0)
+settings.INTENT_RULES_MIN_CONFIDENCE = float("inf")
+settings.LLM_PHRASED_INTENTS = {"all"}
+sys.stdout = SilentPrint()
+try:
+    turn_ms = {}
+    for with_reply in (False, True):
+        settings.INTENT_WITH_REPLY = with_reply
+        turn_ms[with_reply] = invoke_turn_s() * 1000
+finally:
+    sys.stdout = stdout
+    server.shutdown()
+    settings.LLM_PHRASED_INTENTS = set()
+
+print(f"\n[BENCH] Clarification turn, LLM phrasing, {STUB_LATENCY * 1000:.0f} ms per LLM call")
+print("=" * 60)
+print(f"Intent call, then a reply call: {turn_ms[False]:6.0f} ms/turn")
+print(f"Intent call writes the reply:   {turn_ms[True]:6.0f} ms/turn")
+
+def percentile_ms(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+
+SLOW_EVERY = 30
+StubHandler.latency = 0.02
+StubHandler.slow_every = SLOW_EVERY
+StubHandler.slow_latency = 0.5
+StubHandler.completion = COMPLETION
+server, url = start_stub()
+llm_service.api_url = url
+settings.LLM_HEDGE_MIN_DELAY = 0.05
+sys.stdout = SilentPrint()
+try:
+    latencies = {}
+    for hedge in (False, True):
+        settings.LLM_HEDGE = hedge
+        llm_service.response_cache = TTLCache(0, 0)
+        samples = []
+        for _ in range(CALLS):
+            started = time.perf_counter()
+            pooled_call()
+            samples.append(time.perf_counter() - started)
+        latencies[hedge] = samples
+    hedges = (llm_service.hedges_sent, llm_service.hedges_won)
+finally:
+    sys.stdout = stdout
+    settings.LLM_HEDGE = False
+    StubHandler.slow_every = 0
+    server.shutdown()
+
+print(f"\n[BENCH] Hedged requests, {CALLS} calls, 20 ms per call and 500 ms for 1 in {SLOW_EVERY}")
+print("=" * 60)
+print(f"{'':>10} | {'p50':>6} | {'p99':>6} | {'max':>6}")
+for hedge, label in ((False, "no hedge"), (True, "hedged")):
+    samples = latencies[hedge]
+    print(f"{label:>10} | {percentile_ms(samples, 0.5):4.0f}ms | {percentile_ms(samples, 0.99):4.0f}ms | {max(samples) * 1000:4.0f}ms")
+print(f"Hedges sent: {hedges[0]}, won: {hedges[1]}")
+
+# A provider that hangs: each attempt times out, and the turn deadline caps the total
+StubHandler.latency = 60
+server, url = start_stub()
+llm_service.api_url = url
+llm_service.response_cache = TTLCache(0, 0)
+sys.stdout = SilentPrint()
+try:
+    started = time.perf_counter()
+    with turn_deadline(2):
+        reply = llm_service.generate_response(CONTEXT)
+    hung_s = time.perf_counter() - started
+finally:
+    sys.stdout = stdout
+    server.shutdown()
+
+worst_case = settings.LLM_MAX_ATTEMPTS * settings.LLM_RESPONSE_TIMEOUT
+print(f"\n[BENCH] Hung provider, {settings.LLM_MAX_ATTEMPTS} attempts of {settings.LLM_RESPONSE_TIMEOUT:.0f} s each")
+print("=" * 60)
+print(f"Without a turn deadline: up to {worst_case:.0f} s")
+print(f"With a 2 s turn deadline: {hung_s:.2f} s, then {reply!r}")
+
+print("\n[BENCH] LLM benchmark complete!")
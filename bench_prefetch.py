@@ -0,0 +1,94 @@
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from backend.config import SilentPrint, settings
+from backend.services.calendar_service import calendar_service
+from backend.services.intent_rules import pending_frame
+from backend.services.llm_service import llm_service
+from backend.agent.graph import agent_graph
+
+TURNS = 20
+CALENDAR_LATENCY = 0.025
+LLM_LATENCY = 0.2
+TOMORROW = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+TAKEN = "14:00"
+BOOKING = {'intent': 'book_appointment', 'date': TOMORROW, 'time': TAKEN, 'patient_name': 'Kevin Hart'}
+
+
+def with_latency(function):
+    """A calendar read that takes as long as a hosted calendar API call"""
+    def slow(*args, **kwargs):
+        time.sleep(CALENDAR_LATENCY)
+        return function(*args, **kwargs)
+    return slow
+
+
+def initial_state(message, pending=None):
+    return {
+        'user_message': message, 'intent': None, 'date': None, 'start_date': None, 'end_date': None,
+        'time': None, 'patient_name': None, 'duration': 30, 'appointments': [], 'available': False,
+        'agent_response': '', 'response_context': None, 'intent_reply': None, 'conversation_history': [],
+        'clarification_needed': False, 'missing_fields': [], 'pending_intent': pending,
+        'prefetched': {}, 'node_timings': {}, 'error': None, 'retry_count': 0
+    }
+
+
+def canned_intent(message, history=None, pending=None):
+    """The LLM's parse, after LLM_LATENCY"""
+    time.sleep(LLM_LATENCY)
+    return {'intent': 'book_appointment', 'time': TAKEN} if pending else dict(BOOKING)
+
+
+def run_turns(message, pending=None):
+    """Average ms per turn and per node"""
+    nodes = defaultdict(float)
+    started = time.perf_counter()
+    for _ in range(TURNS):
+        state = agent_graph.invoke(initial_state(message, pending))
+        assert state['response_context']['error'] == 'slot_taken', state['response_context']
+        for name, ms in state['node_timings'].items():
+            nodes[name] += ms / TURNS
+    return (time.perf_counter() - started) / TURNS * 1000, nodes
+
+
+stdout = sys.stdout
+sys.stdout = SilentPrint()
+try:
+    calendar_service.book_appointment(TOMORROW, TAKEN, "Bench Patient")
+    for name in ("check_availability", "find_free_slots", "get_appointments"):
+        setattr(calendar_service, name, with_latency(getattr(calendar_service, name)))
+    # Every message goes through the (mocked) LLM parse
+    settings.INTENT_RULES_MIN_CONFIDENCE = float("inf")
+    llm_service.parse_intent = canned_intent
+    frame = pending_frame({'intent': 'book_appointment', 'date': TOMORROW, 'patient_name': 'Kevin Hart'})
+
+    results = {}
+    for prefetch in (False, True):
+        settings.CALENDAR_PREFETCH = prefetch
+        results[prefetch] = {
+            "taken": run_turns(f"Book Kevin Hart at 2pm on {TOMORROW}"),
+            "followup": run_turns("at 2pm", pending=frame),
+            # Too loose for the rules, so the LLM parses it while the calendar is read
+            "followup_llm": run_turns("2pm if that's possible", pending=frame),
+        }
+finally:
+    sys.stdout = stdout
+
+SCENARIOS = (
+    ("taken", "Booking a taken slot"),
+    ("followup", "Follow-up to a pending booking, filled by the rules, slot taken"),
+    ("followup_llm", "Follow-up to a pending booking, parsed by the LLM, slot taken"),
+)
+for scenario, title in SCENARIOS:
+    print(f"[BENCH] {title}")
+    print(f"        {LLM_LATENCY * 1000:.0f} ms LLM parse, {CALENDAR_LATENCY * 1000:.0f} ms per calendar call, {TURNS} turns")
+    print("=" * 60)
+    print(f"{'':>20} | {'parse_intent':>12} | {'check_avail.':>12} | {'respond':>7} | {'turn':>7}")
+    for prefetch, label in ((False, "sequential"), (True, "prefetch")):
+        turn_ms, nodes = results[prefetch][scenario]
+        print(f"{label:>20} | {nodes['parse_intent']:9.1f} ms | {nodes['check_availability']:9.1f} ms | "
+              f"{nodes['respond']:4.1f} ms | {turn_ms:4.0f} ms")
+    print()
+
+print("[BENCH] Prefetch benchmark complete!")
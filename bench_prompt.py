@@ -0,0 +1,62 @@
+import sys
+from backend.config import SilentPrint, settings
+from backend.services.llm_service import llm_service, INTENT_PROMPTS
+from backend.services.intent_rules import parse_intent_rules, pending_frame
+
+try:
+    import tiktoken
+    # Not Qwen's tokenizer, but close enough to compare variants
+    encoding = tiktoken.get_encoding("cl100k_base")
+    count_tokens = lambda text: len(encoding.encode(text))
+    METHOD = "tiktoken cl100k_base"
+except ImportError:
+    count_tokens = lambda text: round(len(text) / 4)
+    METHOD = "estimated at 4 characters/token; pip install tiktoken to count"
+
+MESSAGES = ["Book John Smith at 2pm tomorrow", "What's on Friday?", "Cancel Michael's appointment"]
+HISTORY = [{"user": "Is 3pm free tomorrow?", "agent": "Yes, 3:00 PM on November 1 is available."}]
+
+print(f"[BENCH] Intent prompt size per variant ({METHOD})")
+print("=" * 60)
+print(f"{'variant':>8} | {'system (static)':>15} | {'user (dynamic)':>14} | {'total/request':>13}")
+
+stdout = sys.stdout
+for variant in INTENT_PROMPTS:
+    settings.INTENT_PROMPT = variant
+    # The variant plus the reply instructions, if the intent call writes clarifications
+    system_prompt = llm_service._intent_system_prompt()
+    sys.stdout = SilentPrint()
+    try:
+        payloads = [llm_service._intent_payload(message, HISTORY) for message in MESSAGES]
+    finally:
+        sys.stdout = stdout
+    assert all(payload["messages"][0]["content"] == system_prompt for payload in payloads)
+    system_tokens = count_tokens(system_prompt)
+    user_tokens = sum(count_tokens(payload["messages"][1]["content"]) for payload in payloads) / len(payloads)
+    print(f"{variant:>8} | {system_tokens:>15,} | {user_tokens:>14.0f} | {system_tokens + user_tokens:>13,.0f}")
+
+print("\nThe system prompt is identical on every request and every day, so providers")
+print("with prompt caching can reuse it; only the user message changes per request.")
+
+# A clarification follow-up: three raw turns of history, or the pending slots
+FOLLOWUP = "at 3pm"
+TURNS = [
+    {"user": "What's on tomorrow?", "agent": "You have 3 appointments on Saturday, November 1: Ann Lee at 9:00 AM, Bob Ray at 10:30 AM, and Cy Young at 2:00 PM."},
+    {"user": "Is 3pm free tomorrow?", "agent": "Yes, 3:00 PM on Saturday, November 1 is available."},
+    {"user": "Book Kevin tomorrow", "agent": "What time would you like to book Kevin on Saturday, November 1?"},
+]
+frame = pending_frame(parse_intent_rules("Book Kevin tomorrow"))
+sys.stdout = SilentPrint()
+try:
+    with_history = llm_service._intent_payload(FOLLOWUP, TURNS)["messages"][1]["content"]
+    with_frame = llm_service._intent_payload(FOLLOWUP, [], pending=frame)["messages"][1]["content"]
+finally:
+    sys.stdout = stdout
+
+print(f"\n[BENCH] User prompt for the follow-up {FOLLOWUP!r}")
+print("=" * 60)
+print(f"Last 3 turns of history: {count_tokens(with_history):>4} tokens")
+print(f"Pending request slots:   {count_tokens(with_frame):>4} tokens")
+print("(and the rules usually fill the slots without any prompt; see bench_intent.py)")
+
+print("\n[BENCH] Prompt benchmark complete!")
@@ -6,6 +6,10 @@ const statusDiv = document.getElementById('status');
 
 const API_URL = 'http://localhost:8000';
 
+// One conversation per browser tab
+const SESSION_ID = sessionStorage.getItem('sessionId') || crypto.randomUUID();
+sessionStorage.setItem('sessionId', SESSION_ID);
+
 // Add message to chat
 function addMessage(text, isUser) {
     const messageDiv = document.createElement('div');
@@ -31,15 +35,45 @@ async function sendMessage() {
     setStatus('Processing...', 'processing');
 
     try {
-        const response = await fetch(`${API_URL}/chat`, {
+        const response = await fetch(`${API_URL}/chat/stream`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'X-Session-ID': SESSION_ID },
             body: JSON.stringify({ message })
         });
 
-        const data = await response.json();
-        addMessage(data.response, false);
-        setStatus('');
+        // Server-sent events: "delta" pieces of the reply, then "final" with
+        // the reply as recorded, which replaces them (they differ if the
+        // stream broke partway)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let reply = null;
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const event of events) {
+                if (!event.startsWith('data: ')) continue;
+                const data = JSON.parse(event.slice(6));
+                if (data.type === 'delta') {
+                    if (!reply) {
+                        addMessage('', false);
+                        reply = messagesDiv.lastChild;
+                    }
+                    reply.textContent += data.text;
+                    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                } else if (data.type === 'final') {
+                    if (!reply) {
+                        addMessage('', false);
+                        reply = messagesDiv.lastChild;
+                    }
+                    reply.textContent = data.message;
+                    setStatus('');
+                }
+            }
+        }
     } catch (error) {
         console.error('Error:', error);
         addMessage('Error: Could not connect to server', false);
@@ -55,7 +89,8 @@ async function startVoiceConversation() {
 
     try {
         const response = await fetch(`${API_URL}/voice`, {
-            method: 'POST'
+            method: 'POST',
+            headers: { 'X-Session-ID': SESSION_ID }
         });
 
         const data = await response.json();
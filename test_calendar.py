@@ -1,5 +1,11 @@
-from backend.services.calendar_service import calendar_service
+from backend.services.calendar_service import calendar_service, MockCalendarService
+from backend.services.sqlite_calendar_service import SQLiteCalendarService
+from backend.config import SilentPrint
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import tempfile
 
 print("[TEST] Testing Mock Calendar Service...")
 print("\n" + "="*50)
@@ -19,7 +25,7 @@ print(f"Success: {result['success']}")
 if result['success']:
     print(f"Found {result['count']} appointments:")
     for apt in result['appointments']:
-        print(f"  - {apt['time']}: {apt['patient_name']}")
+        print(f"  - {apt.time_str}: {apt.patient_name}")
 
 print("\n" + "="*50)
 
@@ -51,4 +57,182 @@ print("\n[TEST 6] Try double booking")
 result = calendar_service.book_appointment(tomorrow, "15:00", "Jane Doe")
 print(f"Success: {result['success']} - Error: {result.get('error', 'N/A')}")
 
+print("\n" + "="*50)
+
+# Test 7: Long appointments block the following slot
+print("\n[TEST 7] 60-minute booking blocks the next slot")
+result = calendar_service.book_appointment(tomorrow, "16:00", "Long Visit", 60)
+print(f"Booked: {result['success']}")
+assert result['success']
+result = calendar_service.check_availability(tomorrow, "16:30")
+print(f"16:30 available: {result.get('available')} - Reason: {result.get('reason', 'N/A')}")
+assert not result['available'] and result['reason'] == "booked"
+
+print("\n" + "="*50)
+
+# Test 8: Free slot search
+print("\n[TEST 8] First 3 free 60-minute slots from 2 PM")
+slots = calendar_service.find_free_slots(tomorrow, after_time="14:00", duration=60, count=3)
+for slot in slots:
+    print(f"  - {slot['date']} {slot['time']}")
+
+print("\n" + "="*50)
+
+# Test 9: Concurrent receptionists booking overlapping slots
+print("\n[TEST 9] 32 threads racing for the same slots on 3 days")
+race_dates = [(datetime.now() + timedelta(days=d)).strftime("%Y-%m-%d") for d in (30, 31, 32)]
+attempts = [
+    (race_dates[i % 3], f"{9 + (i // 3) % 9}:{'30' if i % 2 else '00'}", f"Racer {i}", 30 + 30 * (i % 2))
+    for i in range(600)
+]
+
+stdout = sys.stdout
+sys.stdout = SilentPrint()
+try:
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(lambda args: calendar_service.book_appointment(*args), attempts))
+    booked = [apt for d in race_dates for apt in calendar_service.get_appointments(d)]
+finally:
+    sys.stdout = stdout
+
+double_bookings = 0
+for d in race_dates:
+    day = sorted((apt.start, apt.end) for apt in booked if apt.date_str == d)
+    for (_, prev_end), (next_start, _) in zip(day, day[1:]):
+        if prev_end > next_start:
+            double_bookings += 1
+
+event_ids = [r["event_id"] for r in results if r["success"]]
+print(f"Successful bookings: {len(event_ids)} of {len(attempts)}")
+print(f"Overlapping bookings: {double_bookings}")
+print(f"Duplicate event IDs: {len(event_ids) - len(set(event_ids))}")
+assert double_bookings == 0
+assert len(event_ids) == len(set(event_ids))
+
+print("\n" + "="*50)
+
+# Test 10: Bulk booking and cancellation
+print("\n[TEST 10] Bulk import with an in-batch conflict, then bulk cancel")
+import_date = (datetime.now() + timedelta(days=40)).strftime("%Y-%m-%d")
+results = calendar_service.book_many([
+    {"date": import_date, "time": "09:00", "patient_name": "Referral A"},
+    {"date": import_date, "time": "09:00", "patient_name": "Referral B"},
+    {"date": import_date, "time": "10:00", "patient_name": "Referral C", "duration": 60},
+    {"date": import_date, "time": "7 PM", "patient_name": "Referral D"},
+])
+for r in results:
+    print(f"  - success={r['success']} {r.get('event_id') or r.get('message')}")
+assert [r['success'] for r in results] == [True, False, True, False]
+assert "Referral A" in results[1]['message']
+results = calendar_service.cancel_many([
+    {"date": import_date, "time": "09:00"},
+    {"patient_name": "Referral C"},
+    {"date": import_date, "patient_name": "Nobody"},
+])
+for r in results:
+    print(f"  - success={r['success']} {r.get('message')}")
+assert [r['success'] for r in results] == [True, True, False]
+
+print("\n" + "="*50)
+
+# Test 11: Fuzzy patient lookup for misheard names
+print("\n[TEST 11] Cancel 'Jon Smith' when 'John Smith' is booked")
+calendar_service.book_appointment(import_date, "15:00", "John Smith")
+for match in calendar_service.find_patient("Jon Smith"):
+    print(f"  - {match['patient_name']} (confidence {match['confidence']})")
+result = calendar_service.cancel_appointment(None, patient_name="Jon Smith")
+print(f"Success: {result['success']} - {result.get('message')} - Confidence: {result.get('match_confidence', 1.0)}")
+
+print("\n" + "="*50)
+
+# Test 12: Recurring weekly series
+print("\n[TEST 12] Weekly physio series, one cancelled week, then a clash")
+series_start = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
+result = calendar_service.book_recurring(series_start, "11:00", "Physio Patient", frequency="weekly", count=10)
+print(f"Booked: {result['success']} - {result.get('series_id')} x{result.get('occurrences')} until {result.get('last_date')}")
+assert result['success'] and result['occurrences'] == 10
+second_week = (datetime.now() + timedelta(days=67)).strftime("%Y-%m-%d")
+print(f"Week 2 free at 11:00: {calendar_service.check_availability(second_week, '11:00')['available']}")
+result = calendar_service.cancel_appointment(second_week, "11:00")
+print(f"Cancel week 2: {result['success']} - {result.get('message')}")
+print(f"Week 2 free at 11:00 now: {calendar_service.check_availability(second_week, '11:00')['available']}")
+assert result['success'] and calendar_service.check_availability(second_week, '11:00')['available']
+third_week = (datetime.now() + timedelta(days=74)).strftime("%Y-%m-%d")
+assert not calendar_service.check_availability(third_week, '11:00')['available']
+series_end = (datetime.now() + timedelta(days=60 + 9 * 7)).strftime("%Y-%m-%d")
+weeks = calendar_service.get_appointments_range(series_start, series_end)
+occurrences = [apt.date_str for apt in weeks if apt.patient_name == 'Physio Patient']
+print(f"Confirmed occurrences: {len(occurrences)}")
+assert len(occurrences) == 9 and second_week not in occurrences and series_start in occurrences
+result = calendar_service.book_recurring(series_start, "11:15", "Dialysis Patient", frequency="daily", count=30)
+print(f"Clashing daily series: {result['success']} - {result.get('message')}")
+assert not result['success']
+
+print("\n" + "="*50)
+
+# Test 13: Partial names are suggested, never cancelled outright
+print("\n[TEST 13] Cancel by initial or prefix asks first")
+for partial in ["A", "D", "Al", "Ali"]:
+    result = calendar_service.cancel_appointment(None, None, partial)
+    print(f"  - {partial!r}: {result['success']} - suggestions {result.get('suggestions')}")
+    assert not result['success']
+assert "Alice Johnson" in calendar_service.cancel_appointment(None, None, "Ali").get('suggestions', [])
+result = calendar_service.cancel_appointment(None, None, "Alice")
+print(f"  - 'Alice': {result['success']} - {result.get('message')}")
+assert result['success'] and result['appointment'].patient_name == "Alice Johnson"
+
+print("\n" + "="*50)
+
+# Test 14: Range reads while other threads empty and refill days
+print("\n[TEST 14] Range listing during concurrent book/cancel")
+churn_days = [(datetime.now() + timedelta(days=200 + i)).strftime("%Y-%m-%d") for i in range(20)]
+
+
+def churn(day):
+    for _ in range(25):
+        calendar_service.book_appointment(day, "10:00", "Churn Patient")
+        calendar_service.cancel_appointment(day, "10:00")
+
+
+def read_ranges(_):
+    for _ in range(200):
+        calendar_service.get_appointments_range(churn_days[0], churn_days[-1])
+
+switch_interval = sys.getswitchinterval()
+sys.setswitchinterval(1e-6)     # interleave the threads as much as possible
+sys.stdout = SilentPrint()
+try:
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(churn, day) for day in churn_days] + [pool.submit(read_ranges, n) for n in range(4)]
+        errors = [f.exception() for f in futures if f.exception()]
+finally:
+    sys.stdout = stdout
+    sys.setswitchinterval(switch_interval)
+print(f"Errors: {errors}")
+assert not errors and not calendar_service.get_appointments_range(churn_days[0], churn_days[-1])
+
+print("\n" + "="*50)
+
+# Test 15: Both backends match patient names the same way
+print("\n[TEST 15] Name matching on the mock and SQLite backends")
+name_date = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
+with tempfile.TemporaryDirectory() as tmp:
+    sys.stdout = SilentPrint()
+    try:
+        backends = [("mock", MockCalendarService()), ("sqlite", SQLiteCalendarService(os.path.join(tmp, "new.db")))]
+        outcomes = {}
+        for label, backend in backends:
+            backend.book_appointment(name_date, "10:00", "Mary O'Brien")
+            backend.book_appointment(name_date, "11:00", "  MARY o'brien ")
+            outcomes[label] = (
+                backend.cancel_appointment(name_date, None, "mary o brien")['success'],
+                backend.cancel_appointment(None, None, "Mary  O'Brien")['success'],
+                [apt.time_str for apt in backend.get_appointments(name_date)],
+            )
+    finally:
+        sys.stdout = stdout
+for label, outcome in outcomes.items():
+    print(f"  - {label}: {outcome}")
+assert outcomes["sqlite"] == outcomes["mock"] == (True, True, [])
+
 print("\n[TEST] All calendar tests complete!")
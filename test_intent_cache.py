@@ -0,0 +1,81 @@
+from backend.services.llm_service import llm_service
+from backend.services.intent_cache import IntentCache
+from backend.config import SilentPrint
+import json
+import os
+import sys
+import tempfile
+
+print("[TEST] Testing intent cache...")
+print("\n" + "="*50)
+
+INTENT = {"intent": "list_appointments", "date": None, "missing_fields": []}
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": json.dumps(INTENT)}}]}
+
+
+class FakeSession:
+    """Counts intent-parse calls to the LLM"""
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None):
+        self.calls += 1
+        return FakeResponse()
+
+
+session = FakeSession()
+llm_service.session = session
+stdout = sys.stdout
+
+# Test 1: Repeats of a message, however typed, parse once
+print("\n[TEST 1] Repeated message hits the cache")
+sys.stdout = SilentPrint()
+first = llm_service.parse_intent("Show me today's schedule")
+second = llm_service.parse_intent("  show me TODAY'S schedule?")
+sys.stdout = stdout
+print(f"LLM calls: {session.calls}; results equal: {first == second}")
+assert session.calls == 1 and first == second
+
+# Callers mutate the result; the cached copy must not change
+second['missing_fields'].append('date')
+sys.stdout = SilentPrint()
+third = llm_service.parse_intent("Show me today's schedule")
+sys.stdout = stdout
+assert third['missing_fields'] == []
+
+print("\n" + "="*50)
+
+# Test 2: Different history means a different parse
+print("\n[TEST 2] History is part of the key")
+history = [{"user": "Book John Smith", "agent": "What time?"}]
+sys.stdout = SilentPrint()
+llm_service.parse_intent("Show me today's schedule", history)
+llm_service.parse_intent("Show me today's schedule", history)
+sys.stdout = stdout
+print(f"LLM calls: {session.calls} (expected 2)")
+assert session.calls == 2
+
+print("\n" + "="*50)
+
+# Test 3: Entries written to disk warm a new cache
+print("\n[TEST 3] Persisted entries survive a restart")
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "intent_cache.db")
+    sys.stdout = SilentPrint()
+    before = IntentCache(16, path)
+    key = IntentCache.key("What's on tomorrow", [])
+    before.set(key, INTENT)
+    after = IntentCache(16, path)
+    sys.stdout = stdout
+    print(f"Reloaded: {after.get(key)}")
+    assert after.get(key) == INTENT
+
+print(f"\nService stats: {llm_service.cache_stats()['intent_cache']}")
+print("\n[TEST] All tests complete!")
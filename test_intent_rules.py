@@ -0,0 +1,113 @@
+from backend.agent.nodes import parse_intent_node
+from backend.services.intent_rules import fill_pending, merge_pending, parse_intent_rules, pending_frame
+from backend.services.llm_service import llm_service
+from backend.config import SilentPrint
+from contextlib import redirect_stdout
+from datetime import date
+from unittest import mock
+
+print("[TEST] Testing rule-based intent parsing...")
+print("\n" + "="*50)
+
+friday = date(2025, 10, 31).toordinal()
+
+# Test 1: Fixed phrasings parse with full confidence
+print("\n[TEST 1] Common phrasings")
+result = parse_intent_rules("Book John Smith at 2pm tomorrow", today=friday)
+print(f"Result: {result}")
+assert (result['intent'], result['date'], result['time'], result['patient_name'], result['confidence']) == \
+    ("book_appointment", "2025-11-01", "14:00", "John Smith", 1.0)
+result = parse_intent_rules("Show all appointments for the next 5 days", today=friday)
+print(f"Result: {result}")
+assert (result['start_date'], result['end_date']) == ("2025-10-31", "2025-11-04")
+
+print("\n" + "="*50)
+
+# Test 2: Ambiguous or multi-step messages score low
+print("\n[TEST 2] Ambiguous messages left to the LLM")
+for message in ["Book John at 3", "What's on Friday?", "Cancel John and book Mary at 2pm", "Book him at 2pm tomorrow",
+                "book hello at 3pm tomorrow", "cancel everything tomorrow", "cancel all appointments tomorrow",
+                "cancel Al", "Cancel D", "never mind, cancel the 2pm", "book the dentist at 2pm tomorrow",
+                "schedule a meeting at 2pm tomorrow", "schedule lunch at noon tomorrow", "book a room at 2pm tomorrow",
+                "add a note for tomorrow", "Schedule for tomorrow?", "book david brown tomorrow at 4:30 pm"]:
+    confidence = parse_intent_rules(message, today=friday)['confidence']
+    print(f"  - {message!r}: confidence {confidence}")
+    assert confidence < 0.9
+
+print("\n" + "="*50)
+
+# Test 3: Missing details come from history when there is some
+print("\n[TEST 3] Incomplete booking with and without history")
+alone = parse_intent_rules("Book Kevin tomorrow", today=friday)
+with_history = parse_intent_rules("Book Kevin tomorrow", [{"user": "Is 3pm free?", "agent": "Yes"}], today=friday)
+print(f"No history: missing {alone['missing_fields']}, confidence {alone['confidence']}")
+print(f"With history: confidence {with_history['confidence']}")
+assert alone['missing_fields'] == ["time"] and with_history['confidence'] < 0.9
+
+print("\n" + "="*50)
+
+# Test 4: The parse node only calls the LLM when the rules aren't confident
+print("\n[TEST 4] parse_intent_node skips the LLM on a rule hit")
+llm_calls = []
+
+
+def fake_parse_intent(message, history=None, pending=None):
+    llm_calls.append(message)
+    return {'intent': 'out_of_scope'}
+
+with mock.patch.object(llm_service, "parse_intent", fake_parse_intent), redirect_stdout(SilentPrint()):
+    hit = parse_intent_node({'user_message': "Cancel Michael's appointment", 'conversation_history': []})
+    miss = parse_intent_node({'user_message': "What's the weather?", 'conversation_history': []})
+print(f"Rule hit: {hit['intent']} for {hit['patient_name']}; LLM calls: {llm_calls}")
+assert hit['intent'] == "cancel_appointment" and llm_calls == ["What's the weather?"]
+
+print("\n" + "="*50)
+
+# Test 5: Follow-up answers fill the pending request's slots
+print("\n[TEST 5] Slot filling from follow-ups")
+frame = pending_frame(parse_intent_rules("Book Kevin tomorrow", today=friday))
+print(f"Pending: {frame}")
+filled = fill_pending(frame, "at 3pm", today=friday)
+print(f"'at 3pm' -> {filled}")
+assert (filled['intent'], filled['date'], filled['time'], filled['patient_name'], filled['clarification_needed']) == \
+    ("book_appointment", "2025-11-01", "15:00", "Kevin", False)
+frame = pending_frame(parse_intent_rules("Book at 2pm tomorrow", today=friday))
+named = fill_pending(frame, "It's for Jane Doe", today=friday)
+print(f"'It's for Jane Doe' -> {named['patient_name']}, missing {named['missing_fields']}")
+assert named['patient_name'] == "Jane Doe" and not named['missing_fields']
+for message in ["at 3", "Show me today's schedule", "yes", "cancel it instead", "thanks", "hmm", "what",
+                "hello", "Kevin", "hello there", "jane doe"]:
+    print(f"  - {message!r}: {fill_pending(frame, message, today=friday)}")
+    assert fill_pending(frame, message, today=friday) is None
+for message in ["never mind", "Nevermind.", "no", "forget it", "stop", "no thanks", "okay, never mind"]:
+    dismissed = fill_pending(frame, message, today=friday)
+    print(f"  - {message!r}: {dismissed['intent']}")
+    assert dismissed['intent'] == "dismissed" and dismissed['patient_name'] is None
+
+print("\n" + "="*50)
+
+# Test 6: LLM parses of follow-ups keep the pending slots
+print("\n[TEST 6] merge_pending")
+frame = pending_frame({'intent': 'book_appointment', 'patient_name': 'Kevin', 'date': '2025-11-01', 'duration': 60})
+merged = merge_pending(frame, {'intent': 'book_appointment', 'time': '15:00', 'duration': 30})
+print(f"Merged: {merged}")
+assert (merged['patient_name'], merged['time'], merged['duration'], merged['clarification_needed']) == \
+    ("Kevin", "15:00", 60, False)
+other = {'intent': 'list_appointments', 'date': '2025-11-01'}
+assert merge_pending(frame, other) is other
+
+print("\n" + "="*50)
+
+# Test 7: The parse node fills a pending request without the LLM
+print("\n[TEST 7] parse_intent_node with a pending request")
+llm_calls.clear()
+with mock.patch.object(llm_service, "parse_intent", fake_parse_intent), redirect_stdout(SilentPrint()):
+    state = parse_intent_node({'user_message': "at 3pm", 'conversation_history': [], 'pending_intent': frame})
+    # Let the calendar prefetch it started finish (and print) while output is silenced
+    for future in state['prefetched'].values():
+        future.result()
+print(f"Intent: {state['intent']} for {state['patient_name']} at {state['time']}; LLM calls: {llm_calls}")
+assert (state['intent'], state['time'], state['clarification_needed']) == ("book_appointment", "15:00", False)
+assert llm_calls == []
+
+print("\n[TEST] All tests complete!")
@@ -0,0 +1,168 @@
+from backend.services.llm_service import llm_service, ERROR_RESPONSE, UNAVAILABLE_RESPONSE
+from backend.services.llm_resilience import CircuitBreaker, LatencyTracker, turn_deadline
+from concurrent.futures import ThreadPoolExecutor
+from backend.services.ttl_cache import TTLCache
+from backend.config import SilentPrint, settings
+from contextlib import redirect_stdout
+from unittest import mock
+import asyncio
+import requests
+import time
+
+print("[TEST] Testing LLM retries, deadline and circuit breaker...")
+print("\n" + "="*50)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+class FakeSession:
+    """Fails the first `failures` calls with `error`, then answers; with a
+    delay, each call takes that long (capped at its timeout)"""
+    def __init__(self, failures=0, error=None, delay=0):
+        self.calls = 0
+        self.failures = failures
+        self.error = error or requests.exceptions.ConnectionError("connection reset")
+        self.delay = delay
+
+    def post(self, url, json=None, timeout=None):
+        self.calls += 1
+        if self.delay:
+            time.sleep(min(self.delay, timeout))
+            if self.delay > timeout:
+                raise requests.exceptions.ReadTimeout("read timed out")
+        if self.calls <= self.failures:
+            raise self.error
+        return FakeResponse(f"reply {self.calls}")
+
+
+def fake_llm(session, **attributes):
+    """Point llm_service at session, with no reply cache, a fresh breaker and
+    zeroed counters, until the block ends"""
+    return mock.patch.multiple(
+        llm_service, session=session, response_cache=TTLCache(0, 0),
+        breaker=CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET),
+        retries=0, hedges_sent=0, hedges_won=0, **attributes
+    )
+
+
+def fast_backoff(**values):
+    """Short backoff, plus any other overrides, until the block ends"""
+    return mock.patch.multiple(settings, LLM_BACKOFF_BASE=0.01, **values)
+
+
+# Test 1: Transient failures are retried
+print("\n[TEST 1] Two dropped connections, then a reply")
+session = FakeSession(failures=2)
+with fast_backoff(), fake_llm(session), redirect_stdout(SilentPrint()):
+    reply = llm_service.generate_response({'intent': 'book_appointment', 'result': 'mystery'})
+print(f"Reply: {reply!r} after {session.calls} calls")
+assert reply == "reply 3" and session.calls == 3
+
+print("\n" + "="*50)
+
+# Test 2: Client errors are not retried
+print("\n[TEST 2] A 401 fails without retrying")
+unauthorized = requests.Response()
+unauthorized.status_code = 401
+session = FakeSession(failures=5, error=requests.exceptions.HTTPError("401", response=unauthorized))
+with fast_backoff(), fake_llm(session), redirect_stdout(SilentPrint()):
+    reply = llm_service.generate_response({'intent': 'book_appointment', 'result': 'mystery'})
+print(f"Reply: {reply!r} after {session.calls} call")
+assert reply == ERROR_RESPONSE and session.calls == 1
+
+print("\n" + "="*50)
+
+# Test 3: The turn deadline bounds total time across attempts
+print("\n[TEST 3] Slow provider stops at the turn deadline")
+session = FakeSession(delay=5)
+started = time.monotonic()
+with fast_backoff(), fake_llm(session), redirect_stdout(SilentPrint()), turn_deadline(0.3):
+    intent = llm_service.parse_intent("Something the rules can't parse, surely")
+elapsed = time.monotonic() - started
+print(f"Intent: {intent['intent']} ({intent['error']}) after {elapsed:.2f}s and {session.calls} calls")
+assert intent['error'] == 'timeout' and elapsed < 0.6
+
+print("\n" + "="*50)
+
+# Test 4: Repeated failures open the breaker, which then fails fast
+print("\n[TEST 4] Circuit breaker opens, fails fast, then recovers")
+session = FakeSession(failures=settings.LLM_BREAKER_FAILURES)
+with fast_backoff(LLM_BREAKER_RESET=0.2), fake_llm(session), redirect_stdout(SilentPrint()):
+    for _ in range(3):
+        llm_service.generate_response({'intent': 'book_appointment', 'result': 'mystery'})
+    calls_when_open = session.calls
+    fast = llm_service.generate_response({'intent': 'book_appointment', 'result': 'mystery'})
+    opened = llm_service.breaker.stats()
+    time.sleep(0.25)
+    recovered = llm_service.generate_response({'intent': 'book_appointment', 'result': 'mystery'})
+    state = llm_service.breaker.state
+print(f"While open: {fast!r} ({opened})")
+print(f"After reset: {recovered!r}; state {state}")
+assert calls_when_open == settings.LLM_BREAKER_FAILURES and fast == UNAVAILABLE_RESPONSE
+assert opened['state'] == "open" and recovered.startswith("reply") and state == "closed"
+
+print("\n" + "="*50)
+
+# Test 5: A cancelled half-open trial doesn't wedge the breaker
+print("\n[TEST 5] Half-open trial cancelled mid-call")
+
+
+async def hang(payload, timeout, kind):
+    await asyncio.sleep(10)
+
+
+async def cancel_trial():
+    task = asyncio.ensure_future(llm_service.agenerate_response({'intent': 'book_appointment', 'result': 'mystery'}))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+with fast_backoff(LLM_BREAKER_RESET=0.2), fake_llm(FakeSession(), _aattempt=hang), redirect_stdout(SilentPrint()):
+    for _ in range(settings.LLM_BREAKER_FAILURES):
+        llm_service.breaker.record_failure()
+    time.sleep(0.25)
+    asyncio.run(cancel_trial())
+    state, allowed = llm_service.breaker.state, llm_service.breaker.allow()
+print(f"After the cancelled trial: {state}, next call allowed: {allowed}")
+assert state == "half_open" and allowed
+breaker = CircuitBreaker(1, 0.1)
+with redirect_stdout(SilentPrint()):
+    breaker.record_failure()
+time.sleep(0.15)
+assert breaker.allow() and not breaker.allow()
+time.sleep(0.15)
+allowed = breaker.allow()
+print(f"Trial that never reported back, after reset_timeout: allowed {allowed}")
+assert allowed
+
+print("\n" + "="*50)
+
+# Test 6: Time spent queued for a worker doesn't count towards the hedge delay
+print("\n[TEST 6] No hedge for a request held up by a busy pool")
+session = FakeSession(delay=0.01)
+latency = {kind: LatencyTracker(settings.LLM_LATENCY_WINDOW) for kind in ("intent", "response")}
+for _ in range(20):
+    latency["response"].record(0.01)
+busy_pool = ThreadPoolExecutor(max_workers=1)
+busy_pool.submit(time.sleep, 0.3)
+with fast_backoff(LLM_HEDGE=True, LLM_HEDGE_MIN_DELAY=0.05), \
+        fake_llm(session, _latency=latency, _hedge_pool=busy_pool), redirect_stdout(SilentPrint()):
+    reply = llm_service.generate_response({'intent': 'book_appointment', 'result': 'mystery'})
+    hedges = llm_service.hedges_sent
+busy_pool.shutdown()
+print(f"Reply: {reply!r}; hedges sent: {hedges}, calls: {session.calls}")
+assert reply == "reply 1" and hedges == 0 and session.calls == 1
+
+print("\n[TEST] All tests complete!")
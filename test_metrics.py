@@ -0,0 +1,67 @@
+from backend.services import metrics
+from backend.services.metrics import Counter, Histogram, Stage
+from backend.agent.graph import timed
+
+print("[TEST] Testing Prometheus metrics...")
+print("\n" + "="*50)
+
+# Test 1: Histogram buckets are cumulative, with sum and count
+print("\n[TEST 1] Histogram buckets")
+histogram = Histogram("test_wait_seconds", "Test waits", ("kind",), buckets=(0.1, 1))
+for seconds in (0.05, 0.5, 2):
+    histogram.observe(seconds, kind="intent")
+text = histogram.render()
+print(text)
+assert 'test_wait_seconds_bucket{kind="intent",le="0.1"} 1' in text
+assert 'test_wait_seconds_bucket{kind="intent",le="1"} 2' in text
+assert 'test_wait_seconds_bucket{kind="intent",le="+Inf"} 3' in text
+assert 'test_wait_seconds_sum{kind="intent"} 2.55' in text
+assert 'test_wait_seconds_count{kind="intent"} 3' in text
+assert "# TYPE test_wait_seconds histogram" in text
+
+print("\n" + "="*50)
+
+# Test 2: A stage counts errors by type and is back to 0 in flight after
+print("\n[TEST 2] Stage errors and in-flight gauge")
+stage = Stage("test_stage", "test stages", ("node",))
+with stage.track(node="book"):
+    assert stage.in_flight.value(node="book") == 1
+try:
+    with stage.track(node="book"):
+        raise TimeoutError("slow")
+except TimeoutError:
+    pass
+print(f"Runs: {stage.duration.count(node='book')}, errors: {stage.errors.value(node='book', error='TimeoutError')}")
+assert stage.duration.count(node="book") == 2
+assert stage.errors.value(node="book", error="TimeoutError") == 1
+assert stage.in_flight.value(node="book") == 0
+
+print("\n" + "="*50)
+
+# Test 3: Label values are escaped; unknown labels are refused
+print("\n[TEST 3] Label escaping")
+counter = Counter("test_labels_total", "Test labels", ("name",))
+counter.inc(name='say "hi"\n')
+print(counter.render())
+assert 'test_labels_total{name="say \\"hi\\"\\n"} 1' in counter.render()
+try:
+    counter.inc(other="x")
+    assert False, "expected ValueError"
+except ValueError as e:
+    print(f"Refused: {e}")
+
+print("\n" + "="*50)
+
+# Test 4: Graph nodes and scrape-time gauges show up in render()
+print("\n[TEST 4] Timed nodes and bound gauges in the exposition")
+node = timed("test_node", lambda state: state)
+node({})
+metrics.SESSIONS.set_function(lambda: 7)
+text = metrics.render()
+assert 'agent_node_duration_seconds_count{node="test_node"} 1' in text
+assert 'agent_node_in_flight{node="test_node"} 0' in text
+assert "agent_sessions 7" in text
+assert text.endswith("\n")
+print(f"{len(text.splitlines())} lines exported")
+
+print("\n[TEST] All tests complete!")
@@ -0,0 +1,98 @@
+from backend.services.llm_service import llm_service, ERROR_RESPONSE
+from backend.services.ttl_cache import TTLCache
+from backend.config import SilentPrint, settings
+from contextlib import redirect_stdout
+from unittest import mock
+import time
+
+print("[TEST] Testing LLM response cache...")
+print("\n" + "="*50)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        if self.content is None:
+            raise RuntimeError("LLM unavailable")
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+class FakeSession:
+    """Counts LLM calls and answers with a numbered reply"""
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def post(self, url, json=None, timeout=None):
+        self.calls += 1
+        return FakeResponse(None if self.fail else f"reply {self.calls}")
+
+
+def fake_llm(session):
+    """Point llm_service at session, with an empty cache, until the block ends"""
+    return mock.patch.multiple(
+        llm_service, session=session,
+        response_cache=TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+    )
+
+
+session = FakeSession()
+
+# Test 1: Same context in a different key order is served from the cache
+print("\n[TEST 1] Identical contexts share one LLM call")
+with fake_llm(session), redirect_stdout(SilentPrint()):
+    first = llm_service.generate_response({'intent': 'book_appointment', 'error': 'outside_hours', 'time': '20:00'})
+    second = llm_service.generate_response({'time': '20:00', 'error': 'outside_hours', 'intent': 'book_appointment'})
+print(f"Replies: {first!r}, {second!r}; LLM calls: {session.calls}")
+assert first == second and session.calls == 1
+
+print("\n" + "="*50)
+
+# Test 2: Contexts listing patients aren't cached unless enabled
+print("\n[TEST 2] Patient lists bypass the cache")
+listing = {'intent': 'list_appointments', 'result': 'found_appointments', 'appointments': [{'patient': 'Ann Lee'}]}
+session = FakeSession()
+with fake_llm(session), redirect_stdout(SilentPrint()):
+    llm_service.generate_response(listing)
+    llm_service.generate_response(listing)
+    calls_default = session.calls
+    with mock.patch.object(settings, "RESPONSE_CACHE_PATIENT_LISTS", True):
+        llm_service.generate_response(listing)
+        llm_service.generate_response(listing)
+print(f"LLM calls: {calls_default} uncached, then {session.calls - calls_default} with lists enabled")
+assert calls_default == 2 and session.calls == 3
+
+print("\n" + "="*50)
+
+# Test 3: Errors are never cached
+print("\n[TEST 3] Failed calls are not cached")
+session = FakeSession()
+session.fail = True
+with fake_llm(session), redirect_stdout(SilentPrint()):
+    failed = llm_service.generate_response({'intent': 'cancel_appointment', 'error': 'missing_info'})
+    session.fail = False
+    retried = llm_service.generate_response({'intent': 'cancel_appointment', 'error': 'missing_info'})
+print(f"Replies: {failed!r}, {retried!r}")
+assert failed == ERROR_RESPONSE and retried != ERROR_RESPONSE
+
+print("\n" + "="*50)
+
+# Test 4: LRU eviction and expiry
+print("\n[TEST 4] Eviction and TTL")
+cache = TTLCache(maxsize=2, ttl=60)
+cache.set("a", 1)
+cache.set("b", 2)
+cache.get("a")
+cache.set("c", 3)           # evicts "b", the least recently used
+print(f"After LRU eviction: a={cache.get('a')}, b={cache.get('b')}, c={cache.get('c')}")
+assert (cache.get("a"), cache.get("b")) == (1, None)
+cache.set("d", 4, ttl=0.01)
+time.sleep(0.02)
+print(f"After expiry: d={cache.get('d')}; stats: {cache.stats()}")
+assert cache.stats()["evictions"] == 2 and cache.stats()["expirations"] == 1
+
+print("\n[TEST] All tests complete!")
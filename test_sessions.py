@@ -0,0 +1,101 @@
+from backend.agent.sessions import Session, SessionStore, HISTORY_TURNS
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+print("[TEST] Testing per-session conversation store...")
+print("\n" + "="*50)
+
+# Test 1: Sessions don't see each other's turns
+print("\n[TEST 1] Separate histories per session")
+store = SessionStore(maxsize=10, idle_ttl=60)
+store.get("front-desk").record("Book John at 2pm tomorrow", "Booked.")
+store.get("phone").record("What's on Friday?", "Two appointments.")
+print(f"front-desk: {store.get('front-desk').snapshot()}")
+print(f"phone: {store.get('phone').snapshot()}")
+assert [t['user'] for t in store.get("front-desk").snapshot()] == ["Book John at 2pm tomorrow"]
+assert store.get("front-desk") is store.get("front-desk")
+
+print("\n" + "="*50)
+
+# Test 2: History keeps only the last few turns
+print(f"\n[TEST 2] History capped at {HISTORY_TURNS} turns")
+session = store.get("busy")
+for i in range(HISTORY_TURNS + 3):
+    session.record(f"message {i}", f"reply {i}")
+turns = session.snapshot()
+print(f"Kept: {[t['user'] for t in turns]}")
+assert len(turns) == HISTORY_TURNS and turns[-1]['user'] == f"message {HISTORY_TURNS + 2}"
+
+print("\n" + "="*50)
+
+# Test 3: Least recently used sessions go first; idle ones expire
+print("\n[TEST 3] LRU eviction and idle expiry")
+store = SessionStore(maxsize=2, idle_ttl=0.05)
+store.get("a").record("hi", "hello")
+store.get("b")
+store.get("a")
+store.get("c")              # evicts "b", the least recently used
+print(f"Sessions after eviction: {len(store)}; a kept history: {bool(store.get('a').snapshot())}")
+assert len(store) == 2 and store.get("a").snapshot()
+time.sleep(0.1)
+print(f"After idling: a has {len(store.get('a').snapshot())} turns; stats {store.stats()}")
+assert store.get("a").snapshot() == [] and store.stats()["evictions"] >= 1
+
+print("\n" + "="*50)
+
+# Test 4: Concurrent clients on many sessions
+print("\n[TEST 4] 1000 sessions from 16 threads")
+store = SessionStore(maxsize=2000, idle_ttl=60)
+
+def converse(n):
+    session = store.get(f"client-{n % 1000}")
+    session.record(f"message {n}", f"reply {n}")
+
+with ThreadPoolExecutor(16) as pool:
+    list(pool.map(converse, range(3000)))
+sizes = {len(store.get(f"client-{n}").snapshot()) for n in range(1000)}
+print(f"Sessions: {len(store)}, turns per session: {sizes}")
+assert len(store) == 1000 and sizes == {3}
+
+print("\n" + "="*50)
+
+# Test 5: Sync and async turns on one session never overlap
+print("\n[TEST 5] Turn lock shared by sync and async callers, across event loops")
+session = Session("shared")
+running, overlaps = [], []
+
+
+def turn_body():
+    running.append(1)
+    if len(running) > 1:
+        overlaps.append(len(running))
+    time.sleep(0.005)
+    running.pop()
+
+
+def sync_turns():
+    for _ in range(20):
+        with session.turn_lock:
+            turn_body()
+
+
+async def async_turn():
+    async with session.aturn():
+        turn_body()
+        await asyncio.sleep(0)
+
+
+async def async_turns():
+    await asyncio.gather(*(async_turn() for _ in range(20)))
+
+worker = threading.Thread(target=sync_turns)
+worker.start()
+asyncio.run(async_turns())
+asyncio.run(async_turns())      # a second loop gets its own asyncio lock
+worker.join()
+print(f"Overlapping turns: {len(overlaps)}")
+assert not overlaps and not session.turn_lock.locked()
+
+print("\n[TEST] All tests complete!")
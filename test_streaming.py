@@ -0,0 +1,126 @@
+from backend.agent.agent import AppointmentAgent
+from backend.services.llm_service import llm_service
+from backend.services.llm_resilience import CircuitBreaker
+from backend.services.ttl_cache import TTLCache
+from backend.config import SilentPrint, settings
+from contextlib import redirect_stdout
+from unittest import mock
+import asyncio
+import httpx
+import json
+
+print("[TEST] Testing streamed agent replies...")
+print("\n" + "="*50)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+class FakeStream:
+    """A streamed completion: one server-sent event per piece, breaking off
+    with a read error after `break_after` pieces if that is set"""
+    def __init__(self, pieces, break_after=None):
+        self.pieces = pieces
+        self.break_after = break_after
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def aiter_lines(self):
+        yield ": keep-alive"
+        for i, piece in enumerate(self.pieces):
+            if i == self.break_after:
+                raise httpx.ReadError("connection reset mid-stream")
+            yield "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]})
+            yield ""
+        yield "data: [DONE]"
+
+
+class FakeClient:
+    """Async client that streams `pieces` and answers buffered calls with `reply`"""
+    def __init__(self, pieces, break_after=None, reply="Buffered reply"):
+        self.pieces = pieces
+        self.break_after = break_after
+        self.reply = reply
+        self.streams = 0
+        self.posts = 0
+
+    def stream(self, method, url, json=None, timeout=None):
+        self.streams += 1
+        return FakeStream(self.pieces, self.break_after)
+
+    async def post(self, url, json=None, timeout=None):
+        self.posts += 1
+        return FakeResponse(self.reply)
+
+
+def fake_llm(client):
+    """Point llm_service at client, with no reply cache and a fresh breaker,
+    until the block ends"""
+    return mock.patch.multiple(
+        llm_service, _get_async_client=lambda: client, response_cache=TTLCache(0, 0),
+        breaker=CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET)
+    )
+
+
+def stream_turn(agent, message, session_id):
+    """All events astream_message yields for one message"""
+    async def collect():
+        return [event async for event in agent.astream_message(message, session_id=session_id)]
+    return asyncio.run(collect())
+
+
+def phrased_silently():
+    """LLM phrasing for every reply and nothing spoken, until the block ends"""
+    return mock.patch.multiple(settings, LLM_PHRASED_INTENTS={"all"}, SPEAK_CHANNELS=set())
+
+
+# Test 1: Deltas as the completion streams in, then the final event
+print("\n[TEST 1] Streamed reply")
+agent = AppointmentAgent()
+client = FakeClient([" You have", " two appointments", " tomorrow."])
+with phrased_silently(), fake_llm(client), redirect_stdout(SilentPrint()):
+    events = stream_turn(agent, "What's on tomorrow?", "stream-ok")
+for event in events:
+    print(f"  - {event}")
+deltas = [event['text'] for event in events if event['type'] == 'delta']
+final = events[-1]
+history = agent.sessions.get("stream-ok").snapshot()
+assert deltas == ["You have", " two appointments", " tomorrow."]
+assert final['type'] == 'final' and final['message'] == "You have two appointments tomorrow."
+assert final['intent'] == "list_appointments" and history[-1]['agent'] == final['message']
+assert client.streams == 1 and client.posts == 0
+
+print("\n" + "="*50)
+
+# Test 2: A stream that breaks partway is replaced, in the reply and the history
+print("\n[TEST 2] Stream broken after the first piece")
+agent = AppointmentAgent()
+client = FakeClient(["You have", " two appointments", " tomorrow."], break_after=1)
+with phrased_silently(), fake_llm(client), redirect_stdout(SilentPrint()):
+    events = stream_turn(agent, "What's on tomorrow?", "stream-broken")
+for event in events:
+    print(f"  - {event}")
+deltas = [event['text'] for event in events if event['type'] == 'delta']
+final = events[-1]
+history = agent.sessions.get("stream-broken").snapshot()
+print(f"Recorded reply: {history[-1]['agent']!r}")
+assert deltas == ["You have"]
+assert final['type'] == 'final' and final['message'] == "Buffered reply"
+assert history[-1]['agent'] == "Buffered reply" and client.posts == 1
+
+print("\n[TEST] All tests complete!")
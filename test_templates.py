@@ -0,0 +1,107 @@
+from backend.agent.graph import agent_graph
+from backend.services.llm_service import llm_service, INTENT_REPLY_INSTRUCTIONS
+from backend.services.response_templates import render_response
+from backend.config import SilentPrint, settings
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from unittest import mock
+
+print("[TEST] Testing template responses...")
+print("\n" + "="*50)
+
+tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+llm_calls = []
+
+
+def phrase_with_llm(context):
+    llm_calls.append(context)
+    return "(LLM reply)"
+
+
+def run_turn(intent_data):
+    """One graph turn with the intent fixed, so only the reply step is exercised"""
+    state = {
+        'user_message': "test message", 'intent': None, 'date': None, 'start_date': None, 'end_date': None,
+        'time': None, 'patient_name': None, 'duration': 30, 'appointments': [], 'available': False,
+        'agent_response': '', 'response_context': None, 'conversation_history': [],
+        'clarification_needed': False, 'missing_fields': [], 'error': None, 'retry_count': 0
+    }
+    fixed_intent = mock.patch.multiple(
+        llm_service, generate_response=phrase_with_llm,
+        parse_intent=lambda message, history=None, pending=None: dict(intent_data)
+    )
+    with fixed_intent, redirect_stdout(SilentPrint()):
+        return agent_graph.invoke(state)['agent_response']
+
+
+turns = [
+    ("List tomorrow", {'intent': 'list_appointments', 'date': tomorrow}),
+    ("Check a taken slot", {'intent': 'check_availability', 'date': tomorrow, 'time': '09:00'}),
+    ("Check a free slot", {'intent': 'check_availability', 'date': tomorrow, 'time': '15:00'}),
+    ("Book outside hours", {'intent': 'book_appointment', 'date': tomorrow, 'time': '20:00', 'patient_name': 'Ann Lee'}),
+    ("Book in the past", {'intent': 'book_appointment', 'date': yesterday, 'time': '10:00', 'patient_name': 'Ann Lee'}),
+    ("Book a free slot", {'intent': 'book_appointment', 'date': tomorrow, 'time': '15:00', 'patient_name': 'Ann Lee'}),
+    ("Cancel by name", {'intent': 'cancel_appointment', 'patient_name': 'Ann Lee'}),
+    ("Cancel unknown name", {'intent': 'cancel_appointment', 'patient_name': 'Zed Quinn'}),
+    ("Check an unreadable time", {'intent': 'check_availability', 'date': tomorrow, 'time': 'teatime'}),
+    ("Book on an unreadable date", {'intent': 'book_appointment', 'date': 'someday', 'time': '15:00', 'patient_name': 'Ann Lee'}),
+    ("Incomplete booking", {'intent': 'book_appointment', 'clarification_needed': True, 'missing_fields': ['patient_name', 'time']}),
+]
+
+# Test 1: Every calendar outcome is phrased without the LLM
+print("\n[TEST 1] Calendar outcomes rendered from templates")
+for label, intent_data in turns:
+    response = run_turn(intent_data)
+    print(f"  - {label}: {response}")
+    assert "None" not in response
+print(f"LLM calls: {len(llm_calls)} (expected 0)")
+assert not llm_calls
+
+print("\n" + "="*50)
+
+# Test 2: Contexts without a template still go to the LLM
+print("\n[TEST 2] Unknown outcome falls back to the LLM")
+print(f"render_response: {render_response({'intent': 'book_appointment', 'result': 'something_new'})}")
+response = run_turn({'intent': 'reschedule_appointment'})
+print(f"Response: {response}, LLM calls: {len(llm_calls)} (expected 1)")
+assert response == "(LLM reply)" and len(llm_calls) == 1
+
+print("\n" + "="*50)
+
+# Test 3: Intents listed in LLM_PHRASED_INTENTS keep LLM phrasing
+print("\n[TEST 3] LLM phrasing enabled for list_appointments")
+with mock.patch.object(settings, "LLM_PHRASED_INTENTS", {"list_appointments"}):
+    response = run_turn({'intent': 'list_appointments', 'date': tomorrow})
+print(f"Response: {response}, LLM calls: {len(llm_calls)} (expected 2)")
+assert response == "(LLM reply)" and len(llm_calls) == 2
+
+print("\n" + "="*50)
+
+# Test 4: A clarification written by the intent call needs no reply call
+print("\n[TEST 4] Clarification from the intent call")
+with mock.patch.object(settings, "LLM_PHRASED_INTENTS", {"book_appointment"}):
+    response = run_turn({'intent': 'book_appointment', 'patient_name': 'Kevin', 'clarification_needed': True,
+                         'missing_fields': ['time'], 'response': "What time should I book Kevin for?"})
+print(f"Response: {response}, LLM calls: {len(llm_calls)} (expected 2)")
+assert response == "What time should I book Kevin for?" and len(llm_calls) == 2
+
+print("\n" + "="*50)
+
+# Test 5: The intent call is only asked for a reply when one can be used
+print("\n[TEST 5] Reply instructions in the intent prompt")
+default_prompt = llm_service._intent_system_prompt()
+with mock.patch.object(settings, "LLM_PHRASED_INTENTS", {"book_appointment"}):
+    phrased_prompt = llm_service._intent_system_prompt()
+    with mock.patch.object(settings, "INTENT_WITH_REPLY", False):
+        disabled_prompt = llm_service._intent_system_prompt()
+print(f"Asks for a reply: default {INTENT_REPLY_INSTRUCTIONS in default_prompt}, "
+      f"phrased {INTENT_REPLY_INSTRUCTIONS in phrased_prompt}, turned off {INTENT_REPLY_INSTRUCTIONS in disabled_prompt}")
+assert INTENT_REPLY_INSTRUCTIONS not in default_prompt and INTENT_REPLY_INSTRUCTIONS not in disabled_prompt
+assert INTENT_REPLY_INSTRUCTIONS in phrased_prompt
+response = run_turn({'intent': 'book_appointment', 'patient_name': 'Kevin', 'clarification_needed': True,
+                     'missing_fields': ['time'], 'response': "What time should I book Kevin for?"})
+print(f"Default config clarification (template): {response}")
+assert response != "What time should I book Kevin for?" and "time" in response and len(llm_calls) == 2
+
+print("\n[TEST] All tests complete!")